@@ -15,7 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
-from collections import namedtuple
+import weakref
 
 class EmptyList(object):
   def __iter__(self):
@@ -105,7 +105,13 @@ class Address(List):
     return map(list, list(self))
 
   def asFrozenList(self):
-    return tuple(map(tuple, list(self)))
+    # Cached, because the traversal is quadratic and addresses are
+    # immutable.
+    try:
+      return self._frozen
+    except AttributeError:
+      self._frozen = tuple(map(tuple, list(self)))
+      return self._frozen
 
   def __eq__(self, other):
     if not isinstance(other, Address):
@@ -132,43 +138,125 @@ def extend(addr, index):
 def append(loc, index):
   return loc.append(index)
 
-class EmptyAddress(namedtuple('EmptyAddress', [])):
+# The addresses actually used by the traces are hash-consed: at most
+# one instance of each distinct address (or frame) is alive at a time,
+# and its hash and depth are computed once, at construction, from
+# those of its (already interned) components.  This makes hashing
+# O(1) and equality of identical addresses O(1), which matters
+# because addresses key the dictionaries of particles, kernel
+# registries, profiler records, etc.  Equality still falls back to
+# comparing structure, in case two threads race to intern the same
+# address.
+
+_interned = weakref.WeakValueDictionary()
+
+class _Interned(object):
+  __slots__ = ('_hash', '_depth', '__weakref__')
+  _fields = ()
+
+  def __new__(cls, *args):
+    key = (cls,) + args
+    try:
+      return _interned[key]
+    except KeyError:
+      pass
+    self = object.__new__(cls)
+    for (field, arg) in zip(cls._fields, args):
+      object.__setattr__(self, field, arg)
+    # Hash the class by name, so that hashes (and hence the iteration
+    # order of dictionaries keyed by address) do not vary from run to
+    # run.
+    object.__setattr__(self, '_hash', hash((cls.__name__,) + args))
+    object.__setattr__(self, '_depth', self._compute_depth())
+    # setdefault, in case another thread got there first
+    return _interned.setdefault(key, self)
+
+  def _args(self):
+    return tuple(getattr(self, field) for field in self._fields)
+
+  def _compute_depth(self):
+    return 1
+
+  def depth(self):
+    return self._depth
+
+  def __setattr__(self, name, value):
+    raise AttributeError("%s is immutable" % (type(self).__name__,))
+
+  def __hash__(self):
+    return self._hash
+
+  def __eq__(self, other):
+    if self is other:
+      return True
+    if type(self) is not type(other) or self._hash != other._hash or \
+       self._depth != other._depth:
+      return False
+    return self._args() == other._args()
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __reduce__(self):
+    # Re-intern on unpickling
+    return (type(self), self._args())
+
+  def __repr__(self):
+    return '%s(%s)' % (type(self).__name__, ', '.join(
+      '%s=%r' % (field, getattr(self, field)) for field in self._fields))
+
+class EmptyAddress(_Interned):
+  __slots__ = ()
   def asList(self):
-    return self.asAddress().asList()
+    return [[]]
   def asAddress(self):
     return Address(emptyList)
 empty_address = EmptyAddress
 
-class BuiltinAddress(namedtuple('BuiltinAddress', ["name"])):
+class BuiltinAddress(_Interned):
+  __slots__ = ('name',)
+  _fields = ('name',)
   def asAddress(self):
     return Address(List(self.name))
 builtin_address = BuiltinAddress
 
-class DirectiveAddress(namedtuple('DirectiveAddress', ["did"])):
+class DirectiveAddress(_Interned):
+  __slots__ = ('did',)
+  _fields = ('did',)
   def asList(self):
-    return self.asAddress().asList()
+    return [[self.did]]
   def asAddress(self):
     return Address(List(self.did))
 directive_address = DirectiveAddress
 
-_RequestAddress = namedtuple('RequestAddress', ["app_addr", "req_id"])
-class RequestAddress(_RequestAddress):
+class RequestAddress(_Interned):
+  __slots__ = ('app_addr', 'req_id')
+  _fields = ('app_addr', 'req_id')
   def __new__(cls, app_addr, req_id):
     assert _is_address(app_addr)
-    return _RequestAddress.__new__(cls, app_addr, req_id)
+    return super(RequestAddress, cls).__new__(cls, app_addr, req_id)
+  def _compute_depth(self):
+    return self.app_addr.depth() + 1
   def asList(self):
-    return self.asAddress().asList()
+    # Same as self.asAddress().asList(), without the quadratic
+    # traversal of the functional list.
+    return self.app_addr.asList() + [_loc_items(self.req_id)]
   def asAddress(self):
     return self.app_addr.asAddress().request(self.req_id.asList())
 request = RequestAddress
 
-_SubexpressionAddress = namedtuple('SubexpressionAddress', ["sup_exp", "index"])
-class SubexpressionAddress(_SubexpressionAddress):
+class SubexpressionAddress(_Interned):
+  __slots__ = ('sup_exp', 'index')
+  _fields = ('sup_exp', 'index')
   def __new__(cls, sup_exp, index):
     assert _is_address(sup_exp)
-    return _SubexpressionAddress.__new__(cls, sup_exp, index)
+    return super(SubexpressionAddress, cls).__new__(cls, sup_exp, index)
+  def _compute_depth(self):
+    return self.sup_exp.depth() + 1
   def asList(self):
-    return self.asAddress().asList()
+    frames = self.sup_exp.asList()
+    frames[-1].append(self.index)
+    return frames
   def asAddress(self):
     return self.sup_exp.asAddress().extend(self.index)
 extend = SubexpressionAddress
@@ -180,21 +268,43 @@ def _is_address(thing):
     isinstance(thing, RequestAddress) or \
     isinstance(thing, SubexpressionAddress)
 
-class ReqLoc(namedtuple('ReqLoc', ["req_id"])):
+class ReqLoc(_Interned):
   # Used by mem
+  __slots__ = ('req_id',)
+  _fields = ('req_id',)
   def asList(self):
     return List(self.req_id)
+  def _items(self):
+    return [self.req_id]
 req_frame = ReqLoc
 
-class DirectiveLoc(namedtuple('DirectiveLoc', ["did"])):
+class DirectiveLoc(_Interned):
+  __slots__ = ('did',)
+  _fields = ('did',)
   def asList(self):
     return List(self.did)
+  def _items(self):
+    return [self.did]
 
-class SubexpressionLoc(namedtuple('SubexpressionLoc', ["sup_exp", "index"])):
+class SubexpressionLoc(_Interned):
+  __slots__ = ('sup_exp', 'index')
+  _fields = ('sup_exp', 'index')
+  def _compute_depth(self):
+    return self.sup_exp.depth() + 1
   def asList(self):
     return self.sup_exp.asList().append(self.index)
+  def _items(self):
+    items = self.sup_exp._items()
+    items.append(self.index)
+    return items
 append = SubexpressionLoc
 
+def _loc_items(loc):
+  if isinstance(loc, _Interned):
+    return loc._items()
+  else:
+    return list(loc.asList())
+
 def top_frame(addr):
   if isinstance(addr, DirectiveAddress):
     return DirectiveLoc(addr.did)
@@ -0,0 +1,59 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+
+import numpy as np
+
+from venture.lite.sp_use import ReplacingArgs
+
+# Fewer applications of one PSP than this are not worth vectorizing.
+MIN_BATCH = 4
+
+class DensityBatch(object):
+  """Log densities deferred by regen, detach or constraint, to be
+  taken one PSP at a time with logDensityMany.
+
+  Only applications of PSPs that canBatch may be deferred: their log
+  density does not depend on the aux, so it does not matter that it
+  is taken after the rest of the border has been processed.
+  """
+  def __init__(self):
+    self.batches = OrderedDict() # {PSP: ([value], [args])}
+
+  def add(self, psp, value, args):
+    (values, args_batch) = self.batches.setdefault(psp, ([], []))
+    values.append(value)
+    # Fix the operand values now, since regen and detach may go on to
+    # change or clear the operand nodes.
+    args_batch.append(ReplacingArgs(args, args.operandValues()))
+
+  def weight(self):
+    """Return the total log density of the deferred applications."""
+    weight = 0
+    for (psp, (values, args_batch)) in self.batches.iteritems():
+      if len(values) < MIN_BATCH:
+        weights = [psp.logDensity(value, args)
+                   for (value, args) in zip(values, args_batch)]
+      else:
+        weights = psp.logDensityMany(values, args_batch)
+      nans = np.flatnonzero(np.isnan(weights))
+      assert len(nans) == 0, "Got NaN weight applying %s to %s" \
+        % (psp, args_batch[nans[0]].operandValues())
+      weight += np.sum(weights)
+    self.batches.clear()
+    return float(weight)
@@ -39,6 +39,7 @@ from venture.lite.psp import DeterministicMakerAAAPSP
 from venture.lite.psp import NullRequestPSP
 from venture.lite.psp import RandomPSP
 from venture.lite.psp import TypedPSP
+from venture.lite.psp import VectorizedRandomPSP
 from venture.lite.sp import SP
 from venture.lite.sp import SPAux
 from venture.lite.sp import SPType
@@ -310,7 +311,7 @@ registerBuiltinSP("wishart", typed_nr(WishartOutputPSP(),
   [t.SymmetricMatrixType(), t.PositiveType()], t.SymmetricMatrixType()))
 
 
-class NormalOutputPSP(RandomPSP):
+class NormalOutputPSP(VectorizedRandomPSP):
   # TODO don't need to be class methods
   def simulateNumeric(self, params, np_rng):
     mu, sigma = params
@@ -322,6 +323,16 @@ class NormalOutputPSP(RandomPSP):
     return - math.log(sigma) - HALF_LOG2PI \
       - (0.5 * deviation * deviation / (sigma * sigma))
 
+  def simulateColumns(self, n, params, np_rng):
+    (mu, sigma) = params
+    return np_rng.normal(loc=mu, scale=sigma, size=n)
+
+  def logDensityColumns(self, xs, params):
+    (mu, sigma) = params
+    deviation = xs - mu
+    return - np.log(sigma) - HALF_LOG2PI \
+      - (0.5 * deviation * deviation / (sigma * sigma))
+
   def logDensityBoundNumeric(self, x, mu, sigma):
     if sigma is not None:
       return -(math.log(sigma) + HALF_LOG2PI)
@@ -487,7 +498,7 @@ generic_normal = dispatching_psp(
 registerBuiltinSP("normal", no_request(generic_normal))
 
 
-class LogNormalOutputPSP(RandomPSP):
+class LogNormalOutputPSP(VectorizedRandomPSP):
   def simulate(self, args):
     mu, sigma = args.operandValues()
     return exp(args.np_prng().normal(loc=mu, scale=sigma))
@@ -514,6 +525,19 @@ class LogNormalOutputPSP(RandomPSP):
     return -logx - log(sigma) - HALF_LOG2PI \
       - (deviation*deviation/(2*sigma*sigma))
 
+  def simulateColumns(self, n, params, np_rng):
+    (mu, sigma) = params
+    with np.errstate(over='ignore'):
+      return np.exp(np_rng.normal(loc=mu, scale=sigma, size=n))
+
+  def logDensityColumns(self, xs, params):
+    (mu, sigma) = params
+    with np.errstate(divide='ignore'):
+      logx = np.log(xs)
+      deviation = logx - mu
+      return -logx - np.log(sigma) - HALF_LOG2PI \
+        - (deviation*deviation/(2*sigma*sigma))
+
   def logDensityBound(self, x, args):
     # d[-log x - log sigma - 0.5 log 2pi - (log x - mu)^2/(2 sigma^2)]
     # = -1/x dx - 1/sigma dsigma - d[(log x - mu)^2/(2 sigma^2)]
@@ -631,7 +655,7 @@ registerBuiltinSP("vonmises", typed_nr(VonMisesOutputPSP(),
   [t.NumberType(), t.PositiveType()], t.NumberType()))
 
 
-class UniformOutputPSP(RandomPSP):
+class UniformOutputPSP(VectorizedRandomPSP):
   # TODO don't need to be class methods
   def simulateNumeric(self, low, high, np_rng):
     return np_rng.uniform(low=low, high=high)
@@ -639,6 +663,14 @@ class UniformOutputPSP(RandomPSP):
   def logDensityNumeric(self, x, low, high):
     return scipy.stats.uniform.logpdf(x, low, high-low)
 
+  def simulateColumns(self, n, params, np_rng):
+    (low, high) = params
+    return np_rng.uniform(low=low, high=high, size=n)
+
+  def logDensityColumns(self, xs, params):
+    (low, high) = params
+    return scipy.stats.uniform.logpdf(xs, low, high-low)
+
   def logDensityBoundNumeric(self, _, low, high):
     if low is None or high is None:
       # Unbounded
@@ -726,7 +758,7 @@ registerBuiltinSP("log_odds_uniform", typed_nr(LogOddsUniformOutputPSP(),
   [], t.NumberType()))
 
 
-class BetaOutputPSP(RandomPSP):
+class BetaOutputPSP(VectorizedRandomPSP):
   # TODO don't need to be class methods
   def simulateNumeric(self, params, np_rng):
     alpha, beta = params
@@ -858,6 +890,23 @@ class BetaOutputPSP(RandomPSP):
   def logDensityNumeric(self, x, params):
     return scipy.stats.beta.logpdf(x,*params)
 
+  def simulateColumns(self, n, params, np_rng):
+    (alpha, beta) = params
+    # The ratio of Gammas that simulateNumeric uses when either
+    # pseudocount exceeds 1 vectorizes; its other cases are taken one
+    # at a time.
+    easy = ((alpha > 1) | (beta > 1)) & (np.minimum(alpha, beta) >= 1e-300)
+    ans = np.empty(n)
+    G = np_rng.gamma(shape=alpha[easy])
+    H = np_rng.gamma(shape=beta[easy])
+    ans[easy] = G/(G + H)
+    for i in np.flatnonzero(~easy):
+      ans[i] = self.simulateNumeric([alpha[i], beta[i]], np_rng)
+    return ans
+
+  def logDensityColumns(self, xs, params):
+    return scipy.stats.beta.logpdf(xs, *params)
+
   def simulate(self, args):
     return self.simulateNumeric(args.operandValues(), args.np_prng())
 
@@ -1128,7 +1177,7 @@ registerBuiltinSP("log_odds_beta", typed_nr(LogOddsBetaOutputPSP(),
   [t.PositiveType(), t.PositiveType()], t.NumberType()))
 
 
-class ExponOutputPSP(RandomPSP):
+class ExponOutputPSP(VectorizedRandomPSP):
   # TODO don't need to be class methods
   def simulateNumeric(self, theta, np_rng):
     return np_rng.exponential(scale=1.0/theta)
@@ -1136,6 +1185,14 @@ class ExponOutputPSP(RandomPSP):
   def logDensityNumeric(self, x, theta):
     return scipy.stats.expon.logpdf(x,scale=1.0/theta)
 
+  def simulateColumns(self, n, params, np_rng):
+    (theta,) = params
+    return np_rng.exponential(scale=1.0/theta, size=n)
+
+  def logDensityColumns(self, xs, params):
+    (theta,) = params
+    return scipy.stats.expon.logpdf(xs, scale=1.0/theta)
+
   def simulate(self,args):
     return self.simulateNumeric(*(args.operandValues() +
                                   [args.np_prng()]))
@@ -1158,7 +1215,7 @@ registerBuiltinSP("expon", typed_nr(ExponOutputPSP(),
   [t.PositiveType()], t.PositiveType()))
 
 
-class GammaOutputPSP(RandomPSP):
+class GammaOutputPSP(VectorizedRandomPSP):
   # TODO don't need to be class methods
   def simulateNumeric(self, alpha, beta, np_rng):
     return np_rng.gamma(shape=alpha, scale=1.0/beta)
@@ -1166,6 +1223,14 @@ class GammaOutputPSP(RandomPSP):
   def logDensityNumeric(self, x, alpha, beta):
     return scipy.stats.gamma.logpdf(x, alpha, scale=1.0/beta)
 
+  def simulateColumns(self, n, params, np_rng):
+    (alpha, beta) = params
+    return np_rng.gamma(shape=alpha, scale=1.0/beta, size=n)
+
+  def logDensityColumns(self, xs, params):
+    (alpha, beta) = params
+    return scipy.stats.gamma.logpdf(xs, alpha, scale=1.0/beta)
+
   def simulate(self, args):
     return self.simulateNumeric(*(args.operandValues() +
                                   [args.np_prng()]))
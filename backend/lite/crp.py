@@ -31,11 +31,11 @@ with valid domains will result in dangerous behavior.
 """
 
 from collections import OrderedDict
-from copy import deepcopy
 from weakref import WeakKeyDictionary
 import itertools
 import math
 
+import numpy as np
 from scipy.special import digamma, gammaln
 
 from venture.lite.orderedset import OrderedSet
@@ -51,14 +51,137 @@ from venture.lite.sp_help import typed_nr
 from venture.lite.sp_registry import registerBuiltinSP
 from venture.lite.sp_use import MockArgs
 from venture.lite.utils import logsumexp
-from venture.lite.utils import simulateCategorical
 import venture.lite.types as t
 
+class CRPTables(object):
+  """The occupied tables of a CRP and their customer counts.
+
+  Each occupied table holds a slot in a growable array of counts;
+  the slots of emptied tables go on a free list for reuse.  Two
+  Fenwick trees over the slots (kept as lists, which are quicker than
+  arrays to update one entry at a time), one of counts and one of occupancy,
+  give the total weight sum(count - d) of any prefix of the slots in
+  O(log K) for whatever discount d the CRP has, which is what seating
+  a customer needs.  The capacity is rounded up to a power of two, as
+  the descent in find requires.
+  """
+  def __init__(self, capacity=8):
+    capacity = 1 << max(capacity - 1, 0).bit_length()
+    # table -> slot, in the order the tables were first seated
+    self.slots = OrderedDict()
+    self.tables = [None] * capacity # slot -> table
+    self.counts = np.zeros(capacity, dtype=int)
+    self.countTree = [0] * (capacity + 1)
+    self.occupiedTree = [0] * (capacity + 1)
+    self.freeSlots = range(capacity - 1, -1, -1)
+    # Table numbers emptied and not yet reused, oldest first
+    self.freeTables = OrderedSet()
+
+  def copy(self):
+    ans = CRPTables.__new__(CRPTables)
+    ans.slots = self.slots.copy()
+    ans.tables = list(self.tables)
+    ans.counts = self.counts.copy()
+    ans.countTree = list(self.countTree)
+    ans.occupiedTree = list(self.occupiedTree)
+    ans.freeSlots = list(self.freeSlots)
+    ans.freeTables = self.freeTables.copy()
+    return ans
+
+  def __contains__(self, table): return table in self.slots
+  def __len__(self): return len(self.slots)
+
+  def count(self, table):
+    slot = self.slots.get(table)
+    return 0 if slot is None else int(self.counts[slot])
+
+  def occupied(self):
+    """The occupied tables, in the order they were first seated."""
+    return list(self.slots)
+
+  def occupiedCounts(self):
+    return self.counts[self.counts > 0]
+
+  def seat(self, table):
+    """Seat a customer at table, returning whether it was empty."""
+    slot = self.slots.get(table)
+    if slot is not None:
+      self.counts[slot] += 1
+      _tree_add(self.countTree, slot, 1)
+      return False
+    if not self.freeSlots:
+      self._grow()
+    slot = self.freeSlots.pop()
+    self.slots[table] = slot
+    self.tables[slot] = table
+    self.counts[slot] = 1
+    _tree_add(self.countTree, slot, 1)
+    _tree_add(self.occupiedTree, slot, 1)
+    return True
+
+  def unseat(self, table):
+    """Unseat a customer from table, returning whether it is now empty."""
+    slot = self.slots[table]
+    self.counts[slot] -= 1
+    _tree_add(self.countTree, slot, -1)
+    if self.counts[slot] > 0:
+      return False
+    _tree_add(self.occupiedTree, slot, -1)
+    del self.slots[table]
+    self.tables[slot] = None
+    self.freeSlots.append(slot)
+    return True
+
+  def find(self, u, d):
+    """The occupied table in whose share of [0, sum(count - d)) u falls."""
+    (countTree, occupiedTree) = (self.countTree, self.occupiedTree)
+    n = len(self.tables)
+    pos = 0
+    step = n # A power of two, by construction
+    while step > 0:
+      nxt = pos + step
+      if nxt <= n:
+        w = countTree[nxt] - d * occupiedTree[nxt]
+        if w <= u:
+          pos = nxt
+          u -= w
+      step >>= 1
+    # Rounding may carry u past the last occupied slot.
+    while pos >= n or self.tables[pos] is None:
+      pos = (pos if pos < n else n) - 1
+    return self.tables[pos]
+
+  def _grow(self):
+    n = len(self.tables)
+    self.tables.extend([None] * n)
+    self.counts = np.concatenate([self.counts, np.zeros(n, dtype=int)])
+    self.countTree = _tree_build(self.counts)
+    self.occupiedTree = _tree_build((self.counts > 0).astype(int))
+    self.freeSlots.extend(range(2 * n - 1, n - 1, -1))
+
+def _tree_add(tree, slot, delta):
+  i = slot + 1
+  n = len(tree) - 1
+  while i <= n:
+    tree[i] += delta
+    i += i & -i
+
+def _tree_build(values):
+  """The Fenwick tree of values, whose ith entry sums values[i - (i & -i):i]."""
+  cumulative = np.concatenate([[0], np.cumsum(values)])
+  i = np.arange(1, len(values) + 1)
+  return [0] + (cumulative[i] - cumulative[i - (i & -i)]).tolist()
+
 class CRPSPAux(SPAux):
+  """The seating of a CRP.
+
+  The tables are shared between copies until one of them seats or
+  unseats a customer, so that forking many particles of a model with
+  many tables does not copy them all."""
   def __init__(self):
-    self.tableCounts = OrderedDict()
+    self._tables = CRPTables()
+    self._shared = False
     self.nextTable = 1
-    self.freeTables = OrderedSet()
     self.numTables = 0
     self.numCustomers = 0
 
@@ -67,14 +190,33 @@ class CRPSPAux(SPAux):
 
   def copy(self):
     crp = CRPSPAux()
-    crp.tableCounts = deepcopy(self.tableCounts)
+    crp._tables = self._tables
+    crp._shared = self._shared = True
     crp.nextTable = self.nextTable
-    crp.freeTables = self.freeTables.copy()
     crp.numTables = self.numTables
     crp.numCustomers = self.numCustomers
     crp.cachedTables = WeakKeyDictionary(self.cachedTables)
     return crp
 
+  @property
+  def tables(self):
+    """The CRPTables, for reading only."""
+    return self._tables
+
+  def writableTables(self):
+    if self._shared:
+      self._tables = self._tables.copy()
+      self._shared = False
+    return self._tables
+
+  @property
+  def freeTables(self): return self._tables.freeTables
+
+  @property
+  def tableCounts(self):
+    return OrderedDict((table, self._tables.count(table))
+                       for table in self._tables.occupied())
+
   def cts(self):
     # XXX Check that this is the correct way to return suffstats.
     return [self.tableCounts, self.numTables, self.numCustomers]
@@ -108,7 +250,7 @@ class MakeCRPOutputPSP(DeterministicMakerAAAPSP):
     if len(vals) == 2 and vals[1] != 0:
       raise ValueError('Gradient of CRP implemented only for one-parameter '
         'case.')
-    [_, numTables, numCustomers] = aux.cts()
+    (numTables, numCustomers) = (aux.numTables, aux.numCustomers)
     return [numTables/alpha - (digamma(alpha + numCustomers) - digamma(alpha))]
 
   def description(self, name):
@@ -123,18 +265,20 @@ class CRPOutputPSP(RandomPSP):
 
   def simulate(self, args):
     aux = args.spaux()
-    oldTables = [i for i in aux.tableCounts]
-    counts = [aux.tableCounts[i] - self.d for i in oldTables] + \
-        [self.alpha + (aux.numTables * self.d)]
-    nextTable = aux.nextTable if len(aux.freeTables) == 0 \
-        else iter(aux.freeTables).next()
-    allTables = oldTables + [nextTable]
-    return simulateCategorical(counts, args.np_prng(), allTables)
+    seated = aux.numCustomers - aux.numTables * self.d
+    new = self.alpha + (aux.numTables * self.d)
+    u = args.np_prng().random_sample() * (seated + new)
+    if u < seated:
+      return aux.tables.find(u, self.d)
+    elif len(aux.freeTables) == 0:
+      return aux.nextTable
+    else:
+      return iter(aux.freeTables).next()
 
   def logDensity(self, table, args):
     aux = args.spaux()
-    if table in aux.tableCounts:
-      return math.log(aux.tableCounts[table] - self.d) - \
+    if table in aux.tables:
+      return math.log(aux.tables.count(table) - self.d) - \
         math.log(self.alpha + aux.numCustomers)
     else:
       return math.log(self.alpha + (aux.numTables * self.d)) - \
@@ -143,13 +287,11 @@ class CRPOutputPSP(RandomPSP):
   def incorporate(self, table, args):
     aux = args.spaux()
     aux.numCustomers += 1
-    if table in aux.tableCounts:
-      aux.tableCounts[table] += 1
-    else:
-      aux.tableCounts[table] = 1
+    tables = aux.writableTables()
+    if tables.seat(table):
       aux.numTables += 1
-      if table in aux.freeTables:
-        aux.freeTables.discard(table)
+      if table in tables.freeTables:
+        tables.freeTables.discard(table)
       else:
         aux.nextTable = max(table+1, aux.nextTable)
     if args.node in aux.cachedTables:
@@ -158,11 +300,10 @@ class CRPOutputPSP(RandomPSP):
   def unincorporate(self, table, args):
     aux = args.spaux()
     aux.numCustomers -= 1
-    aux.tableCounts[table] -= 1
-    if aux.tableCounts[table] == 0:
+    tables = aux.writableTables()
+    if tables.unseat(table):
       aux.numTables -= 1
-      del aux.tableCounts[table]
-      aux.freeTables.add(table)
+      tables.freeTables.add(table)
       aux.cachedTables[args.node] = table
 
   def logDensityOfData(self, aux):
@@ -174,17 +315,37 @@ class CRPOutputPSP(RandomPSP):
     # log( (foo+1)_{bar-1} ) in the notation of sp-math.tex turns into
     # gammaln(foo+bar) - gammaln(foo+1)
     # TODO No doubt there is a numerically better way to compute this quantity.
-    term1 = sum(math.log(self.alpha + i*self.d)
-      for i in xrange(1, aux.numTables))
-    term2 = sum(gammaln(aux.tableCounts[t]-self.d) - gammaln(1-self.d)
-      for t in aux.tableCounts)
+    term1 = self._logRisingFactorial(aux.numTables)
+    term2 = np.sum(gammaln(aux.tables.occupiedCounts() - self.d)) - \
+        aux.numTables * gammaln(1 - self.d)
     term3 = gammaln(self.alpha + max(aux.numCustomers, 1)) - \
         gammaln(self.alpha+1)
     return term1 + term2 - term3
 
+  def _logRisingFactorial(self, numTables):
+    """sum(log(alpha + i*d) for i in 1..numTables-1), in closed form
+    unless the discount is small relative to alpha."""
+    (alpha, d) = (self.alpha, self.d)
+    if numTables <= 1:
+      return 0
+    elif d == 0:
+      return (numTables - 1) * math.log(alpha)
+    elif abs(alpha / d) > 1e4:
+      # The gammaln terms below are then large and nearly cancel the
+      # log d term, losing most of the precision of the difference.
+      return (numTables - 1) * math.log(alpha) + \
+        np.sum(np.log1p(np.arange(1, numTables) * (d / alpha)))
+    elif d > 0:
+      return gammaln(alpha/d + numTables) - gammaln(alpha/d + 1) + \
+        (numTables - 1) * math.log(d)
+    else:
+      # alpha + i*d = -d * (-alpha/d - i), positive while i < -alpha/d
+      return gammaln(-alpha/d) - gammaln(-alpha/d - numTables + 1) + \
+        (numTables - 1) * math.log(-d)
+
   def enumerateValues(self, args):
     aux = args.spaux()
-    tables = aux.tableCounts.keys()
+    tables = aux.tables.occupied()
     # If there were recently unincorporated applications that emptied
     # tables, offer those as possibilities.  Otherwise, offer the next
     # unseated table.
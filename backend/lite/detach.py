@@ -16,7 +16,10 @@
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
 import math
+import time
 
+from venture.lite.batch import MIN_BATCH
+from venture.lite.batch import DensityBatch
 from venture.lite.node import isConstantNode
 from venture.lite.node import isLookupNode
 from venture.lite.node import isApplicationNode
@@ -43,38 +46,59 @@ def detachAndExtractAtBorder(trace, border, scaffold, compute_gradient = False):
   the weight with respect to the value at each node.  The latter is
   computed by one level of reverse-mode AD, with the underlying trace
   serving as tape."""
+  summary = trace.proposal_summary if trace.profiling_enabled else None
+  if summary is not None:
+    start = time.time()
   weight = 0
   omegaDB = OmegaDB()
+  # Score the border's many applications of any one batchable PSP
+  # together, unless their gradients are wanted too
+  if len(border) >= MIN_BATCH and not compute_gradient:
+    batch = DensityBatch()
+  else:
+    batch = None
   for node in reversed(border):
     if scaffold.isAbsorbing(node):
-      weight += detach(trace, node, scaffold, omegaDB, compute_gradient)
+      weight += detach(trace, node, scaffold, omegaDB, compute_gradient, batch)
     else:
-      if node.isObservation: weight += getAndUnconstrain(trace,node)
+      if node.isObservation: weight += getAndUnconstrain(trace, node, batch)
       weight += extract(trace,node,scaffold,omegaDB, compute_gradient)
+  if batch is not None:
+    weight += batch.weight()
+  if summary is not None:
+    summary.detach_time += time.time() - start
   return weight,omegaDB
 
-def getAndUnconstrain(trace,node):
-  return unconstrain(trace,trace.getConstrainableNode(node))
+def getAndUnconstrain(trace, node, batch=None):
+  return unconstrain(trace, trace.getConstrainableNode(node), batch)
 
-def unconstrain(trace,node):
+def unconstrain(trace, node, batch=None):
   psp,args,value = trace.pspAt(node),trace.argsAt(node),trace.valueAt(node)
   trace.unregisterConstrainedChoice(node)
   psp.unincorporate(value,args)
-  weight = psp.logDensity(value,args)
+  if batch is not None and psp.canBatch():
+    batch.add(psp, value, args)
+    weight = 0
+  else:
+    weight = psp.logDensity(value,args)
   psp.incorporate(value,args)
   return weight
 
-def detach(trace, node, scaffold, omegaDB, compute_gradient = False):
-  weight = unabsorb(trace, node, omegaDB, compute_gradient)
+def detach(trace, node, scaffold, omegaDB, compute_gradient = False,
+           batch=None):
+  weight = unabsorb(trace, node, omegaDB, compute_gradient, batch)
   weight += extractParents(trace, node, scaffold, omegaDB, compute_gradient)
   return weight
 
-def unabsorb(trace, node, omegaDB, compute_gradient = False):
+def unabsorb(trace, node, omegaDB, compute_gradient = False, batch=None):
   # we need to pass groundValue here in case the return value is an SP
   # in which case the node would only contain an SPRef
   psp,args,gvalue = trace.pspAt(node),trace.argsAt(node),trace.groundValueAt(node)
   maybeUnregisterRandomChoiceInScope(trace, node)
   psp.unincorporate(gvalue,args)
+  if batch is not None and psp.canBatch():
+    batch.add(psp, gvalue, args)
+    return 0
   weight = psp.logDensity(gvalue,args)
   if compute_gradient:
     # Ignore the partial derivative of the value because the value is fixed
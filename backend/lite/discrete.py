@@ -18,6 +18,7 @@
 import math
 from collections import OrderedDict
 
+import numpy as np
 import scipy
 import scipy.special
 
@@ -28,6 +29,7 @@ from venture.lite.psp import DeterministicMakerAAAPSP
 from venture.lite.psp import NullRequestPSP
 from venture.lite.psp import RandomPSP
 from venture.lite.psp import TypedPSP
+from venture.lite.psp import VectorizedRandomPSP
 from venture.lite.sp import SP
 from venture.lite.sp import SPAux
 from venture.lite.sp import SPType
@@ -52,7 +54,7 @@ class DiscretePSP(RandomPSP):
     return 0
 
 
-class BernoulliOutputPSP(DiscretePSP):
+class BernoulliOutputPSP(DiscretePSP, VectorizedRandomPSP):
   def simulate(self, args):
     vals = args.operandValues()
     p = vals[0] if vals else 0.5
@@ -66,6 +68,15 @@ class BernoulliOutputPSP(DiscretePSP):
     else:
       return log1p(-p)
 
+  def simulateColumns(self, n, params, np_rng):
+    p = params[0] if params else 0.5
+    return np_rng.uniform(size=n) < p
+
+  def logDensityColumns(self, vals, params):
+    p = params[0] if params else np.repeat(0.5, len(vals))
+    with np.errstate(divide='ignore'):
+      return np.where(vals != 0, np.log(p), np.log1p(-p))
+
   def gradientOfLogDensity(self, val, args):
     vals = args.operandValues()
     if len(vals) > 0:
@@ -178,7 +189,7 @@ registerBuiltinSP("log_odds_bernoulli", typed_nr(LogOddsBernoulliOutputPSP(),
   [t.NumberType()], t.IntegerType()))
 
 
-class BinomialOutputPSP(DiscretePSP):
+class BinomialOutputPSP(DiscretePSP, VectorizedRandomPSP):
   def simulate(self, args):
     (n, p) = args.operandValues()
     return args.np_prng().binomial(n, p)
@@ -187,6 +198,14 @@ class BinomialOutputPSP(DiscretePSP):
     (n,p) = args.operandValues()
     return scipy.stats.binom.logpmf(val,n,p)
 
+  def simulateColumns(self, n, params, np_rng):
+    (trials, p) = params
+    return np_rng.binomial(trials.astype(int), p, size=n)
+
+  def logDensityColumns(self, vals, params):
+    (trials, p) = params
+    return scipy.stats.binom.logpmf(vals, trials, p)
+
   def enumerateValues(self, args):
     (n,p) = args.operandValues()
     if p == 1:
@@ -338,7 +357,7 @@ registerBuiltinSP("uniform_discrete", typed_nr(UniformDiscreteOutputPSP(),
   [t.IntegerType(), t.IntegerType()], t.IntegerType()))
 
 
-class PoissonOutputPSP(DiscretePSP):
+class PoissonOutputPSP(DiscretePSP, VectorizedRandomPSP):
   def simulate(self, args):
     (lam,) = args.operandValues()
     return args.np_prng().poisson(lam=lam)
@@ -346,6 +365,14 @@ class PoissonOutputPSP(DiscretePSP):
   def logDensity(self, val, args):
     return scipy.stats.poisson.logpmf(val, args.operandValues()[0])
 
+  def simulateColumns(self, n, params, np_rng):
+    (lam,) = params
+    return np_rng.poisson(lam=lam, size=n)
+
+  def logDensityColumns(self, vals, params):
+    (lam,) = params
+    return scipy.stats.poisson.logpmf(vals, lam)
+
   def description(self, name):
     return '  %s(mu) samples a Poisson with rate mu' % name
 
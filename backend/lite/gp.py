@@ -40,15 +40,15 @@ import venture.lite.types as t
 import venture.lite.value as v
 import venture.value.dicts as vv
 
-def _gp_sample(mean, covariance, samples, xs, np_rng):
-  mu, sigma = _gp_mvnormal(mean, covariance, samples, xs)
+def _gp_sample(mean, covariance, samples, xs, np_rng, factor=None):
+  mu, sigma = _gp_mvnormal(mean, covariance, samples, xs, factor)
   return np_rng.multivariate_normal(mu, sigma)
 
-def _gp_logDensity(mean, covariance, samples, xs, os):
-  mu, sigma = _gp_mvnormal(mean, covariance, samples, xs)
+def _gp_logDensity(mean, covariance, samples, xs, os, factor=None):
+  mu, sigma = _gp_mvnormal(mean, covariance, samples, xs, factor)
   return mvnormal.logpdf(np.asarray(os).reshape(len(xs),), mu, sigma)
 
-def _gp_gradientOfLogDensity(mean, covariance, samples, xs, os):
+def _gp_gradientOfLogDensity(mean, covariance, samples, xs, os, factor=None):
   # d/do_1 log P(o_1 | Mu, Sigma, x_1, X_2, O_2),
   # d/dx_1 log P(o_1 | Mu, Sigma, x_1, X_2, O_2)
   xs1 = xs
@@ -60,9 +60,14 @@ def _gp_gradientOfLogDensity(mean, covariance, samples, xs, os):
   dos1 = []
 
   if samples:
-    mu2 = mean.f(xs2)
-    sigma22 = covariance.f(xs2, xs2)
-    covf22 = mvnormal._covariance_factor(sigma22) # XXX Expose?
+    if factor is not None:
+      mu2 = factor.mu
+      sigma22 = None
+      covf22 = factor.covf()
+    else:
+      mu2 = mean.f(xs2)
+      sigma22 = covariance.f(xs2, xs2)
+      covf22 = mvnormal._covariance_factor(sigma22) # XXX Expose?
     alpha2 = covf22.solve(os2 - mu2)
 
   for x1, o1 in zip(xs1, os1):
@@ -80,7 +85,7 @@ def _gp_gradientOfLogDensity(mean, covariance, samples, xs, os):
         '%r %r %r' % (x1, dsigma12_dx1, np.asarray(x1).reshape(-1).shape)
       sigma21 = sigma12.T
       mu_, sigma_ = mvnormal.conditional(
-        os2, mu1, mu2, sigma11, sigma12, sigma21, sigma22)
+        os2, mu1, mu2, sigma11, sigma12, sigma21, sigma22, covf22)
       dmu_ = dmu1_dx1 + np.dot(dsigma12_dx1, alpha2)
       dsigma_ = dsigma11_dx1 - np.dot(dsigma12_dx1, covf22.solve(sigma21))
     else:
@@ -93,9 +98,11 @@ def _gp_gradientOfLogDensity(mean, covariance, samples, xs, os):
 
   return np.array(dos1), [np.array(dxs1)]
 
-def _gp_logDensityOfData(mean, covariance, samples):
+def _gp_logDensityOfData(mean, covariance, samples, factor=None):
   if len(samples) == 0:
     return 0
+  if factor is not None:
+    return mvnormal.logpdf_factored(factor.os - factor.mu, factor.covf())
   xs = np.asarray(samples.keys())
   os = np.asarray(samples.values())
   mu = mean.f(xs)
@@ -114,11 +121,20 @@ def _gp_gradientOfLogDensityOfData(mean, covariance, samples):
     mvnormal.dlogpdf(os, dos, mu, dmu, sigma, dsigma)
   return [dlogp_dmu_j, dlogp_dsigma_k]
 
-def _gp_mvnormal(mean, covariance, samples, xs):
+def _gp_mvnormal(mean, covariance, samples, xs, factor=None):
   xs = np.asarray(xs)
   if len(samples) == 0:
     mu = mean.f(xs)
     sigma = covariance.f(xs, xs)
+  elif factor is not None:
+    x2s = factor.xs()
+    mu1 = mean.f(xs)
+    sigma11 = covariance.f(xs, xs)
+    sigma12 = covariance.f(xs, x2s)
+    sigma21 = covariance.f(x2s, xs)
+    mu, sigma = mvnormal.conditional(
+      factor.os, mu1, factor.mu, sigma11, sigma12, sigma21, None,
+      factor.covf())
   else:
     x2s = np.asarray(samples.keys())
     o2s = np.asarray(samples.values())
@@ -132,77 +148,82 @@ def _gp_mvnormal(mean, covariance, samples, xs):
       o2s, mu1, mu2, sigma11, sigma12, sigma21, sigma22)
   return mu, sigma
 
+def _sample_key(x):
+  return tuple(x) if isinstance(x, np.ndarray) else x
+
 class GPOutputPSP(RandomPSP):
   def __init__(self, mean, covariance):
     self.mean = mean
     self.covariance = covariance
 
   def simulate(self, args):
-    samples = args.spaux().samples
+    aux = args.spaux()
     xs = args.operandValues()[0]
-    return _gp_sample(self.mean, self.covariance, samples, xs,
-                      args.np_prng())
+    return _gp_sample(self.mean, self.covariance, aux.samples, xs,
+                      args.np_prng(), aux.factor(self.mean, self.covariance))
 
   def logDensity(self, os, args):
-    samples = args.spaux().samples
+    aux = args.spaux()
     xs = args.operandValues()[0]
-    return _gp_logDensity(self.mean, self.covariance, samples, xs, os)
+    return _gp_logDensity(self.mean, self.covariance, aux.samples, xs, os,
+                          aux.factor(self.mean, self.covariance))
 
   def gradientOfLogDensity(self, os, args):
-    samples = args.spaux().samples
+    aux = args.spaux()
     xs = args.operandValues()[0]
     return _gp_gradientOfLogDensity(
-      self.mean, self.covariance, samples, xs, os)
+      self.mean, self.covariance, aux.samples, xs, os,
+      aux.factor(self.mean, self.covariance))
 
   def logDensityOfData(self, aux):
-    ans = _gp_logDensityOfData(self.mean, self.covariance, aux.samples)
+    ans = _gp_logDensityOfData(self.mean, self.covariance, aux.samples,
+                               aux.factor(self.mean, self.covariance))
     assert not np.isnan(ans), \
       "GP got NaN log density of data at %s, %s, %s" \
       % (self.mean, self.covariance, aux.samples)
     return ans
 
   def incorporate(self, os, args):
-    samples = args.spaux().samples
+    aux = args.spaux()
     xs = args.operandValues()[0]
-
     for x, o in zip(xs, os):
-      samples[tuple(x) if isinstance(x, np.ndarray) else x] = o
+      aux.incorporate(self.mean, self.covariance, _sample_key(x), o)
 
   def unincorporate(self, _os, args):
-    samples = args.spaux().samples
+    aux = args.spaux()
     xs = args.operandValues()[0]
     for x in xs:
-      del samples[tuple(x) if isinstance(x, np.ndarray) else x]
+      aux.unincorporate(self.mean, self.covariance, _sample_key(x))
 
 class GPOutputPSP1(GPOutputPSP):
   # version of GPOutputPSP that accepts and returns scalars.
 
   def simulate(self, args):
-    samples = args.spaux().samples
+    aux = args.spaux()
     x = args.operandValues()[0]
-    return _gp_sample(self.mean, self.covariance, samples, [x],
-                      args.np_prng())[0]
+    return _gp_sample(self.mean, self.covariance, aux.samples, [x],
+                      args.np_prng(), aux.factor(self.mean, self.covariance))[0]
 
   def logDensity(self, o, args):
-    samples = args.spaux().samples
+    aux = args.spaux()
     x = args.operandValues()[0]
-    return _gp_logDensity(self.mean, self.covariance, samples, [x], [o])
+    return _gp_logDensity(self.mean, self.covariance, aux.samples, [x], [o],
+                          aux.factor(self.mean, self.covariance))
 
   def gradientOfLogDensity(self, o, args):
-    samples = args.spaux().samples
+    aux = args.spaux()
     x = args.operandValues()
     return _gp_gradientOfLogDensity(
-      self.mean, self.covariance, samples, [x], [o])
+      self.mean, self.covariance, aux.samples, [x], [o],
+      aux.factor(self.mean, self.covariance))
 
   def incorporate(self, o, args):
-    samples = args.spaux().samples
     x = args.operandValues()[0]
-    samples[x] = o
+    args.spaux().incorporate(self.mean, self.covariance, x, o)
 
   def unincorporate(self, _o, args):
-    samples = args.spaux().samples
     x = args.operandValues()[0]
-    del samples[x]
+    args.spaux().unincorporate(self.mean, self.covariance, x)
 
 gpType = SPType(
   [t.ArrayUnboxedType(t.NumericArrayType())],
@@ -210,13 +231,113 @@ gpType = SPType(
 
 gp1Type = SPType([t.NumberType()], t.NumberType())
 
+class GPFactor(object):
+  """Cholesky factor of the covariance of a GP at its observed inputs.
+
+  Records the mean and covariance functions it was computed with, so
+  that it can be discarded when they change (e.g., when the
+  hyperparameters of an AAA GP are resampled).  Adding or removing an
+  observation produces a new GPFactor in O(n^2) time, leaving this
+  one intact, so auxen copied for particles may share it.
+  """
+
+  def __init__(self, mean, covariance, keys, os, mu, L):
+    self.mean = mean
+    self.covariance = covariance
+    self.keys = keys # Parallel to the samples of the aux
+    self.os = os
+    self.mu = mu
+    self.L = L
+
+  @staticmethod
+  def compute(mean, covariance, samples):
+    """Factor from scratch, in O(n^3) time.  None if not positive-definite."""
+    keys = samples.keys()
+    xs = np.asarray(keys)
+    if len(keys) == 0:
+      mu = np.zeros(0)
+      L = np.zeros((0, 0))
+    else:
+      mu = mean.f(xs)
+      try:
+        L = np.linalg.cholesky(covariance.f(xs, xs))
+      except np.linalg.LinAlgError:
+        return None
+    return GPFactor(mean, covariance, keys, np.asarray(samples.values()),
+                    mu, L)
+
+  def computed_with(self, mean, covariance):
+    return self.mean is mean and self.covariance is covariance
+
+  def xs(self):
+    return np.asarray(self.keys)
+
+  def covf(self):
+    return mvnormal.Covariance_Triangular(self.L)
+
+  def extended(self, x, o):
+    """Factor with the observation o at x appended.  None if not
+    positive-definite."""
+    x_ = np.asarray([x])
+    if len(self.keys) == 0:
+      b = np.zeros(0)
+    else:
+      b = self.covariance.f(self.xs(), x_)[:, 0]
+    c = self.covariance.f(x_, x_)[0, 0]
+    L = mvnormal.cholesky_append(self.L, b, c)
+    if L is None:
+      return None
+    return GPFactor(self.mean, self.covariance, self.keys + [x],
+                    np.append(self.os, o), np.append(self.mu, self.mean.f(x_)),
+                    L)
+
+  def reduced(self, x):
+    """Factor with the observation at x removed."""
+    i = self.keys.index(x)
+    return GPFactor(self.mean, self.covariance,
+                    self.keys[:i] + self.keys[i+1:], np.delete(self.os, i),
+                    np.delete(self.mu, i), mvnormal.cholesky_delete(self.L, i))
+
 class GPSPAux(SPAux):
 
-  def __init__(self, samples):
+  def __init__(self, samples, cached_factor=None):
     self.samples = samples
+    self.cached_factor = cached_factor
 
   def copy(self):
-    return GPSPAux(copy.copy(self.samples))
+    # The factor is never mutated, so can be shared.
+    return GPSPAux(copy.copy(self.samples), self.cached_factor)
+
+  def factor(self, mean, covariance):
+    """The Cholesky factor of the covariance at the observed inputs,
+    or None if it is unavailable (because not positive-definite)."""
+    if self.cached_factor is None or \
+       not self.cached_factor.computed_with(mean, covariance):
+      self.cached_factor = GPFactor.compute(mean, covariance, self.samples)
+    return self.cached_factor
+
+  def incorporate(self, mean, covariance, x, o):
+    factor = self.cached_factor
+    if not self.samples:
+      # Trivial to start from scratch
+      factor = GPFactor.compute(mean, covariance, self.samples)
+    if x in self.samples:
+      # Overwriting an existing observation; refactor lazily.
+      self.cached_factor = None
+    elif factor is not None and factor.computed_with(mean, covariance):
+      self.cached_factor = factor.extended(x, o)
+    else:
+      self.cached_factor = None
+    self.samples[x] = o
+
+  def unincorporate(self, mean, covariance, x):
+    factor = self.cached_factor
+    del self.samples[x]
+    if factor is not None and factor.computed_with(mean, covariance) and \
+       len(factor.keys) == len(self.samples) + 1:
+      self.cached_factor = factor.reduced(x)
+    else:
+      self.cached_factor = None
 
   def asVentureValue(self):
     def encode(xy):
@@ -66,8 +66,8 @@ def parse_transitions_extra(args):
       transitions = int(args[-1].getNumber())
       extra = args[:-1]
     elif isinstance(maybe_transitions, v.VentureBool):
-      # maybe_transitions is the parallelism indicator, which Lite
-      # ignores anyway.
+      # maybe_transitions is the parallelism indicator; see
+      # parse_in_parallel.
       transitions = int(args[-2].getNumber())
       extra = args[:-2]
   def unwrap_default(arg):
@@ -83,6 +83,18 @@ def parse_transitions_extra(args):
       return arg
   return (transitions, [unwrap_default(e) for e in extra])
 
+def parse_in_parallel(args):
+  """Return whether the optional parallelism indicator that may follow
+  the transition count is present and true.
+
+  Lite honors it only for the operators that regenerate many
+  independent particles (gibbs, emap, func_pgibbs, func_pmap), and
+  defaults it to false, because forking worker processes only pays for
+  itself when the particles are expensive.
+  """
+  return len(args) >= 2 and isinstance(args[-1], v.VentureBool) \
+    and isinstance(args[-2], v.VentureNumber) and args[-1].getBool()
+
 def dispatch_arguments(trace, args):
   import venture.untraced.trace_search as search
   if isinstance(args[1], v.VentureForeignBlob) and search.is_search_ast(args[1].datum):
@@ -174,19 +186,22 @@ def primitive_infer(trace, exp):
     return transloop(trace, transitions, scaffolder_loop(scaffolders, doit))
   elif operator == "gibbs":
     (scaffolders, transitions, _) = dispatch_arguments(trace, exp)
+    parallel = parse_in_parallel(exp)
     def doit(scaffolder):
-      return mixMH(trace, scaffolder, EnumerativeGibbsOperator())
+      return mixMH(trace, scaffolder, EnumerativeGibbsOperator(parallel))
     return transloop(trace, transitions, scaffolder_loop(scaffolders, doit))
   elif operator == "emap":
     (scaffolders, transitions, _) = dispatch_arguments(trace, exp)
+    parallel = parse_in_parallel(exp)
     def doit(scaffolder):
-      return mixMH(trace, scaffolder, EnumerativeMAPOperator())
+      return mixMH(trace, scaffolder, EnumerativeMAPOperator(parallel))
     return transloop(trace, transitions, scaffolder_loop(scaffolders, doit))
   elif operator == "gibbs_update":
     (scope, block, transitions, _) = parse_arguments(trace, exp)
+    parallel = parse_in_parallel(exp)
     return transloop(trace, transitions, lambda : \
       mixMH(trace, BlockScaffoldIndexer(scope, block, updateValues=True),
-            EnumerativeGibbsOperator()))
+            EnumerativeGibbsOperator(parallel)))
   elif operator == "slice":
     (scaffolders, transitions, (w, m)) = dispatch_arguments(trace, exp)
     def doit(scaffolder):
@@ -227,29 +242,31 @@ def primitive_infer(trace, exp):
   elif operator == "func_pgibbs":
     (scope, block, transitions, extra) = parse_arguments(trace, exp)
     particles = int(extra[0])
+    parallel = parse_in_parallel(exp)
     if isinstance(block, list): # Ordered range
       (_, min_block, max_block) = block
       scaffolder = BlockScaffoldIndexer(scope, "ordered_range",
                                         (min_block, max_block))
       return transloop(trace, transitions, lambda : \
-        mixMH(trace, scaffolder, ParticlePGibbsOperator(particles)))
+        mixMH(trace, scaffolder, ParticlePGibbsOperator(particles, parallel)))
     else:
       return transloop(trace, transitions, lambda : \
         mixMH(trace, BlockScaffoldIndexer(scope, block),
-              ParticlePGibbsOperator(particles)))
+              ParticlePGibbsOperator(particles, parallel)))
   elif operator == "func_pmap":
     (scope, block, transitions, extra) = parse_arguments(trace, exp)
     particles = int(extra[0])
+    parallel = parse_in_parallel(exp)
     if isinstance(block, list): # Ordered range
       (_, min_block, max_block) = block
       scaffolder = BlockScaffoldIndexer(scope, "ordered_range",
                                         (min_block, max_block))
       return transloop(trace, transitions, lambda : \
-        mixMH(trace, scaffolder, ParticlePMAPOperator(particles)))
+        mixMH(trace, scaffolder, ParticlePMAPOperator(particles, parallel)))
     else:
       return transloop(trace, transitions, lambda : \
         mixMH(trace, BlockScaffoldIndexer(scope, block),
-              ParticlePMAPOperator(particles)))
+              ParticlePMAPOperator(particles, parallel)))
   elif operator == "grad_ascent":
     (scaffolders, transitions, (rate, steps)) = dispatch_arguments(trace, exp)
     def doit(scaffolder):
@@ -24,6 +24,7 @@ from venture.lite.infer.mh import getCurrentValues
 from venture.lite.infer.mh import registerDeterministicLKernels
 from venture.lite.infer.mh import registerDeterministicLKernelsByAddress
 from venture.lite.omegadb import OmegaDB
+from venture.lite.parallel_map import parallel_map
 from venture.lite.regen import regenAndAttach
 from venture.lite.utils import cartesianProduct
 from venture.lite.utils import sampleLogCategorical
@@ -41,6 +42,10 @@ def getCartesianProductOfEnumeratedValuesWithAddresses(trace, pnodes):
   return cartesianProduct(enumeratedValues)
 
 class EnumerativeGibbsOperator(object):
+  def __init__(self, parallel=False):
+    # Whether to regenerate the candidate particles in a pool of
+    # worker processes.
+    self.parallel = parallel
 
   def compute_particles(self, trace, scaffold):
     assertTrace(trace, scaffold)
@@ -51,12 +56,17 @@ class EnumerativeGibbsOperator(object):
     registerDeterministicLKernels(trace, scaffold, pnodes, currentValues)
 
     rhoWeight, self.rhoDB = detachAndExtract(trace, scaffold)
-    xiWeights = []
-    xiParticles = []
 
     allSetsOfValues = getCartesianProductOfEnumeratedValues(trace, pnodes)
 
-    for newValues in allSetsOfValues:
+    # Making a particle draws its seeds from the trace, and nothing
+    # else does, so making them all up front leaves each regenerating
+    # with the same randomness whether that happens here or in a
+    # worker process.
+    xiParticles = [self.copy_trace(trace) for _ in allSetsOfValues]
+
+    def regen_particle(i):
+      newValues = allSetsOfValues[i]
       if newValues == currentValues:
         # If there are random choices downstream, keep their current values.
         # This follows the auxiliary variable method in Neal 2000,
@@ -71,14 +81,22 @@ class EnumerativeGibbsOperator(object):
       else:
         shouldRestore = False
         omegaDB = OmegaDB()
-      xiParticle = self.copy_trace(trace)
       assertTorus(scaffold)
       registerDeterministicLKernels(trace, scaffold, pnodes, newValues)
-      xiParticles.append(xiParticle)
-      xiWeights.append(
-        regenAndAttach(xiParticle, scaffold, shouldRestore, omegaDB, OrderedDict()))
+      return regenAndAttach(xiParticles[i], scaffold, shouldRestore, omegaDB,
+                            OrderedDict())
       # if shouldRestore:
       #   assert_almost_equal(xiWeights[-1], rhoWeight)
+
+    indexes = range(len(xiParticles))
+    if self.parallel:
+      # The workers' regenerated particles die with them, so only
+      # the weights come back; propose regenerates the one it picks.
+      xiWeights = parallel_map(regen_particle, indexes)
+      self.regen_particle = regen_particle
+    else:
+      xiWeights = [regen_particle(i) for i in indexes]
+      self.regen_particle = None
     return (xiParticles, xiWeights)
 
   def propose(self, trace, scaffold):
@@ -87,6 +105,8 @@ class EnumerativeGibbsOperator(object):
     (xiParticles, xiWeights) = self.compute_particles(trace, scaffold)
     # Now sample a NEW particle in proportion to its weight
     finalIndex = self.chooseProposalParticle(xiWeights, trace.np_rng)
+    if self.regen_particle is not None:
+      self.regen_particle(finalIndex)
     self.finalParticle = xiParticles[finalIndex]
     return self.finalParticle, 0
 
@@ -23,6 +23,7 @@ from ..regen import regenAndAttach
 from ..detach import detachAndExtract
 from ..scaffold import constructScaffold
 from ..lkernel import DeterministicLKernel
+from ..profiler import proposalSummaryKey
 
 def getCurrentValues(trace, pnodes):
   return [trace.valueAt(pnode) for pnode in pnodes]
@@ -58,10 +59,22 @@ def registerDeterministicLKernelsByAddress(
 
 def mixMH(trace, indexer, operator):
   start = time.time()
+  cache = trace.scaffold_cache
+  (hits, misses) = (cache.hits, cache.misses) if cache is not None else (0, 0)
+  summary = trace.proposal_summary if trace.profiling_enabled else None
+  if summary is not None:
+    detachStart = summary.detach_time
+    regenStart = summary.regen_time
+    # Only every sample_every-th proposal is recorded in full
+    recording = summary.samplesNext()
+  else:
+    recording = trace.profiling_enabled
   index = indexer.sampleIndex(trace)
+  cached = cache is not None and cache.hits > hits
+  uncached = cache is not None and cache.misses > misses
 
   # record node addresses and values for the benefit of the profiler
-  if trace.profiling_enabled:
+  if recording:
     nodes = index.getPrincipalNodes()
     current = [trace.valueAt(node) for node in nodes]
     getAddr = lambda node: node.address
@@ -78,7 +91,7 @@ def mixMH(trace, indexer, operator):
   xiMix = indexer.logDensityOfIndex(proposedTrace, index)
 
   # record the proposed values for the profiler
-  if trace.profiling_enabled:
+  if recording:
     proposed = [trace.valueAt(node) for node in nodes]
 
   alpha = xiMix + logAlpha - rhoMix
@@ -95,7 +108,22 @@ def mixMH(trace, indexer, operator):
     ans = operator.reject() # May mutate trace
     accepted = False
 
-  if trace.profiling_enabled:
+  if summary is not None:
+    summary.record(
+      proposalSummaryKey(operator, indexer),
+      time = time.time() - start,
+      accepted = accepted,
+      detach_time = summary.detach_time - detachStart,
+      regen_time = summary.regen_time - regenStart,
+      scaffold_cache_hits = cached,
+      scaffold_cache_misses = uncached,
+      principal = len(index.getPrincipalNodes()),
+      absorbing = len(index.absorbing),
+      aaa = len(index.aaa),
+      brush = len(index.brush)
+    )
+
+  if recording:
     trace.recordProposal(
       operator = operator.name(),
       indexer = indexer.name(),
@@ -107,7 +135,8 @@ def mixMH(trace, indexer, operator):
       principal = principal,
       absorbing = absorbing,
       aaa = aaa,
-      brush = brush
+      brush = brush,
+      cached = cached
     )
 
   return ans
@@ -146,10 +175,26 @@ class BlockScaffoldIndexer(object):
 
   def sampleIndex(self, trace):
     setsOfPNodes = self.getSetsOfPNodes(trace)
-    return constructScaffold(
-      trace, setsOfPNodes,
-      useDeltaKernels=self.useDeltaKernels,
-      deltaKernelArgs=self.deltaKernelArgs, updateValues=self.updateValues)
+    cache = trace.scaffold_cache
+    if cache is None or self.useDeltaKernels or self.updateValues:
+      return constructScaffold(
+        trace, setsOfPNodes,
+        useDeltaKernels=self.useDeltaKernels,
+        deltaKernelArgs=self.deltaKernelArgs, updateValues=self.updateValues)
+    key = self.cacheKey()
+    scaffold = cache.lookup(trace, key, setsOfPNodes)
+    if scaffold is None:
+      scaffold = constructScaffold(trace, setsOfPNodes)
+      cache.insert(trace, key, setsOfPNodes, scaffold)
+    return scaffold
+
+  def cacheKey(self):
+    if self.block == "one":
+      return (self.scope, self.true_block)
+    elif self.block == "ordered_range":
+      return (self.scope, self.block, tuple(self.interval))
+    else:
+      return (self.scope, self.block)
 
   def logDensityOfIndex(self, trace, _):
     if self.block == "one": return trace.logDensityOfBlock(self.scope)
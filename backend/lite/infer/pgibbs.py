@@ -19,6 +19,7 @@ import copy
 from collections import OrderedDict
 
 from ..omegadb import OmegaDB
+from ..parallel_map import parallel_map
 from ..regen import regenAndAttachAtBorder
 from ..detach import detachAndExtractAtBorder
 from ..utils import sampleLogCategorical
@@ -140,8 +141,13 @@ class PGibbsOperator(object):
 #### Functional PGibbs
 
 class ParticlePGibbsOperator(object):
-  def __init__(self,P):
+  def __init__(self,P,parallel=False):
     self.P = P
+    # Whether to regenerate the particles of the last step in a pool
+    # of worker processes.  Earlier steps are always serial, because
+    # their particles are the parents of the next step's and could
+    # not be brought back from the workers.
+    self.parallel = parallel
 
   def propose(self,trace,scaffold):
     from ..particle import Particle
@@ -168,39 +174,52 @@ class ParticlePGibbsOperator(object):
     particles = [Particle(trace) for p in range(P+1)]
     self.particles = particles
 
-    particleWeights = [None for p in range(P+1)]
-
-
     # Simulate and calculate initial xiWeights
 
-    for p in range(P):
-      particleWeights[p] = regenAndAttachAtBorder(particles[p],scaffold.border[0],scaffold,False,OmegaDB(),OrderedDict())
-
-    particleWeights[P] = regenAndAttachAtBorder(particles[P],scaffold.border[0],scaffold,True,rhoDBs[0],OrderedDict())
+    particleWeights = self._regen_particles(particles, 0, T == 1, rhoDBs[0])
     # assert_almost_equal(particleWeights[P],rhoWeights[0])
 
 #   for every time step,
     for t in range(1,T):
       newParticles = [None for p in range(P+1)]
-      newParticleWeights = [None for p in range(P+1)]
-      # Sample new particle and propagate
+      # Sample new particle and propagate.  Making a particle draws
+      # its seeds from its parent, and regenerating it draws only from
+      # its own, so all the particles of a step can be made before any
+      # is regenerated.
       for p in range(P):
         parent = sampleLogCategorical(particleWeights, self.trace.np_rng)
         newParticles[p] = Particle(particles[parent])
-        newParticleWeights[p] = regenAndAttachAtBorder(newParticles[p],self.scaffold.border[t],self.scaffold,False,OmegaDB(),OrderedDict())
       newParticles[P] = Particle(particles[P])
-      newParticleWeights[P] = regenAndAttachAtBorder(newParticles[P],self.scaffold.border[t],self.scaffold,True,rhoDBs[t],OrderedDict())
-      # assert_almost_equal(newParticleWeights[P],rhoWeights[t])
+      particleWeights = self._regen_particles(newParticles, t, t == T - 1, rhoDBs[t])
+      # assert_almost_equal(particleWeights[P],rhoWeights[t])
       particles = newParticles
-      particleWeights = newParticleWeights
 
     finalIndex = self.select_final_particle_index(particleWeights)
+    if self.regen_particle is not None:
+      self.regen_particle(finalIndex)
 
     self.finalIndex = finalIndex
     self.particles = particles
 
     return particles[finalIndex],self._compute_alpha(particleWeights, finalIndex)
 
+  def _regen_particles(self, particles, t, last, rhoDB):
+    """Regenerate the given particles at border t, the last (rho)
+    one by restoring from rhoDB, and return their weights."""
+    P = self.P
+    def regen_particle(p):
+      return regenAndAttachAtBorder(particles[p],self.scaffold.border[t],self.scaffold,False,OmegaDB(),OrderedDict())
+    if last and self.parallel:
+      # The workers' regenerated particles die with them, so only the
+      # weights come back; propose regenerates the one it picks.
+      weights = parallel_map(regen_particle, range(P))
+      self.regen_particle = regen_particle
+    else:
+      weights = [regen_particle(p) for p in range(P)]
+      self.regen_particle = None
+    weights.append(regenAndAttachAtBorder(particles[P],self.scaffold.border[t],self.scaffold,True,rhoDB,OrderedDict()))
+    return weights
+
   def _compute_alpha(self, particleWeights, finalIndex):
     # Remove the weight of the chosen xi from the list instead of
     # trying to subtract in logspace to prevent catastrophic
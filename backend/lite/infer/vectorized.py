@@ -0,0 +1,280 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Resimulation MH on many particles in one vectorized pass.
+
+An MH step whose scaffold has no brush and no AAA, whose DRG consists
+of principal nodes applying continuous VectorizedRandomPSPs together
+with lookups and tags of them, and whose absorbing applications apply
+VectorizedRandomPSPs too, does the
+same arithmetic in every trace that shares that structure.  For those
+traces, the current principal values and the operands and values of
+the absorbing applications are gathered into NumPy columns (one row
+per trace); the proposal is simulated and the acceptance ratio
+computed for all rows at once; and the accepted values are written
+back.
+
+Traces whose scaffold is of any other form, or whose proposals are
+being profiled, take the ordinary per-trace mixMH step instead, so
+the result is always a valid mh transition on every trace.
+'''
+
+import numpy as np
+
+from venture.lite.discrete import DiscretePSP
+from venture.lite.infer.dispatch import dispatch_arguments
+from venture.lite.infer.mh import MHOperator
+from venture.lite.infer.mh import mixMH
+from venture.lite.node import isLookupNode
+from venture.lite.node import isOutputNode
+from venture.lite.node import isRequestNode
+from venture.lite.psp import DispatchingPSP
+from venture.lite.psp import NullRequestPSP
+from venture.lite.psp import TypedPSP
+from venture.lite.psp import VectorizedRandomPSP
+from venture.lite.scope import isTagExcludeOutputPSP
+from venture.lite.scope import isTagOutputPSP
+import venture.lite.value as vv
+
+def vectorized_mh(traces, exp, np_rng):
+  """Run the mh inference expression exp on each of the given Lite
+traces, as primitive_infer would, advancing the traces whose
+scaffolds are vectorizable and share a structure together.
+
+Returns the average number of nodes touched per transition in each
+trace.  The vectorized proposals and acceptances draw from np_rng
+rather than from the traces' own generators."""
+  dispatched = [dispatch_arguments(trace, exp) for trace in traces]
+  kernels = {}
+  counts = [0 for _ in traces]
+  rounds = max([transitions for (_, transitions, _) in dispatched] + [0])
+  for r in range(rounds):
+    active = [i for (i, (_, transitions, _)) in enumerate(dispatched)
+              if r < transitions]
+    # As in scaffolder_loop, each transition steps through all the
+    # trace's scaffolders and counts their average.
+    touched = dict((i, 0) for i in active)
+    width = max(len(dispatched[i][0]) for i in active)
+    for j in range(width):
+      groups = {}
+      for i in active:
+        scaffolders = dispatched[i][0]
+        if j >= len(scaffolders):
+          continue
+        trace = traces[i]
+        if trace.profiling_enabled:
+          touched[i] += mixMH(trace, scaffolders[j], MHOperator())
+          continue
+        scaffold = scaffolders[j].sampleIndex(trace)
+        plan = _compile(trace, scaffold, kernels)
+        if plan is None:
+          # Step on the scaffold already drawn; drawing another would
+          # favor the blocks that vectorize.
+          indexer = _SampledIndexer(scaffolders[j], scaffold)
+          touched[i] += mixMH(trace, indexer, MHOperator())
+        else:
+          groups.setdefault(plan.pattern, []).append((i, plan))
+      for (pattern, members) in groups.iteritems():
+        _step(pattern, [plan for (_, plan) in members], np_rng)
+        for (i, plan) in members:
+          touched[i] += plan.scaffold.numAffectedNodes()
+    for i in active:
+      trace = traces[i]
+      counts[i] += touched[i] / len(dispatched[i][0])
+      for node in trace.aes:
+        trace.madeSPAt(node).AEInfer(trace.madeSPAuxAt(node), trace.np_rng)
+      counts[i] += len(trace.aes)
+  return [ct / float(transitions) if transitions > 0 else 0.0
+          for (ct, (_, transitions, _)) in zip(counts, dispatched)]
+
+class _SampledIndexer(object):
+  """An indexer whose sampleIndex gives back a scaffold its underlying
+indexer has already sampled, and whose index densities are the
+underlying indexer's."""
+  def __init__(self, indexer, scaffold):
+    self.indexer = indexer
+    self.scaffold = scaffold
+
+  def sampleIndex(self, _trace):
+    return self.scaffold
+
+  def logDensityOfIndex(self, trace, scaffold):
+    return self.indexer.logDensityOfIndex(trace, scaffold)
+
+  def name(self):
+    return self.indexer.name()
+
+class _Plan(object):
+  """The nodes and current values of one trace's vectorizable scaffold.
+
+  The pattern is a hashable description of the scaffold's structure:
+  a (kernel, operands) pair for each principal node and a (kernel,
+  operands, value) triple for each absorbing application, where each
+  operand or value is ('p', i) for the ith principal value or ('f', j)
+  for the jth fixed value.  Plans with equal patterns are stepped
+  together.
+  """
+  def __init__(self, trace, scaffold, pattern, principal, copies,
+               current, fixed):
+    self.trace = trace
+    self.scaffold = scaffold
+    self.pattern = pattern
+    self.principal = principal # [Node]
+    self.copies = copies # [(Node, index of the principal node it copies)]
+    self.current = current # [float], parallel to principal
+    self.fixed = fixed # [float]
+
+  def commit(self, values):
+    for (node, x) in zip(self.principal, values):
+      self.trace.setValueAt(node, vv.VentureNumber(float(x)))
+    for (node, i) in self.copies:
+      self.trace.setValueAt(node, self.trace.valueAt(self.principal[i]))
+
+def _compile(trace, scaffold, kernels):
+  """Return the _Plan of an mh step on the given scaffold, or None if
+it is not vectorizable."""
+  if scaffold.brush or scaffold.aaa or scaffold.lkernels:
+    return None
+  principal = list(scaffold.getPrincipalNodes())
+  index = dict((node, i) for (i, node) in enumerate(principal))
+  copies = []
+  for node in scaffold.drg:
+    if node in index:
+      continue
+    source = _copied_node(trace, node)
+    if source not in index:
+      return None
+    index[node] = index[source]
+    copies.append((node, index[source]))
+
+  fixed = []
+  def fixed_ref(value):
+    if not isinstance(value, vv.VentureNumber):
+      return None
+    fixed.append(value.getNumber())
+    return ('f', len(fixed) - 1)
+
+  def operand_refs(node):
+    refs = []
+    for operand in node.operandNodes:
+      if operand in index:
+        refs.append(('p', index[operand]))
+      else:
+        ref = fixed_ref(trace.valueAt(operand))
+        if ref is None:
+          return None
+        refs.append(ref)
+    return tuple(refs)
+
+  principal_pattern = []
+  for node in principal:
+    if not isinstance(trace.valueAt(node), vv.VentureNumber):
+      return None
+    refs = operand_refs(node)
+    if refs is None or any(kind == 'p' for (kind, _) in refs):
+      return None
+    kernel = _kernel(trace, node, kernels)
+    if kernel is None or isinstance(kernel, DiscretePSP):
+      return None # Only continuous proposals are written back as numbers
+    principal_pattern.append((kernel, refs))
+
+  absorbing_pattern = []
+  for node in scaffold.absorbing:
+    if isRequestNode(node) and isinstance(trace.pspAt(node), NullRequestPSP):
+      continue # Absorbs with density 1
+    if not isOutputNode(node):
+      return None
+    refs = operand_refs(node)
+    value = fixed_ref(trace.valueAt(node))
+    if refs is None or value is None:
+      return None
+    kernel = _kernel(trace, node, kernels)
+    if kernel is None:
+      return None
+    absorbing_pattern.append((kernel, refs, value))
+
+  current = [trace.valueAt(node).getNumber() for node in principal]
+  pattern = (tuple(principal_pattern), tuple(absorbing_pattern))
+  return _Plan(trace, scaffold, pattern, principal, copies, current, fixed)
+
+def _copied_node(trace, node):
+  """The node whose value node merely copies, if any."""
+  if isLookupNode(node):
+    return node.sourceNode
+  elif isOutputNode(node):
+    psp = trace.pspAt(node)
+    if isTagOutputPSP(psp):
+      return node.operandNodes[2]
+    elif isTagExcludeOutputPSP(psp):
+      return node.operandNodes[1]
+  return None
+
+def _kernel(trace, node, kernels):
+  """The VectorizedRandomPSP that node applies, if it is one.
+
+  Assumes the operands of node are all numbers, so that the PSP it
+  dispatches to depends only on its PSP and number of operands;
+  kernels memoizes that."""
+  psp = trace.pspAt(node)
+  key = (psp, len(node.operandNodes))
+  if key not in kernels:
+    ans = psp
+    if isinstance(ans, DispatchingPSP):
+      ans = ans.dispatch(trace.argsAt(node))
+    if isinstance(ans, TypedPSP):
+      ans = ans.psp
+    if isinstance(ans, VectorizedRandomPSP):
+      # One instance per class, so that traces holding distinct but
+      # equivalent copies of a PSP still share a pattern
+      kernels[key] = kernels.setdefault(type(ans), ans)
+    else:
+      kernels[key] = None
+  return kernels[key]
+
+def _step(pattern, plans, np_rng):
+  """Make one resimulation MH step on every plan, all sharing pattern."""
+  (principal, absorbing) = pattern
+  current = np.array([plan.current for plan in plans], dtype=float)
+  fixed = np.array([plan.fixed for plan in plans], dtype=float)
+  fixed = fixed.reshape(len(plans), -1)
+  def column(ref, values):
+    (kind, j) = ref
+    return values[:, j] if kind == 'p' else fixed[:, j]
+
+  proposed = np.empty_like(current)
+  for (i, (kernel, refs)) in enumerate(principal):
+    params = [column(ref, current) for ref in refs]
+    proposed[:, i] = kernel.simulateColumns(len(plans), params, np_rng)
+
+  # Resimulating the principal nodes from the prior leaves only the
+  # absorbing densities in the acceptance ratio.
+  rho = np.zeros(len(plans))
+  xi = np.zeros(len(plans))
+  for (kernel, refs, value) in absorbing:
+    x = column(value, current)
+    rho += kernel.logDensityColumns(x, [column(ref, current) for ref in refs])
+    xi += kernel.logDensityColumns(x, [column(ref, proposed) for ref in refs])
+
+  with np.errstate(invalid='ignore'):
+    alpha = xi - rho
+  # Break ties between infinite weights as MHOperator.propose does.
+  alpha[(rho == float('-inf')) & (xi == float('-inf'))] = float('+inf')
+  alpha[(rho == float('+inf')) & (xi == float('+inf'))] = float('-inf')
+  log_u = np.log(np_rng.uniform(size=len(plans)))
+  for (plan, accepted, values) in zip(plans, log_u < alpha, proposed):
+    if accepted:
+      plan.commit(values)
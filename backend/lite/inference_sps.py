@@ -260,8 +260,9 @@ The `transitions` argument specifies how many transitions of the
 chain to run.
 
 The `in-parallel` argument, if supplied, toggles parallel evaluation
-of the local conditional.  Parallel evaluation is only available in the
-Puma backend, and is on by default.
+of the local conditional.  It is on by default in the Puma backend,
+which uses threads, and off by default in the Lite backend, which
+forks a pool of worker processes.  The result does not depend on it.
 
 Returns the average number of nodes touched per transition in each particle.
 """)
@@ -278,8 +279,9 @@ Specifying more than one transition is redundant unless the ``block``
 is `one`.
 
 The ``in-parallel`` argument, if supplied, toggles parallel evaluation
-of the local conditional.  Parallel evaluation is only available in
-the Puma backend, and is on by default.
+of the local conditional.  It is on by default in the Puma backend,
+which uses threads, and off by default in the Lite backend, which
+forks a pool of worker processes.  The result does not depend on it.
 
 Returns the average number of nodes touched per transition in each particle.
 """)
@@ -299,8 +301,10 @@ particle Gibbs filter.
 The ``transitions`` argument specifies how many times to do this.
 
 The ``in-parallel`` argument, if supplied, toggles per-particle
-parallelism.  Parallel evaluation is only available in the Puma
-backend, and is on by default.
+parallelism.  It is on by default in the Puma backend, which uses
+threads.  It is off by default in the Lite backend, which forks a pool
+of worker processes for the particles of the last step of the filter
+only.  The result does not depend on it.
 
 Returns the average number of nodes touched per transition in each particle.
 """)
@@ -1041,15 +1045,17 @@ register_ripl_method_sp("draw_subproblem", infer_action_maker_type([t.AnyType("<
 register_engine_method_sp("save_model", infer_action_maker_type([t.StringType("<filename>")]), desc="""\
 Save the current model to a file.
 
-Note: ``save_model`` and ``load_model`` rely on Python's ``pickle``
-module.
+The file is a versioned binary snapshot: numeric values are stored in
+contiguous arrays, and directives shared by several particles are
+stored once.  Values of other types are stored with Python's
+``pickle`` module.
 """)
 
 register_engine_method_sp("load_model", infer_action_maker_type([t.StringType("<filename>")]), desc="""\
 Load from a file created by ``save_model``, clobbering the current model.
 
-Note: ``save_model`` and ``load_model`` rely on Python's ``pickle``
-module.
+Note: ``save_model`` and ``load_model`` rely in part on Python's
+``pickle`` module.
 """)
 
 register_engine_method_sp("pyexec", infer_action_maker_type([t.SymbolType("<code>")]), desc="""\
@@ -62,6 +62,68 @@ class Covariance_Cholesky(object):
     # diagonal.
     return np.sum(np.log(np.diag(L)))
 
+class Covariance_Triangular(object):
+  """Covariance factor given by an explicit lower-triangular L, with
+  Sigma = L L^T, as maintained incrementally by cholesky_append and
+  cholesky_delete."""
+  def __init__(self, L):
+    self._L = L
+  def solve(self, Y):
+    return la.cho_solve((self._L, True), Y)
+  def solve_lower(self, Y):
+    # L^-1 Y, for forming Schur complements as (L^-1 Y)^T (L^-1 Y).
+    return la.solve_triangular(self._L, Y, lower=True)
+  def inverse(self):
+    return self.solve(np.eye(self._L.shape[0]))
+  def logsqrtdet(self):
+    return np.sum(np.log(np.diag(self._L)))
+
+def cholesky_append(L, b, c):
+  """Cholesky factor of [Sigma, b; b^T, c], given L with Sigma = L L^T.
+
+  Takes O(n^2) time.  Returns None if the extended matrix is not
+  (numerically) positive-definite."""
+  # [L, 0; w^T, d] [L^T, w; 0, d] = [L L^T, L w; w^T L^T, w^T w + d^2],
+  # so solve L w = b and take d = sqrt(c - w^T w).
+  n = L.shape[0]
+  if n == 0:
+    w = np.zeros(0)
+  else:
+    w = la.solve_triangular(L, b, lower=True)
+  d2 = c - np.dot(w, w)
+  if not d2 > 0:
+    return None
+  L_ = np.zeros((n + 1, n + 1))
+  L_[:n, :n] = L
+  L_[n, :n] = w
+  L_[n, n] = np.sqrt(d2)
+  return L_
+
+def cholesky_delete(L, i):
+  """Cholesky factor of Sigma with row and column i deleted, given L
+  with Sigma = L L^T.
+
+  Takes O(n^2) time."""
+  # With L = [L11, 0, 0; l21^T, l22, 0; L31, l32, L33], deleting row
+  # and column i of Sigma leaves [L11 L11^T, L11 L31^T; L31 L11^T,
+  # L31 L31^T + l32 l32^T + L33 L33^T], whose factor is [L11, 0; L31,
+  # L33'] where L33' L33'^T = L33 L33^T + l32 l32^T, a rank-one
+  # update.
+  L_ = np.delete(np.delete(L, i, axis=0), i, axis=1)
+  _cholesky_update(L_[i:, i:], L[i+1:, i].copy())
+  return L_
+
+def _cholesky_update(L, x):
+  """In place, replace L by the Cholesky factor of L L^T + x x^T."""
+  n = L.shape[0]
+  for k in xrange(n):
+    r = np.hypot(L[k, k], x[k])
+    c = r / L[k, k]
+    s = x[k] / L[k, k]
+    L[k, k] = r
+    L[k+1:, k] = (L[k+1:, k] + s*x[k+1:]) / c
+    x[k+1:] = c*x[k+1:] - s*L[k+1:, k]
+
 class Covariance_Loser(object):
   def __init__(self, Sigma):
     self._Sigma = Sigma
@@ -100,7 +162,13 @@ def logpdf(X, Mu, Sigma):
 
   X_ = X - Mu
   covf = _covariance_factor(Sigma)
+  return logpdf_factored(X_, covf)
 
+def logpdf_factored(X_, covf):
+  """Multivariate normal log pdf of the deviation X_ = X - Mu, given
+  a factor covf of the covariance matrix (as from _covariance_factor
+  or Covariance_Triangular)."""
+  n = len(X_)
   logp = -np.dot(X_.T, covf.solve(X_)/2.)
   logp -= (n/2.)*np.log(2*np.pi)
   logp -= covf.logsqrtdet()
@@ -244,8 +312,12 @@ def dlogpdf(X, dX, Mu, dMu, Sigma, dSigma):
 
   return (dlogP_dt, dlogP_dp, dlogP_dq)
 
-def conditional(X2, Mu1, Mu2, Sigma11, Sigma12, Sigma21, Sigma22):
-  """Parameters of conditional multivariate normal."""
+def conditional(X2, Mu1, Mu2, Sigma11, Sigma12, Sigma21, Sigma22,
+                covf22=None):
+  """Parameters of conditional multivariate normal.
+
+  If covf22 is supplied, it is used as the factor of Sigma22, which
+  may then be None."""
   # The conditional distribution of a multivariate normal given some
   # fixed values of some variables is itself a multivariate normal on
   # the remaining values, with a slightly different mean and
@@ -271,16 +343,23 @@ def conditional(X2, Mu1, Mu2, Sigma11, Sigma12, Sigma21, Sigma22):
   assert Sigma11.shape == (d1, d1)
   assert Sigma12.shape == (d1, d2)
   assert Sigma21.shape == (d2, d1)
-  assert Sigma22.shape == (d2, d2)
   assert np.all(np.isfinite(X2))
   assert np.all(np.isfinite(Mu1))
   assert np.all(np.isfinite(Mu2))
   assert np.all(np.isfinite(Sigma11))
   assert np.all(np.isfinite(Sigma12))
   assert np.all(np.isfinite(Sigma21))
-  assert np.all(np.isfinite(Sigma22))
 
-  covf22 = _covariance_factor(Sigma22)
+  if covf22 is None:
+    assert Sigma22.shape == (d2, d2)
+    assert np.all(np.isfinite(Sigma22))
+    covf22 = _covariance_factor(Sigma22)
   Mu_ = Mu1 + np.dot(Sigma12, covf22.solve(X2 - Mu2))
-  Sigma_ = Sigma11 - np.dot(Sigma12, covf22.solve(Sigma21))
+  if isinstance(covf22, Covariance_Triangular):
+    # Sigma12 Sigma22^-1 Sigma21 = V^T V for V = L^-1 Sigma21, which
+    # is symmetric by construction.
+    V = covf22.solve_lower(Sigma21)
+    Sigma_ = Sigma11 - np.dot(V.T, V)
+  else:
+    Sigma_ = Sigma11 - np.dot(Sigma12, covf22.solve(Sigma21))
   return (Mu_, Sigma_)
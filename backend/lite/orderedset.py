@@ -16,125 +16,181 @@
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
 
+
 import copy
 
-from collections import OrderedDict
+
+# Marks a removed slot in an ordered set's element list.  Removal
+# leaves the slot in place so that the remaining elements keep their
+# positions; the list is compacted once half of it is tombstones.
+#
+# A set with no tombstones iterates directly over its list, so the
+# first removal from such a set writes its tombstone into a fresh
+# copy of the list rather than under the feet of a live iterator.
+_TOMBSTONE = object()
 
 
 class OrderedFrozenSet(object):
     """Variant of `frozenset` which remembers element insertion order.
 
-    Iteration happens in order of insertion.
+    Iteration happens in order of insertion.  Removing elements from
+    an `OrderedSet` does not disturb an iteration over it in progress,
+    but whether that iteration goes on to yield the removed elements is
+    unspecified.
+
+    Represented by a list of elements in insertion order together with
+    a dict mapping each element to its position in the list, rather
+    than by an `OrderedDict`, which is several times slower to build
+    and iterate over in CPython 2.
     """
 
+    __slots__ = ('_index', '_list', '_holes')
+
     def __init__(self, iterable=None):
-        self._dict = OrderedDict((x, 1) for x in iterable or ())
+        if isinstance(iterable, OrderedFrozenSet):
+            self._index, self._list = iterable._compact_copy()
+        else:
+            self._index = {}
+            self._list = []
+            if iterable is not None:
+                self._extend(iterable)
+        self._holes = 0
+
+    def _compact_copy(self):
+        if self._holes == 0:
+            return self._index.copy(), list(self._list)
+        l = [x for x in self._list if x is not _TOMBSTONE]
+        return dict((x, i) for i, x in enumerate(l)), l
+
+    def _add(self, x):
+        index = self._index
+        if x not in index:
+            index[x] = len(self._list)
+            self._list.append(x)
+
+    def _extend(self, iterable):
+        index = self._index
+        l = self._list
+        for x in iterable:
+            if x not in index:
+                index[x] = len(l)
+                l.append(x)
+
+    def _remove(self, x):
+        i = self._index.pop(x)
+        if self._holes == 0:
+            self._list = list(self._list)
+        self._list[i] = _TOMBSTONE
+        self._holes += 1
+        if 2*self._holes > len(self._list):
+            self._index, self._list = self._compact_copy()
+            self._holes = 0
+
+    def _new(self, iterable=None):
+        s = type(self).__new__(type(self))
+        s._index = {}
+        s._list = []
+        s._holes = 0
+        if iterable is not None:
+            s._extend(iterable)
+        return s
 
     def __iter__(self):
-        return self._dict.iterkeys()
+        if self._holes == 0:
+            return iter(self._list)
+        return (x for x in self._list if x is not _TOMBSTONE)
 
     def __len__(self):
-        return len(self._dict)
+        return len(self._index)
 
     def __contains__(self, x):
-        return x in self._dict
+        return x in self._index
 
     def isdisjoint(self, other):
-        for x in self._dict.iterkeys():
+        if len(other) < len(self):
+            self, other = other, self
+        for x in self:
             if x in other:
                 return False
-        for x in other._dict.iterkeys():
-            if x in self:
-                return False
         return True
 
     def issubset(self, other):
         return self <= other
 
     def __le__(self, other):
-        for x in self._dict.iterkeys():
+        if len(self) > len(other):
+            return False
+        for x in self:
             if x not in other:
                 return False
         return True
 
     def __lt__(self, other):
-        if not self <= other:
-            return False
-        if all(x in self for x in other._dict.iterkeys()):
-            return False
-        return True
+        return len(self) < len(other) and self <= other
 
     def issuperset(self, other):
         return self >= other
 
     def __ge__(self, other):
-        for x in other._dict.iterkeys():
-            if x not in self:
+        if len(other) > len(self):
+            return False
+        index = self._index
+        for x in other:
+            if x not in index:
                 return False
         return True
 
     def __gt__(self, other):
-        if not self >= other:
-            return False
-        if all(x in other for x in self._dict.iterkeys()):
-            return False
-        return True
+        return len(self) > len(other) and self >= other
 
     def __eq__(self, other):
-        if not self <= other:
-            return False
-        if not other <= self:
+        if not isinstance(other, OrderedFrozenSet):
+            return NotImplemented
+        if len(self) != len(other):
             return False
         for x, y in zip(self, other):
             if x != y:
                 return False
         return True
 
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        return eq if eq is NotImplemented else not eq
+
     def union(self, *others):
-        def union():
-            for x in self:
-                yield x
-            for other in others:
-                for x in other:
-                    yield x
-        return type(self)(union())
+        s = self.copy()
+        for other in others:
+            s._extend(other)
+        return s
 
     def __or__(self, other):
-        def union():
-            for x in self:
-                yield x
-            for x in other:
-                yield x
-        return type(self)(union())
+        s = self.copy()
+        s._extend(other)
+        return s
 
     def intersection(self, *others):
         assert all(isinstance(other, OrderedFrozenSet) for other in others), others
-        return type(self)(x for x in self
+        return self._new(x for x in self
             if all(x in other for other in others))
 
     def __and__(self, other):
-        return type(self)(x for x in self if x in other)
+        return self._new(x for x in self if x in other)
 
     def difference(self, *others):
         assert all(isinstance(other, OrderedFrozenSet) for other in others), others
-        return type(self)(x for x in self
+        return self._new(x for x in self
             if not any(x in other for other in others))
 
     def __sub__(self, other):
-        return type(self)(x for x in self if x not in other)
+        return self._new(x for x in self if x not in other)
 
     def symmetric_difference(self, other):
         return self ^ other
 
     def __xor__(self, other):
-        def symdiff():
-            for x in self:
-                if x not in other:
-                    yield x
-            for x in other:
-                if x not in self:
-                    yield x
-        return type(self)(symdiff())
+        s = self._new(x for x in self if x not in other)
+        s._extend(x for x in other if x not in self)
+        return s
 
     def copy(self):
         return type(self)(self)
@@ -143,12 +199,14 @@ class OrderedFrozenSet(object):
         return type(self)(self)
 
     def __deepcopy__(self, memo):
-        c = type(self)()
+        c = self._new()
         memo[id(self)] = c
-        for x in self:
-            c._dict[copy.deepcopy(x, memo)] = 1
+        c._extend(copy.deepcopy(x, memo) for x in self)
         return c
 
+    def __reduce__(self):
+        return (type(self), (list(self),))
+
     def __repr__(self):
         return '%s([%s])' % \
             (type(self).__name__, ', '.join('%r' % (x,) for x in self))
@@ -162,13 +220,14 @@ class OrderedSet(OrderedFrozenSet):
     its original place in the ordering.
     """
 
+    __slots__ = ()
+
     def update(self, *others):
         for other in others:
-            self |= other
+            self._extend(other)
 
     def __ior__(self, other):
-        for x in other:
-            self.add(x)
+        self._extend(other)
         return self
 
     def intersection_update(self, *others):
@@ -176,7 +235,7 @@ class OrderedSet(OrderedFrozenSet):
             self &= other
 
     def __iand__(self, other):
-        for x in self:
+        for x in list(self):
             if x not in other:
                 self.remove(x)
         return self
@@ -194,22 +253,28 @@ class OrderedSet(OrderedFrozenSet):
         self ^= other
 
     def __ixor__(self, other):
-        self._dict = (self ^ other)._dict
+        s = self ^ other
+        self._index, self._list, self._holes = s._index, s._list, s._holes
         return self
 
     def add(self, x):
-        self._dict[x] = 1
+        self._add(x)
 
     def remove(self, x):
-        del self._dict[x]
+        self._remove(x)
 
     def discard(self, x):
-        if x in self:
-            self.remove(x)
+        if x in self._index:
+            self._remove(x)
 
     def pop(self):
-        x, _ = self._dict.popitem(last=False)
-        return x
+        for x in self._list:
+            if x is not _TOMBSTONE:
+                self._remove(x)
+                return x
+        raise KeyError('pop from an empty set')
 
     def clear(self):
-        self._dict.clear()
+        self._index = {}
+        self._list = []
+        self._holes = 0
@@ -0,0 +1,172 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Copy-on-write chained dictionaries, for particle overlays.
+
+An OverlayMap is a mutable map with a constant-time fork operation.
+It is represented as a private layer, which it mutates in place, on
+top of a chain of frozen layers shared with the maps it was forked
+from or to.  Forking freezes the private layer of the original and
+pushes it onto the chain of both maps, each of which then starts a
+fresh private layer.  Lookups try each layer in turn, newest first;
+the chain is flattened once it grows past MAX_DEPTH, to bound that.
+
+Keys are hashed, so objects without a custom __hash__ (such as trace
+nodes) are keyed by identity, and lookups cost a few dict probes
+rather than structural comparisons.  Iteration is in order of first
+insertion, so that it is deterministic given the order of operations.
+
+Values that are themselves overlays are shared between forks like any
+other value; use `owned` to obtain a private fork of such a value
+before mutating it.
+'''
+
+MAX_DEPTH = 16
+
+class Layer(object):
+  __slots__ = ('dict', 'keys')
+  def __init__(self, dct=None, keys=None):
+    self.dict = dct if dct is not None else {}
+    self.keys = keys if keys is not None else []
+
+class OverlayMap(object):
+  __slots__ = ('_layer', '_chain', '_depth', '_size')
+
+  def __init__(self, _chain=None, _depth=0, _size=0):
+    self._layer = Layer()
+    self._chain = _chain # None or (Layer, chain), newest first
+    self._depth = _depth
+    self._size = _size
+
+  def _find(self, key):
+    """Return the layer holding key, or None."""
+    if key in self._layer.dict:
+      return self._layer
+    chain = self._chain
+    while chain is not None:
+      if key in chain[0].dict:
+        return chain[0]
+      chain = chain[1]
+    return None
+
+  def lookup(self, key):
+    """Return the value at key, or None if absent."""
+    ans = self._layer.dict.get(key, self)
+    if ans is not self:
+      return ans
+    chain = self._chain
+    while chain is not None:
+      ans = chain[0].dict.get(key, self)
+      if ans is not self:
+        return ans
+      chain = chain[1]
+    return None
+
+  def __getitem__(self, key):
+    return self.lookup(key)
+
+  def __contains__(self, key):
+    return self._find(key) is not None
+
+  def __setitem__(self, key, value):
+    layer = self._layer
+    if key not in layer.dict:
+      layer.keys.append(key)
+      if self._find(key) is None:
+        self._size += 1
+    layer.dict[key] = value
+
+  def owned(self, key):
+    """Return the value at key, forking it first if it is an overlay
+    this map shares with others, so that it may be mutated in place."""
+    if key in self._layer.dict:
+      return self._layer.dict[key]
+    value = self.lookup(key)
+    if isinstance(value, (OverlayMap, OverlaySet)):
+      value = value.fork()
+      self[key] = value
+    return value
+
+  def fork(self):
+    """Return a copy of this map, in constant time (amortized)."""
+    if self._layer.keys:
+      self._chain = (self._layer, self._chain)
+      self._depth += 1
+      self._layer = Layer()
+      if self._depth > MAX_DEPTH:
+        self._flatten()
+    return OverlayMap(self._chain, self._depth, self._size)
+
+  def _flatten(self):
+    dct = {}
+    keys = []
+    for key in self:
+      dct[key] = self.lookup(key)
+      keys.append(key)
+    self._chain = (Layer(dct, keys), None)
+    self._depth = 1
+
+  def _layers(self):
+    """The layers of this map, oldest first."""
+    layers = [self._layer]
+    chain = self._chain
+    while chain is not None:
+      layers.append(chain[0])
+      chain = chain[1]
+    layers.reverse()
+    return layers
+
+  def __len__(self): return self._size
+
+  def __iter__(self):
+    layers = self._layers()
+    if len(layers) == 1:
+      return iter(list(layers[0].keys))
+    return self._iter_layers(layers)
+
+  @staticmethod
+  def _iter_layers(layers):
+    seen = set()
+    for layer in layers:
+      for key in layer.keys:
+        if key not in seen:
+          seen.add(key)
+          yield key
+
+  def iteritems(self):
+    for key in self:
+      yield (key, self.lookup(key))
+
+class OverlaySet(object):
+  """A set with a constant-time fork, implemented as an OverlayMap to
+  True."""
+  __slots__ = ('_map',)
+
+  def __init__(self, _map=None):
+    self._map = _map if _map is not None else OverlayMap()
+
+  def __contains__(self, item):
+    return item in self._map
+
+  def add(self, item):
+    self._map[item] = True
+
+  def fork(self):
+    return OverlaySet(self._map.fork())
+
+  def __len__(self): return len(self._map)
+  def __iter__(self): return iter(self._map)
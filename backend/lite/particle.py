@@ -19,18 +19,11 @@ import random
 import numpy.random as npr
 from collections import OrderedDict
 
-from venture.lite.node import Node
+from venture.lite.overlay import OverlayMap
+from venture.lite.overlay import OverlaySet
 from venture.lite.sp import VentureSPRecord
 from venture.lite.trace import Trace
 from venture.lite.utils import override
-from venture.lite.wttree import PMap
-from venture.lite.wttree import PSet
-import venture.lite.address as addr
-
-def node_key(node):
-  assert isinstance(node, Node)
-  assert addr._is_address(node.address), node.address
-  return (node.address, str(type(node)))
 
 class Particle(Trace):
 
@@ -42,6 +35,13 @@ class Particle(Trace):
     if type(trace) is Particle: self.initFromParticle(trace)
     elif type(trace) is Trace: self.initFromTrace(trace)
     else: raise Exception("Must init particle from trace or particle")
+    # Particles are short-lived, and never cache scaffolds or extents.
+    self.scaffold_cache = None
+    self.extent_cache = None
+    # Time spent regenerating particles counts toward the profile of
+    # their base trace.
+    self.profiling_enabled = self.base.profiling_enabled
+    self.proposal_summary = self.base.proposal_summary
     # Assumed by hasMadeSPRecordAt.
     assert type(self.base) is Trace
 
@@ -49,21 +49,21 @@ class Particle(Trace):
   def initFromParticle(self, particle):
     self.base = particle.base
 
-    # (1) Persistent stuff
-    self.rcs = particle.rcs
-    self.ccs = particle.ccs
-    self.aes = particle.aes
+    # (1) Persistent stuff, forked in constant time
+    self.rcs = particle.rcs.fork()
+    self.ccs = particle.ccs.fork()
+    self.aes = particle.aes.fork()
 
-    self.values = particle.values
-    self.madeSPs = particle.madeSPs
+    self.values = particle.values.fork()
+    self.madeSPs = particle.madeSPs.fork()
 
-    self.scopes = particle.scopes # pmap => pmap => pset
-    self.esrParents = particle.esrParents
-    self.numRequests = particle.numRequests
-    self.regenCounts = particle.regenCounts
-    self.newMadeSPFamilies = particle.newMadeSPFamilies # pmap => pmap => node
-    self.newChildren = particle.newChildren
-    self.discardedAAAMakerNodes = particle.discardedAAAMakerNodes
+    self.scopes = particle.scopes.fork() # map => map => set
+    self.esrParents = particle.esrParents.fork()
+    self.numRequests = particle.numRequests.fork()
+    self.regenCounts = particle.regenCounts.fork()
+    self.newMadeSPFamilies = particle.newMadeSPFamilies.fork() # map => map => node
+    self.newChildren = particle.newChildren.fork()
+    self.discardedAAAMakerNodes = particle.discardedAAAMakerNodes.fork()
 
     prng = particle.py_rng
     self.py_rng = random.Random(prng.randint(1, 2**31 - 1))
@@ -77,22 +77,22 @@ class Particle(Trace):
   def initFromTrace(self, trace):
     self.base = trace
 
-    # (1) Persistent stuff
-    self.rcs = PSet(node_key) # PSet Node
-    self.ccs = PSet(node_key) # PSet Node
-    self.aes = PSet(node_key) # PSet Node
+    # (1) Persistent stuff.  The overlays hash nodes by identity.
+    self.rcs = OverlaySet() # OverlaySet Node
+    self.ccs = OverlaySet() # OverlaySet Node
+    self.aes = OverlaySet() # OverlaySet Node
 
-    self.values = PMap(node_key)  # PMap Node VentureValue
-    self.madeSPs = PMap(node_key) # PMap Node SP
+    self.values = OverlayMap()  # OverlayMap Node VentureValue
+    self.madeSPs = OverlayMap() # OverlayMap Node SP
 
-    self.scopes = PMap()  # PMap scopeid (PMap blockid (PSet Node))
+    self.scopes = OverlayMap()  # OverlayMap scopeid (OverlayMap blockid (OverlaySet Node))
     # mutable list ok here b/c only touched by one particle
-    self.esrParents = PMap(node_key) # PMap Node [Node]
-    self.numRequests = PMap(node_key) # PMap Node Int
-    self.regenCounts = PMap(node_key) # PMap Node int
-    self.newMadeSPFamilies = PMap(node_key) # PMap Node (PMap id Node)
-    self.newChildren = PMap(node_key) # PMap Node (PSet Node)
-    self.discardedAAAMakerNodes = PSet(node_key) # PSet Node
+    self.esrParents = OverlayMap() # OverlayMap Node [Node]
+    self.numRequests = OverlayMap() # OverlayMap Node Int
+    self.regenCounts = OverlayMap() # OverlayMap Node int
+    self.newMadeSPFamilies = OverlayMap() # OverlayMap Node (OverlayMap id Node)
+    self.newChildren = OverlayMap() # OverlayMap Node (OverlaySet Node)
+    self.discardedAAAMakerNodes = OverlaySet() # OverlaySet Node
 
     prng = trace.py_rng
     self.py_rng = random.Random(prng.randint(1, 2**31 - 1))
@@ -105,14 +105,14 @@ class Particle(Trace):
   ### Random choices and scopes
 
   def registerRandomChoice(self, node):
-    self.rcs = self.rcs.insert(node)
+    self.rcs.add(node)
     self.registerRandomChoiceInScope("default", node, node)
 
   def registerAEKernel(self, node):
-    self.aes = self.aes.insert(node)
+    self.aes.add(node)
 
   def registerConstrainedChoice(self, node):
-    self.ccs = self.ccs.insert(node)
+    self.ccs.add(node)
 
   def unregisterRandomChoice(self, node): assert False
 
@@ -120,14 +120,11 @@ class Particle(Trace):
     assert block is not None
     if not unboxed: (scope, block) = self._normalizeEvaluatedScopeAndBlock(scope, block)
     if scope not in self.scopes:
-      self.scopes = self.scopes.insert(scope, PMap())
-    if block not in self.scopes.lookup(scope):
-      def ins_b(blocks):
-        return blocks.insert(block, PSet(node_key))
-      self.scopes = self.scopes.adjust(scope, ins_b)
-    def ins_n(blocks):
-      return blocks.adjust(block, lambda pnodes: pnodes.insert(node))
-    self.scopes = self.scopes.adjust(scope, ins_n)
+      self.scopes[scope] = OverlayMap()
+    blocks = self.scopes.owned(scope)
+    if block not in blocks:
+      blocks[block] = OverlaySet()
+    blocks.owned(block).add(node)
 
   def unregisterRandomChoiceInScope(self, scope, block, node): assert False
 
@@ -139,7 +136,7 @@ class Particle(Trace):
       return self.base.valueAt(node)
 
   def setValueAt(self, node, value):
-    self.values = self.values.insert(node, value)
+    self.values[node] = value
 
   @override(Trace)
   def hasMadeSPRecordAt(self, node):
@@ -151,9 +148,9 @@ class Particle(Trace):
     return VentureSPRecord(self.madeSPAt(node), self.madeSPAuxAt(node))
 
   def setMadeSPRecordAt(self, node, spRecord):
-    self.madeSPs = self.madeSPs.insert(node, spRecord.sp)
+    self.madeSPs[node] = spRecord.sp
     self.madeSPAuxs[node] = spRecord.spAux
-    self.newMadeSPFamilies = self.newMadeSPFamilies.insert(node, PMap())
+    self.newMadeSPFamilies[node] = OverlayMap()
 
   def madeSPAt(self, node):
     if node in self.madeSPs: return self.madeSPs.lookup(node)
@@ -162,7 +159,7 @@ class Particle(Trace):
   def setMadeSPAt(self, node, sp):
     assert node not in self.madeSPs
     assert self.base.madeSPAt(node) is None
-    self.madeSPs = self.madeSPs.insert(node, sp)
+    self.madeSPs[node] = sp
 
   def esrParentsAt(self, node):
     if node in self.esrParents: return self.esrParents.lookup(node)
@@ -171,7 +168,7 @@ class Particle(Trace):
   def appendEsrParentAt(self, node, parent):
     assert not self.base.esrParentsAt(node)
     if node not in self.esrParents:
-      self.esrParents = self.esrParents.insert(node, [])
+      self.esrParents[node] = []
     self.esrParents.lookup(node).append(parent)
 
   def regenCountAt(self, scaffold, node):
@@ -181,14 +178,14 @@ class Particle(Trace):
 
   def incRegenCountAt(self, scaffold, node):
     if node not in self.regenCounts:
-      self.regenCounts = self.regenCounts.insert(node, 0)
-    self.regenCounts = self.regenCounts.adjust(node, lambda rc: rc + 1)
+      self.regenCounts[node] = 0
+    self.regenCounts[node] = self.regenCounts.lookup(node) + 1
 
   def incRequestsAt(self, node):
     if node not in self.numRequests:
       base_num_requests = self.base.numRequestsAt(node)
-      self.numRequests = self.numRequests.insert(node, base_num_requests)
-    self.numRequests = self.numRequests.adjust(node, lambda nr: nr + 1)
+      self.numRequests[node] = base_num_requests
+    self.numRequests[node] = self.numRequests.lookup(node) + 1
 
   def childrenAt(self, node):
     if node in self.newChildren:
@@ -198,13 +195,11 @@ class Particle(Trace):
 
   def addChildAt(self, node, child):
     if node not in self.newChildren:
-      self.newChildren = self.newChildren.insert(node, PSet(node_key))
-    def ins(children):
-      return children.insert(child)
-    self.newChildren = self.newChildren.adjust(node, ins)
+      self.newChildren[node] = OverlaySet()
+    self.newChildren.owned(node).add(child)
 
   def discardAAAMadeSPAuxAt(self, node):
-    self.discardedAAAMakerNodes = self.discardedAAAMakerNodes.insert(node)
+    self.discardedAAAMakerNodes.add(node)
 
   def getAAAMadeSPAuxAt(self, node):
     if node in self.discardedAAAMakerNodes:
@@ -219,7 +214,7 @@ class Particle(Trace):
     assert makerNode in self.newMadeSPFamilies or \
       self.base.hasMadeSPRecordAt(makerNode)
     if makerNode in self.newMadeSPFamilies:
-      assert isinstance(self.newMadeSPFamilies.lookup(makerNode), PMap)
+      assert isinstance(self.newMadeSPFamilies.lookup(makerNode), OverlayMap)
       if id in self.newMadeSPFamilies.lookup(makerNode):
         return True
       if self.base.hasMadeSPRecordAt(makerNode) and \
@@ -231,15 +226,13 @@ class Particle(Trace):
   def initMadeSPFamiliesAt(self, node):
     assert node not in self.newMadeSPFamilies
     assert node.madeSPFamilies is None
-    self.newMadeSPFamilies = self.newMadeSPFamilies.insert(node, PMap())
+    self.newMadeSPFamilies[node] = OverlayMap()
 
   def registerFamilyAt(self, node, esrId, esrParent):
     makerNode = self.spRefAt(node).makerNode
     if makerNode not in self.newMadeSPFamilies:
-      self.newMadeSPFamilies = self.newMadeSPFamilies.insert(makerNode, PMap())
-    def ins(ids):
-      return ids.insert(esrId, esrParent)
-    self.newMadeSPFamilies = self.newMadeSPFamilies.adjust(makerNode, ins)
+      self.newMadeSPFamilies[makerNode] = OverlayMap()
+    self.newMadeSPFamilies.owned(makerNode)[esrId] = esrParent
 
 
   def madeSPFamilyAt(self, node, esrId):
@@ -0,0 +1,88 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+
+import numpy as np
+
+class ProposalSummary(object):
+  """Running totals of the proposals made on a trace, for the profiler.
+
+  Proposals are aggregated per (operator, scope, block) key into a
+  fixed-size float64 accumulator, so memory use does not grow with the
+  length of the run.  If sample_every is positive, every
+  sample_every-th proposal is additionally recorded in full, as the
+  unaggregated profiler would.
+
+  detach_time and regen_time are running clocks advanced by
+  detachAndExtractAtBorder and regenAndAttachAtBorder while profiling
+  is on; each proposal is charged the amount they advanced while it
+  ran.
+
+  scaffold_cache_hits and scaffold_cache_misses count the proposals
+  whose scaffold the trace's ScaffoldCache did or did not supply (a
+  proposal counts as neither if the cache is off or was bypassed).
+  """
+
+  FIELDS = ['proposals', 'accepted', 'time', 'detach_time', 'regen_time',
+            'scaffold_cache_hits', 'scaffold_cache_misses',
+            'principal', 'absorbing', 'aaa', 'brush']
+
+  def __init__(self, sample_every=0):
+    self.sample_every = sample_every
+    self.accumulators = OrderedDict() # {(operator, scope, block): np.array}
+    self.count = 0
+    self.detach_time = 0.0
+    self.regen_time = 0.0
+
+  def samplesNext(self):
+    return self.sample_every > 0 and self.count % self.sample_every == 0
+
+  def record(self, key, time, accepted, detach_time, regen_time,
+             scaffold_cache_hits, scaffold_cache_misses,
+             principal, absorbing, aaa, brush):
+    acc = self.accumulators.get(key)
+    if acc is None:
+      acc = self.accumulators[key] = np.zeros(len(self.FIELDS))
+    acc += (1, accepted, time, detach_time, regen_time,
+            scaffold_cache_hits, scaffold_cache_misses,
+            principal, absorbing, aaa, brush)
+    self.count += 1
+
+  def rows(self):
+    """One summary dict per key, with scaffold sizes averaged per proposal."""
+    for ((operator, scope, block), acc) in self.accumulators.iteritems():
+      (n, accepted, time, detach_time, regen_time, hits, misses) = acc[:7]
+      row = OrderedDict([
+        ('operator', operator), ('scope', scope), ('block', block),
+        ('proposals', int(n)), ('acceptance_rate', accepted / n),
+        ('time', time), ('detach_time', detach_time),
+        ('regen_time', regen_time),
+        ('scaffold_cache_hits', int(hits)),
+        ('scaffold_cache_misses', int(misses))])
+      for (name, total) in zip(self.FIELDS[7:], acc[7:]):
+        row[name] = total / n
+      yield row
+
+def proposalSummaryKey(operator, indexer):
+  return (operator.name(), _hashable(getattr(indexer, 'scope', None)),
+          _hashable(getattr(indexer, 'block', None)))
+
+def _hashable(thing):
+  if isinstance(thing, list):
+    return tuple(thing)
+  return thing
@@ -15,6 +15,8 @@
 # You should have received a copy of the GNU General Public License
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
+import numpy as np
+
 from venture.lite.env import VentureEnvironment
 from venture.lite.exception import VentureBuiltinSPMethodError
 from venture.lite.lkernel import DefaultVariationalLKernel
@@ -199,6 +201,33 @@ class PSP(object):
     raise VentureBuiltinSPMethodError("Cannot compute log density bound of %s",
       type(self))
 
+  def canBatch(self):
+    """Return whether logDensityMany is vectorized and the log density
+    does not depend on the aux.
+
+    If so, Venture may score many applications of this PSP at once
+    with logDensityMany, instead of calling logDensity on each, and
+    without regard to the order in which they are incorporated.
+    """
+    return False
+
+  def logDensityMany(self, values, args_batch):
+    """Return the log-densities of simulating each of the given values
+    from the corresponding args in args_batch, as a sequence of floats.
+
+    The default calls logDensity on each; PSPs that canBatch should
+    override it with a vectorized computation.
+    """
+    return [self.logDensity(value, args)
+            for (value, args) in zip(values, args_batch)]
+
+  def simulateMany(self, n, args):
+    """Return a list of n independent simulations from the given args.
+
+    The default calls simulate n times.
+    """
+    return [self.simulate(args) for _ in range(n)]
+
   def incorporate(self,value,args):
     """Register that an application of this PSP produced the given value
     at the given args.  This is relevant only if the SP needs to
@@ -460,6 +489,45 @@ class RandomPSP(PSP):
   def canAbsorb(self, _trace, _appNode, _parentNode):
     return True
 
+class VectorizedRandomPSP(RandomPSP):
+  """Provides vectorized batch methods for stochastic PSPs of numeric
+  operands, whose log density does not depend on the aux.
+
+  Subclasses implement simulateColumns and logDensityColumns, which
+  work on NumPy arrays holding one column of values per operand, and
+  inherit logDensityMany and simulateMany from them.
+  """
+  @override(PSP) # type: ignore
+  def canBatch(self):
+    return True
+
+  def simulateColumns(self, _n, _params, _np_rng):
+    """Return an array of n simulations, the ith from the ith entry of
+    each column in params (one per operand)."""
+    raise VentureBuiltinSPMethodError("Cannot simulate %s in columns",
+      type(self))
+
+  def logDensityColumns(self, _values, _params):
+    """Return an array of the log-densities of simulating each of the
+    values from the corresponding entries of the columns in params."""
+    raise VentureBuiltinSPMethodError("Cannot compute log density of %s "
+      "in columns", type(self))
+
+  @override(PSP) # type: ignore
+  def logDensityMany(self, values, args_batch):
+    rows = [args.operandValues() for args in args_batch]
+    if any(len(row) != len(rows[0]) for row in rows):
+      # Some applications omitted optional operands that others gave
+      return super(VectorizedRandomPSP, self).logDensityMany(
+        values, args_batch)
+    params = [np.array(column, dtype=float) for column in zip(*rows)]
+    return self.logDensityColumns(np.array(values, dtype=float), params)
+
+  @override(PSP) # type: ignore
+  def simulateMany(self, n, args):
+    params = [np.repeat(float(val), n) for val in args.operandValues()]
+    return self.simulateColumns(n, params, args.np_prng()).tolist()
+
 class LikelihoodFreePSP(RandomPSP):
   """Provides good default implementations of (two) PSP methods for
   likelihood-free stochastic PSPs.
@@ -529,6 +597,18 @@ class TypedPSP(PSP):
     return self.psp.logDensityBound(
       self.f_type.unwrap_return(value), self.f_type.unwrap_args(args))
 
+  def canBatch(self):
+    return self.psp.canBatch()
+
+  def logDensityMany(self, values, args_batch):
+    return self.psp.logDensityMany(
+      [self.f_type.unwrap_return(value) for value in values],
+      [self.f_type.unwrap_args(args) for args in args_batch])
+
+  def simulateMany(self, n, args):
+    return [self.f_type.wrap_return(value) for value in
+            self.psp.simulateMany(n, self.f_type.unwrap_args(args))]
+
   def incorporate(self, value, args):
     return self.psp.incorporate(self.f_type.unwrap_return(value),
       self.f_type.unwrap_args(args))
@@ -590,35 +670,46 @@ class DispatchingPSP(PSP):
     self.psps = psps
     self.f_type = f_types[0] # TODO Hack to pacify SP.venture_type for now
 
-  def _disptach(self, args):
+  def dispatch(self, args):
+    """The PSP of the variant whose argument types args match."""
     for (f_type, psp) in zip(self.f_types, self.psps):
       if f_type.args_match(args):
         return psp
     return self.psps[0] # And hope coersion succeeds
 
   def simulate(self, args):
-    return self._disptach(args).simulate(args)
+    return self.dispatch(args).simulate(args)
 
   def gradientOfSimulate(self, args, value, direction):
-    return self._disptach(args).gradientOfSimulate(args, value, direction)
+    return self.dispatch(args).gradientOfSimulate(args, value, direction)
 
   def logDensity(self, value, args):
-    return self._disptach(args).logDensity(value, args)
+    return self.dispatch(args).logDensity(value, args)
 
   def gradientOfLogDensity(self, value, args):
-    return self._disptach(args).gradientOfLogDensity(value, args)
+    return self.dispatch(args).gradientOfLogDensity(value, args)
 
   def logDensityBound(self, value, args):
-    return self._disptach(args).logDensityBound(value, args)
+    return self.dispatch(args).logDensityBound(value, args)
+
+  def logDensityMany(self, values, args_batch):
+    psps = [self.dispatch(args) for args in args_batch]
+    if all(psp is psps[0] for psp in psps):
+      return psps[0].logDensityMany(values, args_batch)
+    return [psp.logDensity(value, args)
+            for (psp, value, args) in zip(psps, values, args_batch)]
+
+  def simulateMany(self, n, args):
+    return self.dispatch(args).simulateMany(n, args)
 
   def incorporate(self, value, args):
-    return self._disptach(args).incorporate(value, args)
+    return self.dispatch(args).incorporate(value, args)
 
   def unincorporate(self, value, args):
-    return self._disptach(args).unincorporate(value, args)
+    return self.dispatch(args).unincorporate(value, args)
 
   def enumerateValues(self, args):
-    return self._disptach(args).enumerateValues(args)
+    return self.dispatch(args).enumerateValues(args)
 
   # Is this really the right treatment of methods that don't give args?
   def logDensityOfData(self, aux):
@@ -627,6 +718,9 @@ class DispatchingPSP(PSP):
   def isRandom(self):
     return self.psps[0].isRandom()
 
+  def canBatch(self):
+    return self.psps[0].canBatch()
+
   def canAbsorb(self, trace, appNode, parentNode):
     return self.psps[0].canAbsorb(trace, appNode, parentNode)
 
@@ -643,7 +737,7 @@ class DispatchingPSP(PSP):
     return self.psps[0].hasVariationalLKernel()
 
   def getVariationalLKernel(self, args):
-    return self._disptach(args).getVariationalLKernel(args)
+    return self.dispatch(args).getVariationalLKernel(args)
 
   def hasSimulationKernel(self):
     return self.psps[0].hasSimulationKernel()
@@ -652,7 +746,7 @@ class DispatchingPSP(PSP):
     return self.psps[0].hasDeltaKernel()
 
   def getDeltaKernel(self, args):
-    return self._disptach(args).getDeltaKernel(args)
+    return self.dispatch(args).getDeltaKernel(args)
 
   def description(self, name):
     return self.psps[0].description(name)
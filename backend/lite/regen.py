@@ -16,11 +16,15 @@
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
 import math
+import time
 from collections import OrderedDict
 
 from venture.exception import VentureException
+from venture.lite.batch import MIN_BATCH
+from venture.lite.batch import DensityBatch
 from venture.lite.consistency import assertTorus
 from venture.lite.consistency import assertTrace
+from venture.lite.exception import VentureBuiltinSPMethodError
 from venture.lite.exception import VentureError
 from venture.lite.exception import VentureNestedRiplMethodError
 from venture.lite.lkernel import VariationalLKernel
@@ -57,36 +61,81 @@ def regenAndAttach(trace, scaffold, shouldRestore, omegaDB, gradients):
 
 def regenAndAttachAtBorder(trace, border, scaffold,
                            shouldRestore, omegaDB, gradients):
+  summary = trace.proposal_summary if trace.profiling_enabled else None
+  if summary is not None:
+    start = time.time()
   weight = 0
   constraintsToPropagate = OrderedDict()
+  # Score the border's many applications of any one batchable PSP together
+  batch = DensityBatch() if len(border) >= MIN_BATCH else None
   for node in border:
 #    print "regenAndAttach...", node
     if scaffold.isAbsorbing(node):
-      weight += attach(trace, node, scaffold, shouldRestore, omegaDB, gradients)
+      weight += attach(trace, node, scaffold, shouldRestore, omegaDB,
+                       gradients, batch)
     else:
       weight += regen(trace, node, scaffold, shouldRestore, omegaDB, gradients)
       if node.isObservation:
-        weight += getAndConstrain(trace, node, constraintsToPropagate)
+        weight += getAndConstrain(trace, node, constraintsToPropagate, batch)
+  if batch is not None:
+    weight += batch.weight()
   propagateConstraints(trace, constraintsToPropagate)
 
+  if summary is not None:
+    summary.regen_time += time.time() - start
   return ensure_python_float(weight)
 
-def getAndConstrain(trace, node, constraintsToPropagate):
+def getAndConstrain(trace, node, constraintsToPropagate, batch=None):
   appNode = trace.getConstrainableNode(node)
-  weight = constrain(trace, appNode, node.observedValue)
+  weight = constrain(trace, appNode, node.observedValue, batch)
   constraintsToPropagate[appNode] = node.observedValue
   return weight
 
-def constrain(trace, node, value):
+def constrain(trace, node, value, batch=None):
+  """Constrain node to value and return the weight, or leave the
+  weight to the given DensityBatch if there is one and it can take it."""
   psp, args = trace.pspAt(node), trace.argsAt(node)
   psp.unincorporate(trace.valueAt(node), args)
-  weight = psp.logDensity(value, args)
-  check_weight(weight, psp, args)
+  if batch is not None and psp.canBatch():
+    batch.add(psp, value, args)
+    weight = 0
+  else:
+    weight = psp.logDensity(value, args)
+    check_weight(weight, psp, args)
   trace.setValueAt(node, value)
   psp.incorporate(value, args)
   trace.registerConstrainedChoice(node)
   return ensure_python_float(weight)
 
+def constrainMany(trace, nodes, values):
+  """Constrain several nullary applications of the same made SP at once.
+
+  Return the total weight, computed in one go from the SP's aux as the
+  change in its logDensityOfData from before to after the new values
+  replace the old.  This is the weight of incorporating the values one
+  at a time, each conditioned on the previous ones.  Only sound when
+  the SP's maker can absorb at applications, which promises that
+  logDensityOfData is exact, if it is implemented at all; if not,
+  fall back to constraining the nodes one at a time.
+  """
+  psp = trace.pspAt(nodes[0])
+  aux = trace.spauxAt(nodes[0])
+  for node in nodes:
+    psp.unincorporate(trace.valueAt(node), trace.argsAt(node))
+  try:
+    weight = -psp.logDensityOfData(aux)
+  except VentureBuiltinSPMethodError:
+    for node in nodes:
+      psp.incorporate(trace.valueAt(node), trace.argsAt(node))
+    return sum(constrain(trace, node, value)
+               for node, value in zip(nodes, values))
+  for node, value in zip(nodes, values):
+    trace.setValueAt(node, value)
+    psp.incorporate(value, trace.argsAt(node))
+    trace.registerConstrainedChoice(node)
+  weight += psp.logDensityOfData(aux)
+  return ensure_python_float(weight)
+
 def propagateConstraints(trace, constraintsToPropagate):
   for node, value in constraintsToPropagate.iteritems():
     for child in trace.childrenAt(node):
@@ -112,16 +161,21 @@ def propagateConstraint(trace, node, value):
     trace.setValueAt(node, trace.pspAt(node).simulate(trace.argsAt(node)))
   for child in trace.childrenAt(node): propagateConstraint(trace, child, value)
 
-def attach(trace, node, scaffold, shouldRestore, omegaDB, gradients):
+def attach(trace, node, scaffold, shouldRestore, omegaDB, gradients,
+           batch=None):
   weight = regenParents(trace, node, scaffold, shouldRestore, omegaDB, gradients)
-  weight += absorb(trace, node)
+  weight += absorb(trace, node, batch)
   return weight
 
-def absorb(trace, node):
+def absorb(trace, node, batch=None):
   psp, args = trace.pspAt(node), trace.argsAt(node)
   gvalue = trace.groundValueAt(node)
-  weight = psp.logDensity(gvalue, args)
-  check_weight(weight, psp, args)
+  if batch is not None and psp.canBatch():
+    batch.add(psp, gvalue, args)
+    weight = 0
+  else:
+    weight = psp.logDensity(gvalue, args)
+    check_weight(weight, psp, args)
   psp.incorporate(gvalue, args)
   maybeRegisterRandomChoiceInScope(trace, node)
   return ensure_python_float(weight)
@@ -45,9 +45,12 @@ class Scaffold(object):
     self.drg = drg if drg else OrderedFrozenSet() # Set Node
     assert isinstance(self.drg, OrderedFrozenSet)
     # Store the drg for introspection; not directly read by regen/detach
+    self.pnodes = None # Set Node, the union of setsOfPNodes, computed lazily
 
   def getPrincipalNodes(self):
-    return OrderedFrozenSet([]).union(*self.setsOfPNodes)
+    if self.pnodes is None:
+      self.pnodes = OrderedFrozenSet([]).union(*self.setsOfPNodes)
+    return self.pnodes
   def getRegenCount(self,node): return self.regenCounts[node]
   def incrementRegenCount(self,node): self.regenCounts[node] += 1
   def decrementRegenCount(self,node): self.regenCounts[node] -= 1
@@ -64,6 +67,13 @@ class Scaffold(object):
     return pnodes[0]
   def isBrush(self, node): return node in self.brush
 
+  def copy(self):
+    # Shares the node sets, which are not mutated after construction,
+    # but not the regen counts or local kernels, which are.
+    return Scaffold(self.setsOfPNodes, OrderedDict(self.regenCounts),
+                    self.absorbing, self.aaa, self.border,
+                    OrderedDict(self.lkernels), self.brush, self.drg)
+
   def numAffectedNodes(self):
     return len(self.regenCounts)
 
@@ -85,6 +95,46 @@ class Scaffold(object):
     print "borders: " + str(self.border)
     print "lkernels: " + str(self.lkernels)
 
+class ScaffoldCache(object):
+  """Scaffolds constructed for the blocks of a trace, kept for reuse
+  until the trace changes structure.
+
+  Entries are keyed on (scope, block).  An entry is reused only if the
+  block still has the same principal nodes, and every application
+  node in its DRG or absorbing set still applies the same kind of
+  PSP.  The trace invalidates the whole cache whenever it creates
+  nodes, adds or removes ESR edges or lookups, changes constraints, or
+  evaluates or unevaluates a family; regenerating any brush does all
+  of these.
+  """
+  def __init__(self):
+    self.entries = {} # {(scope, block): ([Set Node], Scaffold, [(Node, type)])}
+    self.hits = 0
+    self.misses = 0
+    self.invalidations = 0
+
+  def lookup(self, trace, key, setsOfPNodes):
+    entry = self.entries.get(key)
+    if entry is not None:
+      (cachedSetsOfPNodes, scaffold, pspTypes) = entry
+      if cachedSetsOfPNodes == setsOfPNodes and \
+         all(type(trace.pspAt(node)) is pspType for (node, pspType) in pspTypes):
+        self.hits += 1
+        return scaffold.copy()
+    self.misses += 1
+    return None
+
+  def insert(self, trace, key, setsOfPNodes, scaffold):
+    pspTypes = [(node, type(trace.pspAt(node)))
+                for node in scaffold.drg.union(scaffold.absorbing)
+                if isOutputNode(node) or isRequestNode(node)]
+    self.entries[key] = (setsOfPNodes, scaffold.copy(), pspTypes)
+
+  def invalidate(self):
+    if self.entries:
+      self.entries.clear()
+      self.invalidations += 1
+
 # Calling subsampled_mh may create broken deterministic
 # relationships in the trace.  For example, consider updating mu in the
 # program:
@@ -255,7 +305,7 @@ def removeBrush(cDRG,cAbsorbing,cAAA,brush):
 
 def hasChildInAorD(trace,drg,absorbing,node):
   kids = trace.childrenAt(node)
-  return kids.intersection(drg) or kids.intersection(absorbing)
+  return not (kids.isdisjoint(drg) and kids.isdisjoint(absorbing))
 
 def findBorder(trace,drg,absorbing,aaa):
   border = absorbing.union(aaa)
@@ -77,3 +77,42 @@ registerBuiltinSP("tag_exclude",
     typed_nr(TagExcludeOutputPSP(),
              [t.AnyType("<scope>"), t.AnyType()],
              t.AnyType()))
+
+class ExtentCache(object):
+  """The random choices in the extent of each block of a non-default
+  scope, kept for reuse across transitions.
+
+  Entries are keyed on (scope, block).  An entry is reused only if the
+  block still tags the same nodes in the same order, and every
+  application the extent walk passed through is as the walk found it:
+  see Trace.extentDependency.  A change of structure elsewhere in the
+  trace, such as regenerating brush outside the extent, leaves the
+  entry valid.  The trace clears the whole cache only when a directive
+  is forgotten, to drop entries for blocks that may be gone.
+  """
+  def __init__(self):
+    self.entries = {} # {(scope, block): (OrderedSet Node, OrderedSet Node, deps)}
+    self.hits = 0
+    self.misses = 0
+    self.invalidations = 0
+
+  def lookup(self, trace, key, nodes):
+    entry = self.entries.get(key)
+    if entry is not None:
+      (cachedNodes, pnodes, deps) = entry
+      # The deps are in the order the walk visited them, so a node
+      # removed from the trace is caught at its parent first.
+      if cachedNodes == nodes and \
+         all(trace.extentDependency(node) == dep for (node, dep) in deps):
+        self.hits += 1
+        return pnodes.copy()
+    self.misses += 1
+    return None
+
+  def insert(self, key, nodes, pnodes, deps):
+    self.entries[key] = (nodes.copy(), pnodes.copy(), deps)
+
+  def invalidate(self):
+    if self.entries:
+      self.entries.clear()
+      self.invalidations += 1
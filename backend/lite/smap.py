@@ -16,11 +16,17 @@
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
 from collections import OrderedDict
+import bisect
 
 class SamplableMap(object):
+  """Map supporting uniform sampling of its entries in O(1).
+
+  Also answers ordered and ranged queries over its keys in O(log n + k)
+  once asked one, by keeping a sorted list of the keys from then on."""
   def __init__(self):
     self.d = OrderedDict()
     self.a = []
+    self.sorted = None # Sorted list of keys, made on demand
 
   def __getitem__(self,k):
     return self.a[self.d[k]][1]
@@ -30,6 +36,8 @@ class SamplableMap(object):
     assert k not in self.d
     self.d[k] = len(self.a)
     self.a.append((k,v))
+    if self.sorted is not None:
+      bisect.insort(self.sorted, k)
 
   def __delitem__(self,k):
     assert k in self.d
@@ -43,6 +51,12 @@ class SamplableMap(object):
     self.a.pop()
     del self.d[k]
     assert len(self.d) == len(self.a)
+    if self.sorted is not None:
+      i = bisect.bisect_left(self.sorted, k)
+      if i < len(self.sorted) and self.sorted[i] == k:
+        del self.sorted[i]
+      else:
+        self.sorted.remove(k)
 
   def __contains__(self,k): return k in self.d
   def __len__(self): return len(self.a)
@@ -57,6 +71,20 @@ class SamplableMap(object):
 
   def keys(self): return self.d.keys()
 
+  def sortedKeys(self):
+    """The keys in ascending order."""
+    if self.sorted is None:
+      self.sorted = sorted(self.d)
+    return list(self.sorted)
+
+  def keysBetween(self, low, high):
+    """The keys k with low <= k <= high, in ascending order."""
+    if self.sorted is None:
+      self.sorted = sorted(self.d)
+    start = bisect.bisect_left(self.sorted, low)
+    end = bisect.bisect_right(self.sorted, high)
+    return self.sorted[start:end]
+
   def values(self): return [v for (_,v) in self.a]
 
   def iteritems(self): return self.a
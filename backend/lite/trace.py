@@ -27,6 +27,8 @@ from numpy.testing import assert_allclose
 from venture.exception import VentureException
 from venture.lite.builtin import builtInSPsIter
 from venture.lite.builtin import builtInValues
+from venture.lite.batch import MIN_BATCH
+from venture.lite.batch import DensityBatch
 from venture.lite.detach import detachAndExtract
 from venture.lite.detach import unconstrain
 from venture.lite.detach import unevalFamily
@@ -45,13 +47,17 @@ from venture.lite.node import TraceNodeArgs
 from venture.lite.omegadb import OmegaDB
 from venture.lite.orderedset import OrderedSet
 from venture.lite.psp import ESRRefOutputPSP
+from venture.lite.profiler import ProposalSummary
 from venture.lite.regen import constrain
+from venture.lite.regen import constrainMany
 from venture.lite.regen import evalFamily
 from venture.lite.regen import processMadeSP
 from venture.lite.regen import regenAndAttach
 from venture.lite.regen import restore
 from venture.lite.scaffold import Scaffold
+from venture.lite.scaffold import ScaffoldCache
 from venture.lite.scaffold import constructScaffold
+from venture.lite.scope import ExtentCache
 from venture.lite.scope import isTagExcludeOutputPSP
 from venture.lite.scope import isTagOutputPSP
 from venture.lite.serialize import OrderedOmegaDB
@@ -68,6 +74,8 @@ import venture.lite.infer as infer
 
 class Trace(object):
   def __init__(self, seed):
+    self.scaffold_cache = None # ScaffoldCache, if set_scaffold_caching
+    self.extent_cache = None # ExtentCache, if set_extent_caching
 
     self.globalEnv = VentureEnvironment()
     for name, val in builtInValues().iteritems():
@@ -85,6 +93,7 @@ class Trace(object):
 
     self.profiling_enabled = False
     self.stats = []
+    self.proposal_summary = None
 
     assert seed is not None
     rng = random.Random(seed)
@@ -170,22 +179,28 @@ class Trace(object):
   def registerConstrainedChoice(self, node):
     if node in self.ccs:
       raise VentureException("evaluation", "Cannot constrain the same random choice twice.", address = node.address)
+    self.invalidateStructureCaches()
     self.ccs.add(node)
     self.unregisterRandomChoice(node)
 
   def unregisterConstrainedChoice(self, node):
     assert node in self.ccs
+    self.invalidateStructureCaches()
     self.ccs.remove(node)
     if self.pspAt(node).isRandom(): self.registerRandomChoice(node)
 
-  def createConstantNode(self, address, val): return ConstantNode(address, val)
+  def createConstantNode(self, address, val):
+    self.invalidateStructureCaches()
+    return ConstantNode(address, val)
   def createLookupNode(self, address, sourceNode):
+    self.invalidateStructureCaches()
     lookupNode = LookupNode(address, sourceNode)
     self.setValueAt(lookupNode, self.valueAt(sourceNode))
     self.addChildAt(sourceNode, lookupNode)
     return lookupNode
 
   def createApplicationNodes(self, address, operatorNode, operandNodes, env):
+    self.invalidateStructureCaches()
     requestNode = RequestNode(address, operatorNode, operandNodes, env)
     outputNode = OutputNode(address, operatorNode, operandNodes, requestNode, env)
     self.addChildAt(operatorNode, requestNode)
@@ -197,21 +212,25 @@ class Trace(object):
     return (requestNode, outputNode)
 
   def addESREdge(self, esrParent, outputNode):
+    self.invalidateStructureCaches()
     self.incRequestsAt(esrParent)
     self.addChildAt(esrParent, outputNode)
     self.appendEsrParentAt(outputNode, esrParent)
 
   def popLastESRParent(self, outputNode):
     assert self.esrParentsAt(outputNode)
+    self.invalidateStructureCaches()
     esrParent = self.popEsrParentAt(outputNode)
     self.removeChildAt(esrParent, outputNode)
     self.decRequestsAt(esrParent)
     return esrParent
 
   def disconnectLookup(self, lookupNode):
+    self.invalidateStructureCaches()
     self.removeChildAt(lookupNode.sourceNode, lookupNode)
 
   def reconnectLookup(self, lookupNode):
+    self.invalidateStructureCaches()
     self.addChildAt(lookupNode.sourceNode, lookupNode)
 
   def groundValueAt(self, node):
@@ -280,12 +299,16 @@ class Trace(object):
   def definiteParentsAt(self, node): return node.definiteParents()
 
   def esrParentsAt(self, node): return node.esrParents
-  def setEsrParentsAt(self, node, parents): node.esrParents = parents
+  def setEsrParentsAt(self, node, parents):
+    self.invalidateStructureCaches()
+    node.esrParents = parents
   def appendEsrParentAt(self, node, parent): node.esrParents.append(parent)
   def popEsrParentAt(self, node): return node.esrParents.pop()
 
   def childrenAt(self, node): return node.children
-  def setChildrenAt(self, node, children): node.children = children
+  def setChildrenAt(self, node, children):
+    self.invalidateStructureCaches()
+    node.children = children
   def addChildAt(self, node, child): node.children.add(child)
   def removeChildAt(self, node, child): node.children.remove(child)
 
@@ -331,10 +354,10 @@ class Trace(object):
 
   def getOrderedSetsInScope(self, scope, interval=None):
     if interval is None:
-      return [self.getNodesInBlock(scope, block) for block in sorted(self.getScope(scope).keys())]
+      blocks = self.getScope(scope).sortedKeys()
     else:
-      blocks = [b for b in self.getScope(scope).keys() if b >= interval[0] if b <= interval[1]]
-      return [self.getNodesInBlock(scope, block) for block in sorted(blocks)]
+      blocks = self.getScope(scope).keysBetween(interval[0], interval[1])
+    return [self.getNodesInBlock(scope, block) for block in blocks]
 
   def numNodesInBlock(self, scope, block): return len(self.getNodesInBlock(scope, block, do_copy=False))
 
@@ -346,7 +369,7 @@ class Trace(object):
     # unregisterRandomChoice will mutate them.
     if scope == "default":
       if do_copy:
-        return OrderedSet(list(nodes))
+        return nodes.copy()
       else:
         return nodes
     else:
@@ -355,35 +378,64 @@ class Trace(object):
   def randomChoicesInExtent(self, nodes, scope, block):
     # The scope and block, if present, limit the computed dynamic
     # extent to everything that is not explicitly excluded from them.
+    cache = self.extent_cache
+    if cache is not None:
+      pnodes = cache.lookup(self, (scope, block), nodes)
+      if pnodes is not None: return pnodes
+    deps = [] if cache is not None else None
     pnodes = OrderedSet()
-    for node in nodes: self.addRandomChoicesInExtent(node, scope, block, pnodes)
+    for node in nodes: self.addRandomChoicesInExtent(node, scope, block, pnodes, deps)
+    if cache is not None: cache.insert((scope, block), nodes, pnodes, deps)
     return pnodes
 
-  def addRandomChoicesInExtent(self, node, scope, block, pnodes):
+  def addRandomChoicesInExtent(self, node, scope, block, pnodes, deps=None):
+    # deps, if given, collects what the walk depended on, for the
+    # ExtentCache to check.
     if not isOutputNode(node): return
 
-    if self.pspAt(node).isRandom() and node not in self.ccs: pnodes.add(node)
+    psp = self.pspAt(node)
+    if deps is not None:
+      deps.append((node, self.extentDependency(node)))
+
+    if psp.isRandom() and node not in self.ccs: pnodes.add(node)
 
     requestNode = node.requestNode
     if self.pspAt(requestNode).isRandom() and requestNode not in self.ccs: pnodes.add(requestNode)
 
     for esr in self.valueAt(node.requestNode).esrs:
-      self.addRandomChoicesInExtent(self.spFamilyAt(requestNode, esr.id), scope, block, pnodes)
+      self.addRandomChoicesInExtent(self.spFamilyAt(requestNode, esr.id), scope, block, pnodes, deps)
 
-    self.addRandomChoicesInExtent(node.operatorNode, scope, block, pnodes)
+    self.addRandomChoicesInExtent(node.operatorNode, scope, block, pnodes, deps)
 
     for i, operandNode in enumerate(node.operandNodes):
-      if i == 2 and isTagOutputPSP(self.pspAt(node)):
+      if i == 2 and isTagOutputPSP(psp):
         (new_scope, new_block, _) = [self.valueAt(randNode) for randNode in node.operandNodes]
         (new_scope, new_block) = self._normalizeEvaluatedScopeAndBlock(new_scope, new_block)
-        if scope != new_scope or block == new_block: self.addRandomChoicesInExtent(operandNode, scope, block, pnodes)
-      elif i == 1 and isTagExcludeOutputPSP(self.pspAt(node)):
+        if scope != new_scope or block == new_block: self.addRandomChoicesInExtent(operandNode, scope, block, pnodes, deps)
+      elif i == 1 and isTagExcludeOutputPSP(psp):
         (excluded_scope, _) = [self.valueAt(randNode) for randNode in node.operandNodes]
         excluded_scope = self._normalizeEvaluatedScope(excluded_scope)
-        if scope != excluded_scope: self.addRandomChoicesInExtent(operandNode, scope, block, pnodes)
+        if scope != excluded_scope: self.addRandomChoicesInExtent(operandNode, scope, block, pnodes, deps)
       else:
-        self.addRandomChoicesInExtent(operandNode, scope, block, pnodes)
-
+        self.addRandomChoicesInExtent(operandNode, scope, block, pnodes, deps)
+
+
+  def extentDependency(self, node):
+    """Everything about the output node that addRandomChoicesInExtent
+looks at: its PSP, the scope and block values if it is a tag, the
+roots of the families it requested, and whether it and its request
+node are constrained."""
+    psp = self.pspAt(node)
+    if isTagOutputPSP(psp):
+      tagValues = tuple(self.valueAt(n) for n in node.operandNodes[0:2])
+    elif isTagExcludeOutputPSP(psp):
+      tagValues = (self.valueAt(node.operandNodes[0]),)
+    else:
+      tagValues = None
+    requestNode = node.requestNode
+    families = tuple(self.spFamilyAt(requestNode, esr.id)
+                     for esr in self.valueAt(requestNode).esrs)
+    return (psp, tagValues, families, node in self.ccs, requestNode in self.ccs)
 
   def scopeHasEntropy(self, scope):
     # right now scope in self.scopes iff it has entropy
@@ -396,6 +448,7 @@ class Trace(object):
   #### External interface to engine.py
   def eval(self, id, exp):
     assert id not in self.families
+    self.invalidateStructureCaches()
     (_, self.families[id]) = evalFamily(
       self, addr.directive_address(id), self.unboxExpression(exp), self.globalEnv,
       Scaffold(), False, OmegaDB(), OrderedDict())
@@ -421,9 +474,23 @@ class Trace(object):
 
   def makeConsistent(self):
     weight = 0
+    batches = OrderedDict() # {id(spaux): [(node, appNode, val)]}
+    if len(self.unpropagatedObservations) >= MIN_BATCH:
+      densities = DensityBatch()
+    else:
+      densities = None
     for node, val in self.unpropagatedObservations.iteritems():
       appNode = self.getConstrainableNode(node)
 #      print "PROPAGATE", node, appNode
+      if self.canConstrainInPlace(appNode):
+        if self.canConstrainInBatch(appNode):
+          # Defer to one pass per made SP, below
+          key = id(self.spauxAt(appNode))
+          batches.setdefault(key, []).append((node, appNode, val))
+        else:
+          node.observe(val)
+          weight += constrain(self, appNode, node.observedValue, densities)
+        continue
       scaffold = constructScaffold(self, [OrderedSet([appNode])])
       rhoWeight, _ = detachAndExtract(self, scaffold)
       scaffold.lkernels[appNode] = DeterministicLKernel(self.pspAt(appNode), val)
@@ -434,6 +501,13 @@ class Trace(object):
       constrain(self, appNode, node.observedValue)
       weight += xiWeight
       weight -= rhoWeight
+    for batch in batches.itervalues():
+      for (node, _, val) in batch:
+        node.observe(val)
+      weight += constrainMany(self, [appNode for (_, appNode, _) in batch],
+                              [node.observedValue for (node, _, _) in batch])
+    if densities is not None:
+      weight += densities.weight()
     self.unpropagatedObservations.clear()
     if not math.isnan(weight):
       # Note: +inf weight is possible at spikes in density against
@@ -456,6 +530,25 @@ class Trace(object):
       constrain(self, appNode, node.observedValue)
     self.unpropagatedObservations.clear()
 
+  def canConstrainInPlace(self, appNode):
+    """Whether constraining the given node needs no scaffold.
+
+    That is so when nothing in the trace depends on the node's value,
+    so that detaching and regenerating it with a deterministic kernel
+    amounts to just replacing its value.
+    """
+    return not self.childrenAt(appNode) and \
+      not self.esrParentsAt(appNode) and \
+      not isinstance(self.valueAt(appNode), SPRef)
+
+  def canConstrainInBatch(self, appNode):
+    """Whether the given node, constrainable in place, may be constrained
+    together with the other applications of its SP by constrainMany."""
+    if appNode.operandNodes:
+      return False
+    makerNode = self.spRefAt(appNode).makerNode
+    return isOutputNode(makerNode) and self.pspAt(makerNode).childrenCanAAA()
+
   def getConstrainableNode(self, node):
     candidate = self.getOutermostNonReferenceNode(node)
     if isConstantNode(candidate):
@@ -494,6 +587,9 @@ class Trace(object):
 
   def uneval(self, id):
     assert id in self.families
+    self.invalidateStructureCaches()
+    if self.extent_cache is not None:
+      self.extent_cache.invalidate()
     unevalFamily(self, self.families[id], Scaffold(), OmegaDB())
     del self.families[id]
 
@@ -531,6 +627,7 @@ class Trace(object):
 
   def freeze(self, id):
     assert id in self.families
+    self.invalidateStructureCaches()
     node = self.families[id]
     if isConstantNode(node):
       # All set
@@ -722,13 +819,61 @@ the scaffold determined by the given expression."""
       node.madeSPRecord.spFamilies.registerFamily(id, root)
 
   def addNewChildren(self, node, newChildren):
+    self.invalidateStructureCaches()
     for child in newChildren:
       node.children.add(child)
 
   #### Configuration
 
-  def set_profiling(self, enabled=True):
+  def set_profiling(self, enabled=True, summary=False, sample_every=0):
+    """Turn the proposal profiler on or off.
+
+    By default every proposal is recorded in self.stats.  With
+    summary=True, proposals are instead aggregated into
+    self.proposal_summary, and only every sample_every-th one (none,
+    if sample_every is 0) is recorded in full."""
     self.profiling_enabled = enabled
+    if not enabled:
+      return
+    if summary:
+      if self.proposal_summary is None:
+        self.proposal_summary = ProposalSummary(sample_every)
+      else:
+        self.proposal_summary.sample_every = sample_every
+    else:
+      self.proposal_summary = None
 
   def clear_profiling(self):
     self.stats = []
+    if self.proposal_summary is not None:
+      self.proposal_summary = ProposalSummary(
+        self.proposal_summary.sample_every)
+
+  def profile_summary(self):
+    if self.proposal_summary is None:
+      return []
+    return list(self.proposal_summary.rows())
+
+  def cache_stats(self):
+    """The hits, misses and invalidations of each structure cache in use."""
+    caches = [('scaffold', self.scaffold_cache), ('extent', self.extent_cache)]
+    return [OrderedDict([('cache', name), ('hits', cache.hits),
+                         ('misses', cache.misses),
+                         ('invalidations', cache.invalidations)])
+            for (name, cache) in caches if cache is not None]
+
+  def set_scaffold_caching(self, enabled=True):
+    if not enabled:
+      self.scaffold_cache = None
+    elif self.scaffold_cache is None:
+      self.scaffold_cache = ScaffoldCache()
+
+  def set_extent_caching(self, enabled=True):
+    if not enabled:
+      self.extent_cache = None
+    elif self.extent_cache is None:
+      self.extent_cache = ExtentCache()
+
+  def invalidateStructureCaches(self):
+    if self.scaffold_cache is not None:
+      self.scaffold_cache.invalidate()
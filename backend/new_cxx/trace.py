@@ -19,6 +19,7 @@ import numpy.random as npr
 
 import libpumatrace as puma
 
+from venture.exception import VentureException
 from venture.lite.sp import VentureSPRecord
 from venture.lite.value import VentureValue
 from venture.lite.builtin import builtInSPs
@@ -130,11 +131,29 @@ class Trace(object):
   def numBlocksInScope(self, scope):
     return self.trace.numBlocksInScope(_coerce_to_stack_dict(scope))
 
-  def set_profiling(self, _enabled):
-    pass # Puma can't be internally profiled (currently)
+  # pylint: disable=unused-argument
+  def set_profiling(self, enabled=True, summary=False, sample_every=0):
+    # Puma can't be internally profiled (currently), so refuse the
+    # summary profiler rather than appear to collect it.
+    if enabled and summary:
+      raise VentureException("invalid_argument",
+        "Puma does not support the summary proposal profiler; use Lite.",
+        argument="summary")
 
   def clear_profiling(self): pass
 
+  def profile_summary(self):
+    raise VentureException("invalid_argument",
+      "Puma does not support the summary proposal profiler; use Lite.")
+
+  def set_scaffold_caching(self, _enabled):
+    pass # Puma constructs its scaffolds in C++
+
+  def set_extent_caching(self, _enabled):
+    pass # Puma computes extents in C++
+
+  def cache_stats(self): return []
+
 def _unwrapVentureValue(val):
   if isinstance(val, VentureValue):
     return val.asStackDict(None)["value"]
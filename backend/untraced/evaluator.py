@@ -16,6 +16,8 @@
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
 import random
+import weakref
+
 import numpy.random as npr
 
 from venture.exception import VentureException
@@ -32,29 +34,54 @@ import venture.untraced.node as node
 # We still have a notion of nodes.  A node is a thing that knows its
 # address, and its value if it has one.
 
+# Expressions are compiled into trees of Python closures, each taking
+# the place of its expression (an address, or a node.Subexpression
+# standing for one), an environment, and the Python random number
+# generator, and returning the value.  Compiling does once, per
+# expression, the classification of subexpressions and conversion of
+# constants that walking the expression on every evaluation would
+# repeat.  Variables are still looked up when the closure runs,
+# because environment frames may be extended and rebound after the
+# closure is made.
+
 def eval(address, exp, env, rng):
   # The exact parallel to venture.lite.regen.eval would be to return a
   # Node, but since the address will always be the input address,
   # might as well just return the value.
-  if e.isVariable(exp):
+  return compile_expression(exp)(address, env, rng)
+
+def compile_expression(exp):
+  if e.isVariable(exp): return _compile_variable(exp)
+  elif e.isSelfEvaluating(exp): return _compile_constant(node.normalize(exp))
+  elif e.isQuotation(exp):
+    return _compile_constant(node.normalize(e.textOfQuotation(exp)))
+  else: return _compile_application(exp)
+
+def _compile_variable(sym):
+  def lookup(place, env, _rng):
     try:
-      value = env.findSymbol(exp).value
+      return env.findSymbol(sym).value
     except VentureError as err:
       import sys
       info = sys.exc_info()
-      raise VentureException("evaluation", err.message, address=address), None, info[2]
-    return value
-  elif e.isSelfEvaluating(exp): return node.normalize(exp)
-  elif e.isQuotation(exp): return node.normalize(e.textOfQuotation(exp))
-  else:
+      raise VentureException("evaluation", err.message,
+                             address=node.address_of(place)), None, info[2]
+  return lookup
+
+def _compile_constant(value):
+  return lambda _place, _env, _rng: value
+
+def _compile_application(exp):
+  subexps = [(index, compile_expression(subexp))
+             for index, subexp in enumerate(exp)]
+  def application(place, env, rng):
     nodes = []
-    for index, subexp in enumerate(exp):
-      addr2 = addr.extend(address, index)
-      v = eval(addr2,subexp,env,rng)
-      nodes.append(node.Node(addr2, v))
+    for index, subexp in subexps:
+      place2 = node.Subexpression(place, index)
+      nodes.append(node.LazyNode(place2, subexp(place2, env, rng)))
 
     try:
-      val = apply(address, nodes, env, rng)
+      return apply(place, nodes, env, rng)
     except VentureNestedRiplMethodError as err:
       # This is a hack to allow errors raised by inference SP actions
       # that are ripl actions to blame the address of the maker of the
@@ -69,13 +96,15 @@ def eval(address, exp, env, rng):
     except Exception as err:
       import sys
       info = sys.exc_info()
-      raise VentureException("evaluation", err.message, address=address, cause=err), None, info[2]
-    return val
+      raise VentureException("evaluation", err.message,
+                             address=node.address_of(place), cause=err), None, info[2]
+  return application
 
 def apply(address, nodes, env, rng):
   spr = nodes[0].value
   if not isinstance(spr, VentureSPRecord):
-    raise VentureException("evaluation", "Cannot apply a non-procedure", address=address)
+    raise VentureException("evaluation", "Cannot apply a non-procedure",
+                           address=node.address_of(address))
   req_args = RequestArgs(address, nodes[1:], env, rng.randint(1, 2**31 - 1))
   requests = applyPSP(spr.sp.requestPSP, req_args)
   req_nodes = [evalRequest(req_args, spr, r, rng) for r in requests.esrs]
@@ -86,7 +115,7 @@ class RequestArgs(IArgs):
   "A package containing all the evaluation context information that a RequestPSP might need, parallel to venture.lite.node.Args"
   def __init__(self, address, nodes, env, seed):
     super(RequestArgs, self).__init__()
-    self.node = node.Node(address)
+    self.node = node.LazyNode(address)
     self.operandNodes = nodes
     self.env = env
     assert seed is not None
@@ -144,7 +173,7 @@ def evalRequest(req_args, spr, r, rng):
     return families.getFamily(r.id)
   else:
     new_addr = addr.request(req_args.node.address, r.addr)
-    ans = node.Node(new_addr, eval(new_addr, r.exp, r.env, rng))
+    ans = node.Node(new_addr, _request_code(spr, r)(new_addr, r.env, rng))
     if nonRepeatableRequestID(req_args, r.id):
       pass
     else:
@@ -155,3 +184,17 @@ def nonRepeatableRequestID(req_args, id):
   # Conservatively detect patterns or request ids indicating intention
   # not to collide, so they do not need to be stored.
   return id == req_args.node or (isinstance(id, tuple) and id[0] == req_args.node)
+
+# The code for the expression a requester last requested, by
+# requester.  A compound procedure requests its body every time it is
+# called, so this saves compiling it more than once; other SPs make up
+# the expressions they request, so those would seldom be seen again.
+_request_codes = weakref.WeakKeyDictionary()
+
+def _request_code(spr, r):
+  psp = spr.sp.requestPSP
+  entry = _request_codes.get(psp)
+  if entry is None or entry[0] is not r.exp:
+    entry = (r.exp, compile_expression(r.exp))
+    _request_codes[psp] = entry
+  return entry[1]
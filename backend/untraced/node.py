@@ -15,6 +15,7 @@
 # You should have received a copy of the GNU General Public License
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
+from ..lite import address as addr
 from ..lite import value as vv
 from ..lite import types as t
 
@@ -33,3 +34,36 @@ class Node(object):
   def __init__(self, address, value = None):
     self.address = address
     self.value = normalize(value)
+
+# Making an address is relatively expensive, and the address of most
+# subexpressions is never looked at, so the compiled evaluator passes
+# places in the expression around instead, and makes their addresses
+# only when asked.
+
+class Subexpression(object):
+  """The place of a subexpression, standing for its address."""
+  def __init__(self, sup, index):
+    self.sup = sup # The address or Subexpression of the enclosing expression
+    self.index = index
+    self._address = None
+
+  def address(self):
+    if self._address is None:
+      self._address = addr.extend(address_of(self.sup), self.index)
+    return self._address
+
+def address_of(place):
+  if isinstance(place, Subexpression):
+    return place.address()
+  else:
+    return place
+
+class LazyNode(object):
+  """A Node at a place, whose address is made only if asked for."""
+  def __init__(self, place, value = None):
+    self.place = place
+    self.value = value
+
+  @property
+  def address(self):
+    return address_of(self.place)
@@ -39,12 +39,29 @@ class Trace(object):
     for name, sp in builtin.builtInSPs().iteritems():
       self.bindPrimitiveSP(name, sp)
     self.sealEnvironment() # New frame so users can shadow globals
+    self.shared_env = None
+    self._seed_prngs(seed)
 
+  def _seed_prngs(self, seed):
     assert seed is not None
     rng = random.Random(seed)
     self.np_rng = npr.RandomState(rng.randint(1, 2**31 - 1))
     self.py_rng = random.Random(rng.randint(1, 2**31 - 1))
 
+  def clone(self, seed):
+    """A Trace with all the bindings of this one, without copying them.
+
+The clone binds into a frame of its own, in front of this Trace's
+environment, which it shares; and shadows, rather than removes, any
+binding it unbinds from the shared frames.  So this Trace is left
+unchanged, as long as it is not itself bound into after cloning."""
+    ans = Trace.__new__(Trace)
+    ans.results = {}
+    ans.env = env.VentureEnvironment(self.env)
+    ans.shared_env = self.env
+    ans._seed_prngs(seed)
+    return ans
+
   def sealEnvironment(self):
     self.env = env.VentureEnvironment(self.env)
 
@@ -55,10 +72,12 @@ class Trace(object):
     return self.extractRaw(id).asStackDict(self)
 
   def eval(self, id, exp):
+    self.eval_compiled(id, compile_expression(exp))
+
+  def eval_compiled(self, id, code):
+    """Evaluate code from compile_expression as the directive id."""
     assert id not in self.results
-    py_exp = t.ExpressionType().asPython(vv.VentureValue.fromStackDict(exp))
-    rng = self.py_rng
-    val = evaluator.eval(addr.directive_address(id), py_exp, self.env, rng)
+    val = code(addr.directive_address(id), self.env, self.py_rng)
     assert isinstance(val, vv.VentureValue)
     self.results[id] = val
 
@@ -84,6 +103,25 @@ class Trace(object):
     except VentureError as e:
       raise VentureException("invalid_argument", message=e.message, argument="symbol")
 
-  def unbindInGlobalEnv(self, sym): self.env.removeBinding(sym)
+  def unbindInGlobalEnv(self, sym):
+    if self.shared_env is None:
+      return self.env.removeBinding(sym)
+    frame = self.env
+    while frame is not self.shared_env:
+      if sym in frame.frame:
+        if frame.frame[sym] is None:
+          # Already shadowed by an earlier unbind
+          break
+        return self.env.removeBinding(sym)
+      frame = frame.outerEnv
+    if not self.env.symbolBound(sym):
+      raise VentureError("Cannot unbind unbound symbol '%s'" % sym)
+    self.env.frame[sym] = None # Binding to None shadows
 
   def boundInGlobalEnv(self, sym): return self.env.symbolBound(sym)
+
+def compile_expression(exp):
+  """Compile a stack dict expression, for evaluating (perhaps many
+times, in any Trace) with eval_compiled."""
+  py_exp = t.ExpressionType().asPython(vv.VentureValue.fromStackDict(exp))
+  return evaluator.compile_expression(py_exp)
@@ -19,6 +19,7 @@ from collections import namedtuple
 import math
 
 from venture.lite.orderedset import OrderedFrozenSet
+from venture.lite.overlay import OverlaySet
 from venture.lite.scaffold import constructScaffold, Scaffold
 from venture.lite.smap import SamplableMap
 from venture.lite.sp_help import deterministic_typed
@@ -28,10 +29,10 @@ import venture.lite.node as n
 import venture.lite.types as t
 
 def _is_set(thing):
-  return isinstance(thing, OrderedFrozenSet) or isinstance(thing, PSet)
+  return isinstance(thing, (OrderedFrozenSet, OverlaySet, PSet))
 
 def _canonicalize_to_ordered_frozen_set(thing):
-  if isinstance(thing, PSet):
+  if isinstance(thing, (OverlaySet, PSet)):
     # Intended type canonicalization
     return OrderedFrozenSet(list(thing))
   else:
@@ -0,0 +1,73 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Microbenchmark of Lite scaffold construction.
+
+Builds the LDA model from test/performance/asymptotics/test_lda.py
+and a CRP mixture of Gaussians at a few sizes, and reports the time
+to construct the scaffold of every block in the default scope.  This
+exercises the ordered sets that hold the DRG, absorbing, AAA, brush
+and border nodes.  Run it against two builds to compare them:
+
+    ../pythenv.sh python scaffold_construction.py
+"""
+
+import os
+import time
+
+from venture.lite.scaffold import constructScaffold
+from venture.shortcuts import make_lite_church_prime_ripl
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+lda_path = os.path.join(root, "examples", "lda.vnt")
+
+def lda_ripl(n):
+  r = make_lite_church_prime_ripl(seed=1)
+  r.execute_program_from_file(lda_path)
+  r.infer("(model 4 5)")
+  r.infer("(data %d 8)" % (n,))
+  return r
+
+def crp_mixture_ripl(n):
+  r = make_lite_church_prime_ripl(seed=1)
+  r.assume("alpha", "(gamma 1.0 1.0)")
+  r.assume("crp", "(make_crp alpha)")
+  r.assume("z", "(mem (lambda (i) (crp)))")
+  r.assume("mu", "(mem (lambda (z) (normal 0 10)))")
+  r.assume("x", "(lambda (i) (normal (mu (z i)) 1))")
+  for i in range(n):
+    r.observe("(x %d)" % (i,), float(i % 5))
+  return r
+
+def time_scaffolds(ripl, repeats=5):
+  trace = ripl.sivm.core_sivm.engine.getDistinguishedTrace().trace
+  blocks = trace.getOrderedSetsInScope("default")
+  start = time.time()
+  for _ in range(repeats):
+    for pnodes in blocks:
+      constructScaffold(trace, [pnodes])
+  return (time.time() - start) / (repeats * len(blocks)), len(blocks)
+
+def main():
+  for (name, mk) in [("lda", lda_ripl), ("crp-mixture", crp_mixture_ripl)]:
+    for n in [4, 16, 64]:
+      (per_block, ct) = time_scaffolds(mk(n))
+      print "%-12s n=%-3d %5d blocks %8.1f us/scaffold" % \
+        (name, n, ct, per_block * 1e6)
+
+if __name__ == '__main__':
+  main()
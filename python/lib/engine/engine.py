@@ -19,13 +19,18 @@ from contextlib import contextmanager
 import cPickle
 import cStringIO as StringIO
 import random
+import sys
 import threading
 import time
 
 from venture.engine.inference import Infer
+import venture.engine.snapshot as snapshot
 from venture.engine.trace_set import TraceSet
+from venture.engine.trace_set import is_picklable
 from venture.exception import VentureException
+import venture.ingest as ingest
 import venture.lite.inference_sps as inf
+from venture.ripl.utils import strip_types
 import venture.untraced.trace_search # So the SPs get registered
 import venture.lite.value as vv
 import venture.value.dicts as v
@@ -35,15 +40,26 @@ class Engine(object):
   def __init__(self, backend, seed, persistent_inference_trace=True):
     assert seed is not None
     self._py_rng = random.Random(seed)
+    self.foreign_sps = {} # Before the model, whose trace copiers share it
     self.model = self.new_model(backend)
     self.directiveCounter = 0
     self.inferrer = None
-    self.foreign_sps = {}
     self.inference_sps = dict(inf.inferenceSPsList)
     self.callbacks = {}
+    self.compiled_continuous_inference = False
+    self.continuous_inference_batch_size = 1
+    # The last program compiled for continuous inference, and its step.
+    # Continuous inference is restarted around every directive.
+    self._compiled_step = (None, None)
     self.persistent_inference_trace = persistent_inference_trace
+    # Cloned for each inference run if the trace is not persistent
+    self.inference_trace_template = None
+    # Seconds taken to set up the first inference trace
+    self.inference_startup_time = None
     if self.persistent_inference_trace:
-      self.infer_trace = self.init_inference_trace()
+      self.infer_trace = self.init_first_inference_trace()
+    else:
+      self.infer_trace = None
     self.ripl = None
     self.creation_time = time.time()
 
@@ -57,6 +73,8 @@ class Engine(object):
     self.inference_sps[name] = sp
     if self.persistent_inference_trace:
       self.infer_trace.bindPrimitiveSP(name, sp)
+    else:
+      self.inference_trace_template = None # Rebuild with the new SP
 
   def bind_callback(self, name, callback):
     self.callbacks[name] = callback
@@ -64,9 +82,10 @@ class Engine(object):
   def getDistinguishedTrace(self):
     return self.model.retrieve_trace(0)
 
-  def nextBaseAddr(self):
-    self.directiveCounter += 1
-    return self.directiveCounter
+  def nextBaseAddr(self, count=1):
+    """Reserve count consecutive directive ids and return the first."""
+    self.directiveCounter += count
+    return self.directiveCounter - count + 1
 
   def predictNextDirectiveId(self):
     # Careful: this prediction will be wrong if another thread does
@@ -119,6 +138,45 @@ class Engine(object):
       weight_increments = self.incorporate()
     return (baseAddr, weight_increments)
 
+  def bulk_observe(self, datum, vals, args=None):
+    # The directive occupies one trace family per datum, at
+    # consecutive ids; reserve at least one so the id stays unique
+    # even for an empty data set.
+    baseAddr = self.nextBaseAddr(max(len(vals), 1))
+    self.model.bulk_observe(baseAddr, datum, vals, args)
+    weight_increments = self.incorporate()
+    return (baseAddr, weight_increments)
+
+  def labeled_bulk_observe(self, label, datum, vals, args=None):
+    baseAddr = self.nextBaseAddr(max(len(vals), 1))
+    self.model.labeled_bulk_observe(label, baseAddr, datum, vals, args)
+    weight_increments = self.incorporate()
+    return (baseAddr, weight_increments)
+
+  def ingest(self, datum, source, format=None, batch_size=1000,
+             infer_program=None, infer_every=1):
+    """Observe datum applied to each record of a dataset, as by
+bulk_observe with arguments, a batch of up to batch_size records at a
+time, and infer with infer_program (if given) after every infer_every
+batches.  Only one batch of records is held at a time.
+
+The datum and the program are desugared, as for bulk_observe and
+infer; the source and format are as for
+`venture.ingest.read_records`.  Returns the directive id of each
+batch, as does `Ripl.ingest`.
+
+    """
+    def observe(batch):
+      (args, vals) = ingest.split_batch(batch)
+      (did, _) = self.bulk_observe(datum, vals, args)
+      return did
+    infer = None
+    if infer_program is not None:
+      infer = lambda: self.infer(infer_program)
+    records = ingest.read_records(source, format)
+    return ingest.observe_batches(records, batch_size, observe, infer,
+                                  infer_every)
+
   def forget(self,directiveId):
     weight_increments = self.model.forget(directiveId)
     return weight_increments
@@ -185,6 +243,7 @@ class Engine(object):
   def clear(self):
     self.model.clear()
     self.directiveCounter = 0
+    self.inference_trace_template = None
     if self.persistent_inference_trace:
       self.infer_trace = self.init_inference_trace()
     # TODO The clear operation appears to be bit-rotten.  Problems include:
@@ -278,13 +337,65 @@ class Engine(object):
       self.ripl = ripl
 
   def for_each_particle(self, action):
+    if self.model.runs_actions_in_workers():
+      shipped = self.particle_action(action)
+      if shipped is not None:
+        return self.model.for_each_trace_in_workers(shipped)
     with self._particle_swapping(action) as do_action:
       return self.model.for_each_trace_sequential(do_action)
 
   def on_particle(self, i, action):
+    if self.model.runs_actions_in_workers():
+      shipped = self.particle_action(action)
+      if shipped is not None:
+        return self.model.on_trace_in_worker(i, shipped)
     with self._particle_swapping(action) as do_action:
       return self.model.on_trace(i, do_action)
 
+  def particle_action(self, action):
+    """A ParticleAction shipping the given inference action to the
+workers holding the particles, or None if it cannot be shipped.
+
+The action goes with everything it closes over, save the frame of
+the inference trace holding the inference SPs and the prelude, which
+each worker has its own copy of.  It cannot be shipped if any of the
+rest, or a foreign inference SP, cannot be pickled.  Callbacks that
+cannot be pickled, such as the timer's, are left to the worker's own
+ripl."""
+    prelude = self.inference_prelude_frame()
+    builtins = dict(inf.inferenceSPsList)
+    foreign = dict((name, sp) for (name, sp) in self.inference_sps.iteritems()
+                   if builtins.get(name) is not sp)
+    callbacks = dict((name, callback)
+                     for (name, callback) in self.callbacks.iteritems()
+                     if is_picklable(callback))
+    try:
+      setup = cPickle.dumps((self.model.backend, foreign), 2)
+      payload = StringIO.StringIO()
+      pickler = cPickle.Pickler(payload, 2)
+      pickler.persistent_id = lambda obj: _PRELUDE if obj is prelude else None
+      pickler.dump((action, self.foreign_sps, callbacks))
+    except (TypeError, cPickle.PicklingError):
+      return None
+    return ParticleAction(setup, payload.getvalue(), self.directiveCounter)
+
+  def run_on_particle(self, trace, weight, action, seed):
+    """Run an inference action on the given trace as this engine's
+only particle, as a worker does for a ParticleAction.
+
+Returns the action's answer, and the particle's trace and log weight
+afterwards."""
+    self._py_rng.seed(seed)
+    self.model.adopt_trace(trace, weight, self._py_rng.randint(1, 2**31 - 1))
+    with self._particle_swapping(action) as do_action:
+      ans = do_action(trace)
+    traces = self.model.retrieve_traces()
+    if len(traces) != 1:
+      raise VentureException('invalid_argument',
+        'A particle action shipped to a worker may not change the number of particles.',
+        argument='action')
+    return (ans, traces[0], self.model.log_weights[0])
+
   def infer(self, program):
     if self.is_infer_loop_program(program):
       assert len(program) == 2
@@ -299,12 +410,42 @@ class Engine(object):
   @contextmanager
   def inference_trace(self):
     if not self.persistent_inference_trace:
-      self.infer_trace = self.init_inference_trace()
+      # Restored after, since for_each_particle runs nested
+      outer = self.infer_trace
+      self.infer_trace = self.fresh_inference_trace()
     try:
       yield
     finally:
       if not self.persistent_inference_trace:
-        self.infer_trace = None
+        self.infer_trace = outer
+
+  def fresh_inference_trace(self):
+    """An inference trace for a single run, with the prelude installed.
+
+Installing the prelude means evaluating every definition in it, so
+this is done once, in a template that each run's trace is a clone
+of."""
+    return self._inference_template().clone(self._py_rng.randint(1, 2**31 - 1))
+
+  def _inference_template(self):
+    if self.inference_trace_template is None:
+      self.inference_trace_template = self.init_first_inference_trace()
+    return self.inference_trace_template
+
+  def inference_prelude_frame(self):
+    """The frame of the inference environment binding the inference
+SPs and the prelude.  User definitions go in the frames in front of it."""
+    if self.persistent_inference_trace:
+      return self.infer_trace.env.outerEnv
+    else:
+      return self._inference_template().env.outerEnv
+
+  def init_first_inference_trace(self):
+    start = time.time()
+    ans = self.init_inference_trace()
+    if self.inference_startup_time is None:
+      self.inference_startup_time = time.time() - start
+    return ans
 
   def init_inference_trace(self):
     import venture.untraced.trace as trace
@@ -337,15 +478,52 @@ class Engine(object):
     inferrer_obj = self.inferrer # Read self.inferrer atomically, just in case.
     if inferrer_obj is not None and not inferrer_obj.crashed:
       # Running CI in Python
-      return {"running":True, "expression":inferrer_obj.program}
+      return {"running":True, "expression":inferrer_obj.program,
+              "transitions":inferrer_obj.transitions,
+              "throughput":inferrer_obj.throughput()}
     else:
       return {"running":False}
 
+  def set_compiled_continuous_inference(self, enabled=True, batch_size=1):
+    """Toggle stepping continuous inference directly against the engine.
+
+When enabled, the loop program is desugared and compiled once, and
+each iteration evaluates the compiled code in the inference trace,
+rather than going back through the ripl and the sivm as an infer
+instruction.  Either way, the loop thread runs batch_size iterations
+between yielding to other threads, such as one issuing directives.
+Takes effect when continuous inference is next (re)started."""
+    self.compiled_continuous_inference = enabled
+    self.continuous_inference_batch_size = batch_size
+
   def start_continuous_inference(self, program):
     self.stop_continuous_inference()
-    self.inferrer = ContinuousInferrer(self, program)
+    self.inferrer = ContinuousInferrer(self, program,
+      self.compiled_continuous_inference, self.continuous_inference_batch_size)
     self.inferrer.start()
 
+  def compile_inference_step(self, program):
+    """A function that runs the given inference program once, as
+`infer` does, but from code desugared and compiled once and for all."""
+    (compiled, step) = self._compiled_step
+    if compiled != program:
+      step = self._compile_inference_step(program)
+      self._compiled_step = (program, step)
+    return step
+
+  def _compile_inference_step(self, program):
+    import venture.untraced.trace as trace
+    from venture.sivm.macro_system import desugar_expression
+    from venture.sivm.core_sivm import _modify_expression
+    code = trace.compile_expression(
+      [v.sym("run"), _modify_expression(desugar_expression(program))])
+    def step():
+      with self.inference_trace():
+        did = self.nextBaseAddr()
+        self.infer_trace.eval_compiled(did, code)
+        self.infer_trace.uneval(did)
+    return step
+
   def stop_continuous_inference(self):
     "Atomically stop continuous inference and return whether it was program, and if so what program."
     inferrer_obj = self.inferrer # Read self.inferrer atomically, just in case.
@@ -378,18 +556,29 @@ class Engine(object):
     data = self.model.saveable()
     data['directiveCounter'] = self.directiveCounter
     data['extra'] = extra
-    version = '0.2'
-    cPickle.dump((data, version), stream)
+    snapshot.write(stream, data)
+
+  def load_io(self, stream, particles=None):
+    """Restore the model from a snapshot written by `save_io`.
 
-  def load_io(self, stream):
-    (data, version) = cPickle.load(stream)
-    assert version == '0.2', "Incompatible version or unrecognized object"
+If `particles` is a list of particle indexes, only those particles
+(and their weights) are restored, in that order."""
+    prefix = stream.read(len(snapshot.MAGIC))
+    if snapshot.is_snapshot(prefix):
+      data = snapshot.read(stream, particles)
+    else:
+      # Saves from before the binary snapshot format
+      (data, version) = cPickle.loads(prefix + stream.read())
+      assert version == '0.2', "Incompatible version or unrecognized object"
+      if particles is not None:
+        data['traces'] = [data['traces'][p] for p in particles]
+        data['log_weights'] = [data['log_weights'][p] for p in particles]
     self.directiveCounter = data['directiveCounter']
     self.model.load(data)
     return data['extra']
 
   def save(self, fname, extra=None):
-    with open(fname, 'w') as fp:
+    with open(fname, 'wb') as fp:
       self.save_io(fp, extra=extra)
 
   def saves(self, extra=None):
@@ -397,12 +586,12 @@ class Engine(object):
     self.save_io(ans, extra=extra)
     return ans.getvalue()
 
-  def load(self, fname):
-    with open(fname) as fp:
-      return self.load_io(fp)
+  def load(self, fname, particles=None):
+    with open(fname, 'rb') as fp:
+      return self.load_io(fp, particles=particles)
 
-  def loads(self, string):
-    return self.load_io(StringIO.StringIO(string))
+  def loads(self, string, particles=None):
+    return self.load_io(StringIO.StringIO(string), particles=particles)
 
   def convert(self, backend):
     model = self.new_model(backend)
@@ -417,9 +606,48 @@ class Engine(object):
     from venture.shortcuts import Puma
     self.convert(Puma())
 
-  def set_profiling(self, enabled=True): self.model.set_profiling(enabled)
+  def set_profiling(self, enabled=True, summary=False, sample_every=0):
+    self.model.set_profiling(enabled, summary, sample_every)
   def clear_profiling(self): self.model.clear_profiling()
 
+  def set_scaffold_caching(self, enabled=True):
+    self.model.set_scaffold_caching(enabled)
+
+  def set_extent_caching(self, enabled=True):
+    self.model.set_extent_caching(enabled)
+
+  def cache_stats(self):
+    """Return the hit, miss and invalidation counts of each particle's
+structure caches (see set_scaffold_caching and set_extent_caching),
+one row per particle and cache."""
+    rows = []
+    for (pid, stats) in enumerate(self.model.cache_stats()):
+      for row in stats:
+        row['particle'] = pid
+        rows.append(row)
+    return rows
+
+  def set_vectorized_particles(self, enabled=True):
+    """Toggle stepping all in-process Lite particles through mh together.
+
+Where the particles share the structure of the proposal's scaffold,
+its arithmetic is done for all of them at once on NumPy columns; see
+`venture.lite.infer.vectorized`."""
+    self.model.set_vectorized_particles(enabled)
+
+  def set_load_balancing(self, enabled=True):
+    """Toggle moving particles between workers to even out their load.
+
+After each primitive inference step, the particles are redistributed
+if the time each took would let the slowest worker finish markedly
+sooner; see `venture.multiprocess.MasterBase.rebalance`."""
+    self.model.set_load_balancing(enabled)
+
+  def particle_timings(self):
+    """The time, in seconds, each particle has spent in its worker
+since it was created, resampled, or last rebalanced."""
+    return self.model.particle_timings()
+
   def profile_data(self):
     rows = []
     for (pid, trace) in enumerate([t for t in self.model.retrieve_traces()
@@ -429,6 +657,19 @@ class Engine(object):
 
     return rows
 
+  def profile_summary(self):
+    """Return the aggregated proposal profile, one row per particle and
+(operator, scope, block), as collected with set_profiling(summary=True)."""
+    rows = []
+    for (pid, summary) in enumerate(self.model.traces.map('profile_summary')):
+      for row in summary:
+        row['particle'] = pid
+        for name in ['scope', 'block']:
+          if isinstance(row[name], vv.VentureValue):
+            row[name] = strip_types(row[name].asStackDict())
+        rows.append(row)
+    return rows
+
   def new_model(self, backend=None):
     if backend is None:
       backend = self.model.backend
@@ -437,13 +678,17 @@ class Engine(object):
 # Support for continuous inference
 
 class ContinuousInferrer(object):
-  def __init__(self, engine, program):
+  def __init__(self, engine, program, compiled=False, batch_size=1):
     self.engine = engine
     self.program = program
+    self.compiled = compiled
+    self.batch_size = batch_size
     self.inferrer = threading.Thread(target=self.infer_continuously, args=(self.program,))
     self.inferrer.daemon = True
     self.inference_thread_id = None
     self.crashed = False
+    self.transitions = 0 # Iterations of the program completed
+    self.start_time = None
 
   def start(self):
     self.inferrer.start()
@@ -452,17 +697,34 @@ class ContinuousInferrer(object):
     self.inference_thread_id = threading.currentThread().ident
     # Can use the storage of the thread object itself as the semaphore
     # controlling whether continuous inference proceeds.
+    self.start_time = time.time()
     try:
-      while self.inferrer is not None:
+      if self.compiled:
+        step = self.engine.compile_inference_step(program)
+      else:
         # TODO React somehow to values returned by the inference action?
         # Currently suppressed for fear of clobbering the prompt
-        self.engine.ripl.infer(program)
+        step = lambda: self.engine.ripl.infer(program)
+      while self.inferrer is not None:
+        for _ in range(self.batch_size):
+          step()
+          self.transitions += 1
+          if self.inferrer is None:
+            break
         time.sleep(0.0001) # Yield to be a good citizen
     except Exception: # pylint:disable=broad-except
       self.crashed = True
       import traceback
       traceback.print_exc()
 
+  def throughput(self):
+    """Iterations of the program completed per second since this
+inferrer started (continuous inference restarts after every directive)."""
+    if self.start_time is None:
+      return 0.0
+    elapsed = time.time() - self.start_time
+    return self.transitions / elapsed if elapsed > 0 else 0.0
+
   def stop(self):
     inferrer = self.inferrer
     self.inferrer = None # Grab the semaphore
@@ -472,6 +734,71 @@ class ContinuousInferrer(object):
     else:
       return self.program
 
+# Support for running for_each_particle in the workers
+
+# The persistent id standing for the inference prelude frame
+_PRELUDE = "inference_prelude"
+
+class ParticleAction(object):
+  """An inference action shipped to the workers holding the particles.
+
+See `Engine.particle_action`.  In a worker, the action runs in a
+worker-local engine whose inference prelude frame stands in for the
+master's."""
+
+  def __init__(self, setup, payload, directive_counter):
+    self.setup = setup # Pickled backend and foreign inference SPs
+    self.payload = payload # Pickled action, foreign SPs and callbacks
+    self.directive_counter = directive_counter
+
+  def run(self, trace, weight, seed):
+    engine = worker_engine(self.setup)
+    unpickler = cPickle.Unpickler(StringIO.StringIO(self.payload))
+    prelude = engine.inference_prelude_frame()
+    unpickler.persistent_load = lambda pid: prelude
+    (action, foreign_sps, callbacks) = unpickler.load()
+    engine.foreign_sps.update(foreign_sps)
+    engine.callbacks.update(callbacks)
+    # Directives made by the action are forgotten before it returns,
+    # but must not collide with the particle's own meanwhile.
+    engine.directiveCounter = self.directive_counter
+    try:
+      return engine.run_on_particle(trace, weight, action, seed)
+    except Exception as err: # pylint: disable=broad-except
+      # The error may hold tracebacks and trace nodes, which cannot be
+      # pickled back to the master.  Keep its description, and raise
+      # with its traceback, which the worker formats and sends along.
+      info = sys.exc_info()
+      raise _picklable_error(err), None, info[2]
+
+def _picklable_error(err):
+  if not isinstance(err, VentureException):
+    return VentureException('evaluation', '%s: %s' % (type(err).__name__, err))
+  # The address, if any, is of the action's own directive, which the
+  # master shares; see ParticleAction.directive_counter.
+  data = dict((k, val) for (k, val) in err.data.iteritems() if k != 'cause')
+  message = str(err.message)
+  if 'cause' in err.data:
+    message += '\nCaused by\n' + str(err.data['cause'])
+  return VentureException(err.exception, message, **data)
+
+# Worker-local engines, by setup, per thread (threaded workers share
+# a process).
+_worker_engines = threading.local()
+
+def worker_engine(setup):
+  """The engine for running ParticleActions with the given setup in
+this thread.  Made once, since installing the prelude is slow."""
+  engines = _worker_engines.__dict__.setdefault('engines', {})
+  if setup not in engines:
+    (backend, foreign) = cPickle.loads(setup)
+    ripl = backend.make_combined_ripl(persistent_inference_trace=False, seed=1)
+    engine = ripl.sivm.core_sivm.engine
+    for (name, sp) in foreign.iteritems():
+      engine.bind_foreign_inference_sp(name, sp)
+    engines[setup] = engine
+  return engines[setup]
+
 # Inference prelude
 
 the_prelude = None
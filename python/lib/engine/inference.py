@@ -196,6 +196,18 @@ class Infer(object):
         answer[name] = self.engine.sample_all(stack_dict)
     return Dataset(names, std_names, answer)
 
+  def profile_summary(self):
+    std_names = ['prt. id', 'operator', 'scope', 'block']
+    ind_names = ['proposals', 'acceptance_rate', 'time', 'detach_time',
+                 'regen_time', 'scaffold_cache_hits', 'scaffold_cache_misses',
+                 'principal', 'absorbing', 'aaa', 'brush']
+    rows = self.engine.profile_summary()
+    answer = OrderedDict()
+    answer['prt. id'] = [row['particle'] for row in rows]
+    for name in std_names[1:] + ind_names:
+      answer[name] = [row[name] for row in rows]
+    return Dataset(ind_names, std_names, answer)
+
   def assume(self, sym, exp):
     self.engine.assume(SymbolType().asPython(sym), exp.asStackDict())
   def observe(self, exp, val):
@@ -579,6 +591,17 @@ Print model values collected in a dataset.
 
 This is a basic debugging facility.""")
 
+inf.register_engine_method_sp("profile_summary", inf.infer_action_maker_type([], t.ForeignBlobType("<dataset>")), desc="""\
+Return the aggregated proposal profile as a dataset.
+
+The profiler must have been started in summary mode, for instance with
+``ripl.profiler_enable(summary=True)``.  The dataset has one row per
+particle and (operator, scope, block), giving the number of proposals,
+the acceptance rate, the total time spent and its detach and regen
+parts (in seconds), how many proposals did and did not reuse a cached
+scaffold, and the mean number of principal, absorbing, AAA and brush
+nodes per proposal.  Print it with `printf`.""")
+
 def p_p_plot_2samp(observed1, observed2):
   plots.p_p_plot_2samp(observed1, observed2, show=True)
 
@@ -0,0 +1,247 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Versioned binary snapshots of a model's trace set.
+
+A snapshot is laid out as
+
+  MAGIC, header length, pickled header, trace payload, trace payload, ...
+
+The header holds everything but the traces' value stacks: the
+engine's bookkeeping, the particle weights, and the distinct
+(directives, foreign sp names) tables, which are stored once no matter
+how many particles share them.  Each trace record in the header names
+its table and the offset and length of its payload, so a reader can
+skip over the particles it does not want without decoding them.
+
+A trace payload stores the trace's value stack.  Scalar numbers,
+integers, atoms and booleans go into one contiguous float64 buffer,
+and float64 arrays (vectors, simplexes, matrices, unboxed arrays) are
+concatenated into another; only the remaining values are pickled.
+"""
+
+import cPickle as pickle
+import struct
+
+import numpy as np
+
+MAGIC = 'VNTSNAP\x00'
+VERSION = 1
+
+_LENGTH = struct.Struct('<Q')
+_PAYLOAD_HEADER = struct.Struct('<QQQQ')
+
+_RESIDUAL = 0
+_ARRAY = 1
+_SCALAR_TYPES = ['number', 'integer', 'atom', 'boolean']
+_SCALAR_CODES = dict((t, i + 2) for (i, t) in enumerate(_SCALAR_TYPES))
+_ARRAY_TYPES = set(['vector', 'simplex', 'matrix', 'array_unboxed'])
+
+def write(stream, data):
+  """Write the saveable `data` of an engine to `stream` as a snapshot.
+
+The 'traces' entry of `data` must be a list of trace dumps, as
+returned by `venture.engine.trace.Trace.dump`; every other entry is
+stored in the header as is."""
+  header = dict((k, val) for (k, val) in data.iteritems() if k != 'traces')
+  tables = []
+  table_index = {}
+  records = []
+  payloads = []
+  offset = 0
+  for (values, directives, foreign_sp_names) in data['traces']:
+    key = pickle.dumps((directives, sorted(foreign_sp_names)),
+                       pickle.HIGHEST_PROTOCOL)
+    if key not in table_index:
+      table_index[key] = len(tables)
+      tables.append((directives, foreign_sp_names))
+    payload = _encode_values(values)
+    records.append((table_index[key], offset, len(payload)))
+    payloads.append(payload)
+    offset += len(payload)
+  header['version'] = VERSION
+  header['tables'] = tables
+  header['records'] = records
+  header_bytes = pickle.dumps(header, pickle.HIGHEST_PROTOCOL)
+  stream.write(MAGIC)
+  stream.write(_LENGTH.pack(len(header_bytes)))
+  stream.write(header_bytes)
+  for payload in payloads:
+    stream.write(payload)
+
+def is_snapshot(prefix):
+  return prefix == MAGIC
+
+def read(stream, particles=None):
+  """Read a snapshot from `stream`, whose MAGIC has already been consumed.
+
+Returns the saved data dictionary, whose 'traces' entry is a generator
+of trace dumps that decodes each payload only when it is reached.  If
+`particles` is given, only the dumps and log weights of those particle
+indexes are returned, in the order given; the payloads of the other
+particles are skipped without being decoded."""
+  (header_len,) = _LENGTH.unpack(_read_exactly(stream, _LENGTH.size))
+  header = pickle.loads(_read_exactly(stream, header_len))
+  version = header.pop('version')
+  if version != VERSION:
+    raise ValueError("Unsupported snapshot version %r" % (version,))
+  tables = header.pop('tables')
+  records = header.pop('records')
+  if particles is None:
+    particles = range(len(records))
+  else:
+    particles = list(particles)
+    for p in particles:
+      if not 0 <= p < len(records):
+        raise ValueError("Snapshot has no particle %r" % (p,))
+    header['log_weights'] = [header['log_weights'][p] for p in particles]
+  header['traces'] = _read_traces(stream, tables, records, particles)
+  return header
+
+def _read_traces(stream, tables, records, particles):
+  try:
+    base = stream.tell()
+  except (AttributeError, IOError):
+    base = None
+  if base is None:
+    payloads = _read_payloads_forward(stream, records, particles)
+  else:
+    payloads = _read_payloads_seeking(stream, base, records, particles)
+  for (p, payload) in zip(particles, payloads):
+    (directives, foreign_sp_names) = tables[records[p][0]]
+    yield (_decode_values(payload), directives, foreign_sp_names)
+
+def _read_payloads_seeking(stream, base, records, particles):
+  for p in particles:
+    (_, offset, length) = records[p]
+    stream.seek(base + offset)
+    yield _read_exactly(stream, length)
+
+def _read_payloads_forward(stream, records, particles):
+  # A stream that cannot seek is traversed once, in file order,
+  # keeping only the requested payloads.
+  position = 0
+  raw = {}
+  for p in sorted(set(particles)):
+    (_, offset, length) = records[p]
+    _skip(stream, offset - position)
+    raw[p] = _read_exactly(stream, length)
+    position = offset + length
+  for p in particles:
+    yield raw[p]
+
+def _encode_values(values):
+  codes = np.zeros(len(values), dtype=np.uint8)
+  scalars = []
+  arrays = []
+  meta = []
+  for (i, val) in enumerate(values):
+    if _is_packable_scalar(val):
+      codes[i] = _SCALAR_CODES[val['type']]
+      scalars.append(val['value'])
+    elif _is_packable_array(val):
+      codes[i] = _ARRAY
+      array = val['value']
+      arrays.append(array.ravel())
+      rest = dict((k, x) for (k, x) in val.iteritems() if k != 'value')
+      meta.append((rest, array.shape))
+    else:
+      meta.append(val)
+  scalars = np.array(scalars, dtype=np.float64)
+  if arrays:
+    arrays = np.concatenate(arrays)
+  else:
+    arrays = np.zeros(0, dtype=np.float64)
+  meta_bytes = pickle.dumps(meta, pickle.HIGHEST_PROTOCOL)
+  return ''.join([
+    _PAYLOAD_HEADER.pack(len(codes), len(scalars), len(arrays),
+                         len(meta_bytes)),
+    codes.tostring(), scalars.tostring(), arrays.tostring(), meta_bytes])
+
+def _decode_values(payload):
+  (n_codes, n_scalars, n_arrays, _) = \
+    _PAYLOAD_HEADER.unpack_from(payload, 0)
+  start = _PAYLOAD_HEADER.size
+  codes = np.frombuffer(payload, dtype=np.uint8, count=n_codes,
+                        offset=start)
+  start += n_codes
+  scalars = np.frombuffer(payload, dtype=np.float64, count=n_scalars,
+                          offset=start)
+  start += 8 * n_scalars
+  arrays = np.frombuffer(payload, dtype=np.float64, count=n_arrays,
+                         offset=start)
+  start += 8 * n_arrays
+  meta = iter(pickle.loads(payload[start:]))
+  values = []
+  scalar_ix = 0
+  array_ix = 0
+  for code in codes:
+    if code == _RESIDUAL:
+      values.append(next(meta))
+    elif code == _ARRAY:
+      (rest, shape) = next(meta)
+      size = int(np.prod(shape))
+      val = dict(rest)
+      # Copy out of the payload buffer, which is read-only.
+      val['value'] = arrays[array_ix:array_ix + size].reshape(shape).copy()
+      array_ix += size
+      values.append(val)
+    else:
+      tp = _SCALAR_TYPES[code - 2]
+      values.append({'type': tp,
+                     'value': _unpack_scalar(tp, scalars[scalar_ix])})
+      scalar_ix += 1
+  return values
+
+def _is_packable_scalar(val):
+  if not (isinstance(val, dict) and len(val) == 2 and
+          val.get('type') in _SCALAR_CODES):
+    return False
+  x = val['value']
+  if val['type'] == 'number':
+    # Python ints in number slots are left to the pickle, so that the
+    # value round-trips exactly.
+    return isinstance(x, float)
+  elif val['type'] == 'boolean':
+    return isinstance(x, bool)
+  else:
+    return isinstance(x, (int, long)) and not isinstance(x, bool) and \
+      abs(x) < 2**53
+
+def _is_packable_array(val):
+  return isinstance(val, dict) and val.get('type') in _ARRAY_TYPES and \
+    isinstance(val.get('value'), np.ndarray) and \
+    val['value'].dtype == np.float64
+
+def _unpack_scalar(tp, x):
+  if tp == 'number':
+    return float(x)
+  elif tp == 'boolean':
+    return bool(x)
+  else:
+    return int(x)
+
+def _read_exactly(stream, n):
+  ans = stream.read(n)
+  if len(ans) != n:
+    raise ValueError("Truncated snapshot")
+  return ans
+
+def _skip(stream, n):
+  while n > 0:
+    chunk = _read_exactly(stream, min(n, 1 << 20))
+    n -= len(chunk)
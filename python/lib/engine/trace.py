@@ -69,12 +69,43 @@ class Trace(object):
     self.trace.observe(baseAddr,val)
     self.directives[baseAddr] = ["observe", exp, val]
 
+  def bulk_observe(self, baseAddr, exp, vals, args=None):
+    """Observe one family per datum, at consecutive directive ids
+starting from baseAddr, all recorded as the single directive baseAddr.
+
+If args is given, family i evaluates exp applied to the quoted
+elements of args[i] rather than exp itself.
+
+    """
+    assert baseAddr not in self.directives
+    (evaluated, observed) = (0, 0)
+    try:
+      for (did, datum, val) in _bulk_observations(baseAddr, exp, vals, args):
+        self.trace.eval(did, datum)
+        evaluated += 1
+        self.trace.observe(did, val)
+        observed += 1
+    except Exception:
+      # Do not leave a partial bulk directive behind in the trace
+      for did in reversed(range(baseAddr, baseAddr + evaluated)):
+        if did < baseAddr + observed:
+          self.trace.unobserve(did)
+        self.trace.uneval(did)
+      raise
+    self.directives[baseAddr] = ["bulk_observe", exp, vals, args]
+
   def forget(self, directiveId):
     if directiveId not in self.directives:
       raise VentureException("invalid_argument", "Cannot forget a non-existent directive id.  Valid options are %s" % self.directives.keys(),
                              argument="directive_id", directive_id=directiveId)
     weight = 0
     directive = self.directives[directiveId]
+    if directive[0] == "bulk_observe":
+      for did in reversed(_bulk_dids(directiveId, directive)):
+        weight += self.trace.unobserve(did)
+        self.trace.uneval(did)
+      del self.directives[directiveId]
+      return weight
     if directive[0] == "observe":
       weight += self.trace.unobserve(directiveId)
     self.trace.uneval(directiveId)
@@ -90,6 +121,9 @@ class Trace(object):
     if directiveId not in self.directives:
       raise VentureException("invalid_argument", "Cannot freeze a non-existent directive id.  Valid options are %s" % self.directives.keys(),
                              argument="directive_id", directive_id=directiveId)
+    if self.directives[directiveId][0] == "bulk_observe":
+      raise VentureException("invalid_argument", "Cannot freeze a bulk_observe directive.",
+                             argument="directive_id", directive_id=directiveId)
     self.trace.freeze(directiveId)
     self._record_directive_frozen(directiveId)
 
@@ -110,6 +144,10 @@ class Trace(object):
     if directiveId not in self.directives:
       raise VentureException("invalid_argument", "Cannot report a non-existent directive id",
                              argument=directiveId)
+    directive = self.directives[directiveId]
+    if directive[0] == "bulk_observe":
+      return v.list([self.trace.extractValue(did)
+                     for did in _bulk_dids(directiveId, directive)])
     return self.trace.extractValue(directiveId)
 
   def report_raw(self,directiveId):
@@ -117,6 +155,10 @@ class Trace(object):
       raise VentureException("invalid_argument",
                              "Cannot report raw value of a non-existent directive id",
                              argument=directiveId)
+    directive = self.directives[directiveId]
+    if directive[0] == "bulk_observe":
+      return [self.trace.extractRaw(did)
+              for did in _bulk_dids(directiveId, directive)]
     return self.trace.extractRaw(directiveId)
 
   def bind_foreign_sp(self, name, sp):
@@ -161,6 +203,21 @@ inference.)
     (traces, weights) = self.trace.diversify(exp, copy_inner_trace)
     return ([Trace(t, self.directives) for t in traces], weights)
 
+  def run_particle_action(self, action, weight, seed):
+    """Run a shipped `venture.engine.engine.ParticleAction` on this
+trace, in whichever worker holds it.
+
+Returns the action's answer and the trace's new log weight.
+
+    """
+    (ans, trace, weight) = action.run(self, weight, seed)
+    if trace is not self:
+      # The action replaced the particle, e.g. by resampling it.
+      self.trace = trace.trace
+      self.directives = trace.directives
+      self.foreign_sp_names = trace.foreign_sp_names
+    return (ans, weight)
+
   def dump(self, skipStackDictConversion=False):
     values = _dump_trace(self.trace, self.directives, skipStackDictConversion)
     return (values, self.directives, self.foreign_sp_names)
@@ -177,21 +234,47 @@ inference.)
 # Auxiliary functions for dumping and loading backend-specific traces
 ######################################################################
 
+def _bulk_dids(baseAddr, directive):
+  return range(baseAddr, baseAddr + len(directive[2]))
+
+def _bulk_observations(baseAddr, exp, vals, args):
+  """Yield the (did, datum, value) triple of each family of a bulk observe."""
+  for (i, val) in enumerate(vals):
+    if args is None:
+      datum = exp
+    else:
+      datum = [exp] + [v.quote(arg) for arg in args[i]]
+    yield (baseAddr + i, datum, val)
+
+def _families(directives):
+  """Yield the (did, observed value or None) pair of each trace family
+the given directives occupy, in did order."""
+  for did, directive in sorted(directives.items()):
+    if directive[0] == "observe":
+      yield (did, directive[2])
+    elif directive[0] == "bulk_observe":
+      for (fdid, _, val) in _bulk_observations(did, *directive[1:]):
+        yield (fdid, val)
+    else:
+      yield (did, None)
+
 def _dump_trace(trace, directives, skipStackDictConversion=False):
+  families = list(_families(directives))
+
   # This block mutates the trace
   db = trace.makeSerializationDB()
-  for did, directive in sorted(directives.items(), reverse=True):
-    if directive[0] == "observe":
+  for did, val in reversed(families):
+    if val is not None:
       trace.unobserve(did)
     trace.unevalAndExtract(did, db)
 
   # This block undoes the mutation on the trace done by the previous block; but
   # it does not destroy the value stack because the actual OmegaDB (superclass
   # of OrderedOmegaDB) has the values.
-  for did, directive in sorted(directives.items()):
+  for did, val in families:
     trace.restore(did, db)
-    if directive[0] == "observe":
-      trace.observe(did, directive[2])
+    if val is not None:
+      trace.observe(did, val)
 
   # TODO Actually, I should restore the degree of incorporation the
   # trace originally had.  In the absence of tracking that, this
@@ -221,6 +304,10 @@ def _restore_trace(trace, directives, values, foreign_sp_names, foreign_sps, ski
     elif directive[0] == "evaluate":
       datum = directive[1]
       trace.evalAndRestore(did, datum, db)
+    elif directive[0] == "bulk_observe":
+      for (fdid, datum, val) in _bulk_observations(did, *directive[1:]):
+        trace.evalAndRestore(fdid, datum, db)
+        trace.observe(fdid, val)
 
   # TODO Actually, I should restore the degree of incorporation the
   # original trace had.  In the absence of tracking that, this
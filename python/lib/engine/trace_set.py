@@ -28,9 +28,11 @@ from ..multiprocess import SynchronousSerializingMaster
 from ..multiprocess import ThreadedMaster
 from ..multiprocess import ThreadedSerializingMaster
 from venture.exception import VentureException
+from venture.lite.infer.vectorized import vectorized_mh
 from venture.lite.utils import log_domain_even_out
 from venture.lite.utils import logsumexp
 from venture.lite.utils import sampleLogCategorical
+from venture.shared_arrays import SharedArrayStore
 import venture.engine.trace as tr
 
 class TraceSet(object):
@@ -40,6 +42,10 @@ class TraceSet(object):
     self.backend = backend
     self.mode = 'sequential'
     self.process_cap = None
+    self.vectorized = False
+    self.load_balancing = False
+    # Large constant arrays, shared with worker processes by handle
+    self.shared_arrays = SharedArrayStore()
     self.traces = None
     assert seed is not None
     self._py_rng = random.Random(seed)
@@ -64,7 +70,13 @@ class TraceSet(object):
   def create_trace_pool(self, traces, weights=None):
     del self.traces # To (try and) force reaping any worker processes
     seed = self._py_rng.randint(1, 2**31 - 1)
-    self.traces = self._trace_master(self.mode)(traces, self.process_cap, seed)
+    if self.mode == 'multiprocess':
+      # The workers' traces will travel between processes by pickling
+      for trace in traces:
+        trace.directives = self._share(trace.directives)
+    copier = TraceCopier(self.backend, self.engine.foreign_sps)
+    self.traces = self._trace_master(self.mode)(
+      traces, self.process_cap, seed, copier)
     if weights is not None:
       self.log_weights = weights
     else:
@@ -122,6 +134,10 @@ class TraceSet(object):
     with self._putting_label(label, baseAddr):
       self.observe(baseAddr, exp, val)
 
+  def labeled_bulk_observe(self, label, baseAddr, exp, vals, args=None):
+    with self._putting_label(label, baseAddr):
+      self.bulk_observe(baseAddr, exp, vals, args)
+
   def labeled_evaluate(self, label, baseAddr, exp):
     with self._putting_label(label, baseAddr):
       return self.evaluate(baseAddr, exp)
@@ -144,15 +160,25 @@ class TraceSet(object):
 
   # Unlabeled operations.
 
+  def _share(self, thing):
+    if self.mode == 'multiprocess':
+      return self.shared_arrays.share_in(thing)
+    else:
+      return thing
+
   def define(self, baseAddr, id, datum):
-    values = self.traces.map('define', baseAddr, id, datum)
+    values = self.traces.map('define', baseAddr, id, self._share(datum))
     return values[0]
 
   def evaluate(self, baseAddr, datum):
-    return self.traces.map('evaluate', baseAddr, datum)
+    return self.traces.map('evaluate', baseAddr, self._share(datum))
 
   def observe(self, baseAddr, datum, val):
-    self.traces.map('observe', baseAddr, datum, val)
+    self.traces.map('observe', baseAddr, self._share(datum), self._share(val))
+
+  def bulk_observe(self, baseAddr, datum, vals, args=None):
+    self.traces.map('bulk_observe', baseAddr, self._share(datum),
+                    self._share(vals), self._share(args))
 
   def forget(self, directiveId):
     weight_increments = self.traces.map('forget', directiveId)
@@ -177,11 +203,14 @@ class TraceSet(object):
       raise TypeError(errstr)
 
     self.traces.map('bind_foreign_sp', name, sp)
+    # Workers copying traces during resampling need to know it too
+    self.traces.map_copier('bind_foreign_sp', name, sp)
 
   def clear(self):
     seed = self._py_rng.randint(1, 2**31 - 1)
     trace = tr.Trace(self.backend.trace_constructor()(seed))
     self.create_trace_pool([trace])
+    self.shared_arrays.close()
     self._label_to_did = {}
     self._did_to_label = {}
 
@@ -200,20 +229,31 @@ if freeze has been used.
     self.traces.map('reset_to_prior')
 
   def resample(self, P, mode = 'sequential', process_cap = None):
-    self.mode = mode
-    self.process_cap = process_cap
-    newTraces = self._resample_traces(P)
-    self.create_trace_pool(newTraces, log_domain_even_out(self.log_weights, P))
+    P = int(P)
+    if mode == self.mode and process_cap == self.process_cap and \
+       self.traces.can_resample_in_place(P):
+      # Keep the existing workers; they exchange only the traces
+      # whose ancestors live elsewhere.
+      ancestors = self._resample_ancestors(P)
+      self.traces.resample(ancestors, self._py_rng.randint(1, 2**31 - 1))
+      self.log_weights = log_domain_even_out(self.log_weights, P)
+    else:
+      self.mode = mode
+      self.process_cap = process_cap
+      newTraces = self._resample_traces(P)
+      self.create_trace_pool(newTraces, log_domain_even_out(self.log_weights, P))
     self.incorporate()
 
+  def _resample_ancestors(self, P):
+    seed = self._py_rng.randint(1, 2**31 - 1)
+    np_rng = npr.RandomState(seed)
+    return [sampleLogCategorical(self.log_weights, np_rng) # will need to include or rewrite
+            for _ in range(P)]
+
   def _resample_traces(self, P):
-    P = int(P)
     newTraces = [None for p in range(P)]
     used_parents = {}
-    seed = self._py_rng.randint(1, 2**31 - 1)
-    np_rng = npr.RandomState(seed)
-    for p in range(P):
-      parent = sampleLogCategorical(self.log_weights, np_rng) # will need to include or rewrite
+    for (p, parent) in enumerate(self._resample_ancestors(P)):
       newTrace = self._use_parent(used_parents, parent)
       newTraces[p] = newTrace
     return newTraces
@@ -285,12 +325,23 @@ if freeze has been used.
     self._collapse_help(scope, block, max_ind)
 
   def likelihood_weight(self):
-    self.log_weights = self.traces.map('likelihood_weight')
+    log_weights = list(self.log_weights)
+    for (indexes, weights) in self.traces.map_async('likelihood_weight') \
+                                         .results_as_completed():
+      for (i, weight) in zip(indexes, weights):
+        log_weights[i] = weight
+    self.log_weights = log_weights
 
   def incorporate(self):
-    weight_increments = self.traces.map('makeConsistent')
-    for i, increment in enumerate(weight_increments):
-      self.log_weights[i] += increment
+    log_weights = list(self.log_weights)
+    weight_increments = [None for _ in log_weights]
+    # Fold in each worker's increments as soon as it has them.
+    for (indexes, increments) in self.traces.map_async('makeConsistent') \
+                                            .results_as_completed():
+      for (i, increment) in zip(indexes, increments):
+        log_weights[i] += increment
+        weight_increments[i] = increment
+    self.log_weights = log_weights
     return weight_increments
 
   def for_each_trace_sequential(self, f):
@@ -336,8 +387,50 @@ if freeze has been used.
       self.mode = mode
       self.create_trace_pool(traces, weights)
 
+  def runs_actions_in_workers(self):
+    """Whether per-particle actions should be shipped to the workers
+holding the traces, rather than run here on traces brought back.
+
+They should when the traces do not share this process's memory (or
+are kept as if they did not), since then bringing them here means
+serializing every one of them, twice."""
+    return not self.traces.can_shortcut_retrieval()
+
+  def for_each_trace_in_workers(self, action):
+    """Run a ParticleAction on every trace, concurrently, in the
+workers holding them; return the answers, in order."""
+    args = [(action, weight, self._py_rng.randint(1, 2**31 - 1))
+            for weight in self.log_weights]
+    results = self.traces.map_each('run_particle_action', args)
+    self.log_weights = [weight for (_, weight) in results]
+    if self.load_balancing:
+      self.traces.rebalance(self._py_rng.randint(1, 2**31 - 1))
+    return [ans for (ans, _) in results]
+
+  def on_trace_in_worker(self, i, action):
+    (ans, weight) = self.traces.at(i, 'run_particle_action', action,
+      self.log_weights[i], self._py_rng.randint(1, 2**31 - 1))
+    self.log_weights = self.log_weights[0:i] + [weight] + self.log_weights[i+1:]
+    return ans
+
+  def adopt_trace(self, trace, weight, seed):
+    """Hold just the given trace, sequentially, drawing seeds afresh
+from seed.  For running a shipped action on a single particle."""
+    self._py_rng.seed(seed)
+    self.mode = 'sequential'
+    self.create_trace_pool([trace], [weight])
+
   def primitive_infer(self, exp):
-    return self.traces.map('primitive_infer', exp)
+    if self.vectorized and exp[0] == 'mh' and \
+       self.backend.name() == 'lite' and self.traces.can_shortcut_retrieval():
+      # The traces are in this process, so mh can step them together.
+      traces = [trace.trace for trace in self.traces.retrieve_all()]
+      np_rng = npr.RandomState(self._py_rng.randint(1, 2**31 - 1))
+      return vectorized_mh(traces, exp, np_rng)
+    ans = self.traces.map('primitive_infer', exp)
+    if self.load_balancing:
+      self.traces.rebalance(self._py_rng.randint(1, 2**31 - 1))
+    return ans
 
   def get_entropy_info(self):
     return { 'unconstrained_random_choices' : self.traces.at_distinguished('numRandomChoices') }
@@ -397,12 +490,73 @@ if freeze has been used.
     self._did_to_label = copy.copy(other._did_to_label)
     self._label_to_did = copy.copy(other._label_to_did)
 
-  def set_profiling(self, enabled=True):
+  def set_profiling(self, enabled=True, summary=False, sample_every=0):
+    if summary:
+      self.traces.map('set_profiling', enabled, summary=True,
+                      sample_every=sample_every)
+    else:
       self.traces.map('set_profiling', enabled)
 
   def clear_profiling(self):
     self.traces.map('clear_profiling')
 
+  def set_scaffold_caching(self, enabled=True):
+    self.traces.map('set_scaffold_caching', enabled)
+
+  def set_extent_caching(self, enabled=True):
+    self.traces.map('set_extent_caching', enabled)
+
+  def cache_stats(self):
+    return self.traces.map('cache_stats')
+
+  def set_vectorized_particles(self, enabled=True):
+    self.vectorized = enabled
+
+  def set_load_balancing(self, enabled=True):
+    self.load_balancing = enabled
+
+  def particle_timings(self):
+    return self.traces.object_timings()
+
+class TraceCopier(object):
+  """Copies and (de)serializes traces on behalf of the workers of a
+trace pool, so that resampling need not round-trip every trace
+through the master.
+
+Mirrors TraceSet.copy_trace and TraceSet.restore_trace, but takes
+the seeds of new traces from the caller, since it may be running in
+a worker process.
+
+  """
+  def __init__(self, backend, foreign_sps):
+    self.backend = backend
+    # The engine's foreign sp registry.  Not the engine itself: the
+    # engine owns the trace pool, which owns this copier, and a cycle
+    # through the pool's __del__ would never be collected.
+    self.foreign_sps = foreign_sps
+
+  def bind_foreign_sp(self, name, sp):
+    # A worker process has its own copy of the registry, which needs
+    # to learn of SPs registered after the worker started.
+    self.foreign_sps[name] = sp
+
+  def _mktrace(self, seed):
+    return lambda: self.backend.trace_constructor()(seed)
+
+  def copy(self, trace, seed):
+    if trace.short_circuit_copyable():
+      return trace.stop_and_copy()
+    else:
+      values = trace.dump(skipStackDictConversion=True)
+      return tr.Trace.restore(self._mktrace(seed), values, self.foreign_sps,
+                              skipStackDictConversion=True)
+
+  def export(self, trace):
+    return trace.dump()
+
+  def restore(self, dumped, seed):
+    return tr.Trace.restore(self._mktrace(seed), dumped, self.foreign_sps)
+
 def is_picklable(obj):
   try:
     pickle.dumps(obj)
@@ -51,7 +51,7 @@ class VentureException(Exception):
     if self.exception in ['parse', 'text_parse', 'invalid_argument'] and 'instruction_string' in self.data:
       s += '\n' + self.data['instruction_string']
       s += '\n' + underline(self.data['text_index'])
-    if self.exception is 'evaluation' and self.annotated:
+    if self.exception == 'evaluation' and self.annotated:
       for stack_frame in self.data['stack_trace']:
         s += '\n' + stack_frame['expression_string']
         s += '\n' + underline(stack_frame['text_index'])
@@ -0,0 +1,217 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Streaming datasets into a model a batch at a time.
+
+A dataset is a stream of records, each a nonempty list whose last
+element is a value to observe and whose other elements are the
+arguments to observe it at, as for `Ripl.observe_dataset`.  The
+records may come from any Python iterable, or be read lazily from a
+file of one of these formats:
+
+- csv: one record per row, each field a number.
+
+- npy: one record per row of a NumPy array, which is memory-mapped
+  if given by file name and read a row at a time if given as a file
+  object; a one-dimensional array gives one-element records.
+
+- jsonl: one JSON value per line, a list being a record and anything
+  else a one-element record.
+
+`Ripl.ingest` and `Engine.ingest` observe such a stream in batches of
+bounded size, each batch being one bulk observe directive, so only
+one batch of records is held in memory at a time.  Both are
+`observe_batches` applied to their own way of observing a batch.
+'''
+
+import csv
+import itertools
+import json
+import numbers
+import os
+
+import numpy as np
+
+from venture.exception import VentureException
+import venture.value.dicts as v
+
+FORMATS = ['csv', 'npy', 'jsonl']
+
+def read_records(source, format=None):
+  """Iterate lazily over the records in source.
+
+source may be the name of a file in one of the FORMATS, a file object
+open on one, or any other iterable of records.  The format of a file
+is taken from its extension unless given explicitly."""
+  if isinstance(source, basestring):
+    if format is None:
+      format = _format_of(source)
+    _check_format(format)
+    return _read_file(source, format)
+  elif hasattr(source, 'read'):
+    if format is None:
+      format = _format_of(getattr(source, 'name', ''))
+    _check_format(format)
+    return _read_stream(source, format)
+  else:
+    if format is not None:
+      raise VentureException('invalid_argument',
+        'Cannot give the format of a dataset that is not a file',
+        argument='format')
+    return iter(source)
+
+def _format_of(fname):
+  (_, extension) = os.path.splitext(fname)
+  extension = extension[1:].lower()
+  if extension == 'json':
+    return 'jsonl'
+  return extension
+
+def _check_format(format):
+  if format not in FORMATS:
+    raise VentureException('invalid_argument',
+      'Unknown dataset format %r; expected one of %s' % (format, FORMATS),
+      argument='format')
+
+def _read_file(fname, format):
+  if format == 'npy':
+    # Memory-mapped, so rows are paged in as they are read
+    for record in _npy_records(np.load(fname, mmap_mode='r')):
+      yield record
+  else:
+    with open(fname, 'rb' if format == 'csv' else 'r') as f:
+      for record in _read_stream(f, format):
+        yield record
+
+def _read_stream(f, format):
+  if format == 'csv':
+    return _csv_records(f)
+  elif format == 'npy':
+    return _npy_stream_records(f)
+  else:
+    return _jsonl_records(f)
+
+def _csv_records(f):
+  for (line, row) in enumerate(csv.reader(f), 1):
+    if not row:
+      continue
+    try:
+      yield [float(field) for field in row]
+    except ValueError:
+      raise VentureException('invalid_argument',
+        'Non-numeric field in csv dataset at line %d: %r' % (line, row),
+        argument='source')
+
+def _npy_records(array):
+  for row in array:
+    yield _npy_record(row)
+
+def _npy_stream_records(f):
+  version = np.lib.format.read_magic(f)
+  if version == (1, 0):
+    (shape, fortran_order, dtype) = np.lib.format.read_array_header_1_0(f)
+  elif version == (2, 0):
+    (shape, fortran_order, dtype) = np.lib.format.read_array_header_2_0(f)
+  else:
+    raise VentureException('invalid_argument',
+      'Unsupported npy format version %d.%d' % version, argument='source')
+  if not shape or fortran_order or dtype.hasobject:
+    raise VentureException('invalid_argument',
+      'Can only stream rows of a C-ordered, non-object npy array of at '
+      'least one dimension; give the file name instead',
+      argument='source')
+  row_shape = shape[1:]
+  row_bytes = dtype.itemsize * int(np.prod(row_shape))
+  for _ in xrange(shape[0]):
+    data = f.read(row_bytes)
+    if len(data) < row_bytes:
+      raise VentureException('invalid_argument',
+        'Truncated npy dataset', argument='source')
+    yield _npy_record(np.frombuffer(data, dtype=dtype).reshape(row_shape))
+
+def _npy_record(row):
+  if np.ndim(row) == 0:
+    return [row.item()]
+  else:
+    return row.tolist()
+
+def _jsonl_records(f):
+  for line in f:
+    if not line.strip():
+      continue
+    record = json.loads(line)
+    if isinstance(record, list):
+      yield record
+    else:
+      yield [record]
+
+def batches(records, batch_size):
+  """Iterate over lists of up to batch_size consecutive records."""
+  if batch_size < 1:
+    raise VentureException('invalid_argument',
+      'Batch size must be positive, not %s' % (batch_size,),
+      argument='batch_size')
+  records = iter(records)
+  while True:
+    batch = list(itertools.islice(records, batch_size))
+    if not batch:
+      return
+    yield batch
+
+def observe_batches(records, batch_size, observe, infer=None,
+                    infer_every=1):
+  """Observe records in batches of up to batch_size, returning a list
+of what observe returns for each batch.
+
+observe is called with each batch of records, as stack dicts; infer,
+if given, is called with no arguments after every infer_every
+batches."""
+  results = []
+  for (n, batch) in enumerate(batches(records, batch_size), 1):
+    results.append(observe(stack_dicts(batch)))
+    if infer is not None and n % infer_every == 0:
+      infer()
+  return results
+
+def stack_dicts(batch):
+  """The batch, with each element of each record as a stack dict."""
+  return [[stack_dict(value) for value in record] for record in batch]
+
+def stack_dict(value):
+  """The stack dict representing a value read from a dataset.
+
+Strings are data, not expressions to parse, and lists are arrays."""
+  if isinstance(value, dict):
+    return value # Already a stack dict
+  elif isinstance(value, bool):
+    return v.boolean(value)
+  elif isinstance(value, numbers.Integral):
+    return v.integer(value)
+  elif isinstance(value, numbers.Number):
+    return v.number(value)
+  elif isinstance(value, basestring):
+    return v.string(value)
+  elif isinstance(value, (list, tuple)):
+    return v.array([stack_dict(item) for item in value])
+  else:
+    raise VentureException('invalid_argument',
+      'Cannot observe %r from a dataset' % (value,), argument='source')
+
+def split_batch(batch):
+  """The arguments and the values to observe of a batch of records."""
+  return ([record[:-1] for record in batch],
+          [record[-1] for record in batch])
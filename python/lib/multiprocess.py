@@ -58,6 +58,18 @@ results have been returned. It then checks for exceptions; if any are
 found, it re-raises the first one. Else it passes its result back to
 the client.
 
+The client may instead call "map_async" or "at_async", which send the
+command and return at once with a future for the answer.  Several
+commands may be outstanding at once, and the Master's "as_completed"
+collects answers in the order the Workers send them, rather than the
+order of the Workers, so that results from Workers that finish early
+can be processed while the rest are still running.
+
+Workers time every command they run on each of their objects.  Since
+the objects may take very different times, the Master can "rebalance"
+the workers by moving objects from the busiest to the least busy (with
+the copier, below), leaving the client's object indexes unchanged.
+
 This Master/Worker system has a facility for setting the random seeds
 on the workers.  This respects the possibility that each object may
 have a local PRNG as follows: When the Master issues a seed reset, if
@@ -66,19 +78,31 @@ an object defines a "has_own_prng" method, and that method returns
 "set_seed" method.  If not, the Worker will assume the object relies
 on the process-global Python PRNG available in each child process.
 
+If the Master is given a "copier" (an object with "copy", "export",
+and "restore" methods), it can also resample the objects in place:
+the client passes the index of the ancestor of each new object, and
+the Workers rearrange, copy, and exchange their objects accordingly.
+Objects are only transmitted between Workers when an ancestor lives
+on a different Worker than its descendant, so the pool (and its
+processes) survives resampling.
+
 For more information on the Master class hierarchy, see the docstrings
 below.
 
 '''
 
+from collections import deque
 import multiprocessing as mp
 from multiprocessing import dummy as mpd
 from sys import exc_info
 from traceback import format_exc
 import random
+import select
+import time
 import numpy as np
 
 from venture.exception import VentureException, format_worker_trace
+from venture.shared_arrays import by_handle
 
 ######################################################################
 # Auxiliary functions for safe function evaluation
@@ -115,6 +139,85 @@ def safely(f):
       return Success(res)
   return wrapped
 
+######################################################################
+# Futures for answers the workers have yet to send
+######################################################################
+
+# The least fraction by which rebalancing must shorten the slowest
+# worker's time for objects to be moved.
+REBALANCE_GAIN = 0.1
+
+# How long to wait on one pipe at a time when the pipes cannot be
+# waited on together (as threads' pipes cannot).
+POLL_INTERVAL = 0.001
+
+class WorkerFuture(object):
+  '''The eventual answer of one worker to one command.
+
+  Each worker answers in the order its commands were sent, so the
+  master keeps a queue of the futures awaiting each pipe, and any
+  number of commands may be outstanding at once.
+
+  '''
+  def __init__(self, master, ix):
+    self.master = master
+    self.ix = ix # Index of the worker in the process list
+    self.answer = None # The Success or Failure (or list of them) sent
+    self.finished = False
+
+  def done(self): return self.finished
+
+  def wait(self):
+    '''Block until the worker has answered, and return the raw answer.'''
+    while not self.finished:
+      self.master._receive(self.ix) # pylint: disable=protected-access
+    return self.answer
+
+  def result(self):
+    '''The result of a command to a single object, re-raising any
+exception it threw.'''
+    return self.master.handle_one_result(self.wait())
+
+class MapFuture(object):
+  '''The eventual answers of all the workers to one command.'''
+  def __init__(self, master, chunks):
+    self.master = master
+    self.chunks = chunks # WorkerFutures, parallel to the process list
+    # The objects each worker held when the command was sent
+    self.members = master.chunk_members
+
+  def done(self): return all(f.done() for f in self.chunks)
+
+  def result(self):
+    '''The results for all the objects, in order.
+
+Waits for every worker before raising any exception, so no pipe is
+left holding a stale answer.'''
+    for _ in self.master.as_completed(self.chunks): pass
+    entries = [None for _ in self.master.chunk_indexes]
+    failures = []
+    for future in self.chunks:
+      res = []
+      self.master.accumulate_result(res, future.answer)
+      if len(res) == len(self.members[future.ix]):
+        for (i, entry) in zip(self.members[future.ix], res):
+          entries[i] = entry
+      else:
+        failures.extend(res) # One failure for the whole chunk
+    if failures:
+      self.master.handle_result_list(failures)
+    return self.master.handle_result_list(entries)
+
+  def results_as_completed(self):
+    '''Yield (indexes, results) for each worker as it answers.
+
+indexes are the indexes in the object list of the objects the worker
+manages, and results are the results for those objects.'''
+    for future in self.master.as_completed(self.chunks):
+      res = []
+      self.master.accumulate_result(res, future.answer)
+      yield (self.members[future.ix], self.master.handle_result_list(res))
+
 ######################################################################
 # The masters; manage communication between the client and the objects
 ######################################################################
@@ -127,7 +230,7 @@ class MasterBase(object):
   sequential modes.
 
   '''
-  def __init__(self, objects, process_cap, seed):
+  def __init__(self, objects, process_cap, seed, copier=None):
     """A Master maintains:
 
     - An array of objects representing the worker processes.
@@ -143,10 +246,16 @@ class MasterBase(object):
       list and (the chunk that object is part of and its offset in that
       chunk).
 
+    - Optionally, a copier, shared with the workers, for resampling
+      the objects in place.
+
     """
     self.process_cap = process_cap
+    self.copier = copier
     self.processes = []
     self.pipes = []  # Parallel to processes
+    self.pending = [] # Parallel to processes; WorkerFutures awaiting answers
+    self.chunk_members = [] # Parallel to processes; indexes of their objects
     self.chunk_sizes = [] # Parallel to processes
     self.chunk_indexes = [] # One per object
     self.chunk_offsets = [] # Parallel to chunk_indexes
@@ -157,32 +266,52 @@ class MasterBase(object):
     # stop child processes
     self.map('stop')
 
-  def _create_processes(self, objects):
-    Pipe, Worker = self._pipe_and_process_types()
+  def _chunk_bounds(self, num_objects):
     if self.process_cap is None:
       base_size = 1
       extras = 0
-      chunk_ct = len(objects)
+      chunk_ct = num_objects
     else:
-      (base_size, extras) = divmod(len(objects), self.process_cap)
-      chunk_ct = min(self.process_cap, len(objects))
+      (base_size, extras) = divmod(num_objects, self.process_cap)
+      chunk_ct = min(self.process_cap, num_objects)
+    bounds = []
     for chunk in range(chunk_ct):
-      parent, child = Pipe()
       if chunk < extras:
         chunk_start = chunk * (base_size + 1)
         chunk_end = chunk_start + base_size + 1
       else:
         chunk_start = extras + chunk * base_size
         chunk_end = chunk_start + base_size
-      assert chunk_end <= len(objects) # I think I wrote this code to ensure this
-      process = Worker(objects[chunk_start:chunk_end], child)
+      assert chunk_end <= num_objects # I think I wrote this code to ensure this
+      bounds.append((chunk_start, chunk_end))
+    return bounds
+
+  def _create_processes(self, objects):
+    Pipe, Worker = self._pipe_and_process_types()
+    for (chunk_start, chunk_end) in self._chunk_bounds(len(objects)):
+      parent, child = Pipe()
+      process = Worker(objects[chunk_start:chunk_end], child, self.copier)
       process.start()
       self.pipes.append(parent)
+      self.pending.append(deque())
       self.processes.append(process)
-      self.chunk_sizes.append(chunk_end - chunk_start)
-      for i in range (chunk_end - chunk_start):
-        self.chunk_indexes.append(chunk)
-        self.chunk_offsets.append(i)
+    self._record_chunks(self._chunk_bounds(len(objects)))
+
+  def _record_chunks(self, bounds):
+    self._record_placement([range(chunk_start, chunk_end)
+                            for (chunk_start, chunk_end) in bounds])
+
+  def _record_placement(self, members):
+    # After rebalancing, a chunk need not hold consecutive objects.
+    num_objects = sum(len(indexes) for indexes in members)
+    self.chunk_members = members
+    self.chunk_sizes = [len(indexes) for indexes in members]
+    self.chunk_indexes = [None for _ in range(num_objects)]
+    self.chunk_offsets = [None for _ in range(num_objects)]
+    for (chunk, indexes) in enumerate(members):
+      for (offset, i) in enumerate(indexes):
+        self.chunk_indexes[i] = chunk
+        self.chunk_offsets[i] = offset
 
   def reset_seeds(self, seed):
     assert seed is not None
@@ -193,20 +322,161 @@ class MasterBase(object):
 
   def map(self, cmd, *args, **kwargs):
     '''Delegate command to all workers'''
-    # send command
-    for pipe in self.pipes: pipe.send((cmd, args, kwargs, None))
-    if cmd == 'stop': return
-    res = []
-    for pipe in self.pipes:
-      ans = pipe.recv()
-      self.accumulate_result(res, ans)
-    return self.handle_result_list(res)
+    if cmd == 'stop':
+      for pipe in self.pipes: pipe.send((cmd, args, kwargs, None))
+      return
+    return self.map_async(cmd, *args, **kwargs).result()
+
+  def map_async(self, cmd, *args, **kwargs):
+    '''Delegate command to all workers, without waiting for them.
+
+Returns a MapFuture for the results.'''
+    return MapFuture(self, [self._send(ix, (cmd, args, kwargs, None))
+                            for ix in range(len(self.pipes))])
+
+  def map_each(self, cmd, arglists):
+    '''Delegate a command to every object, each with arguments of its own.
+
+arglists is parallel to the object list.'''
+    return self.map_each_async(cmd, arglists).result()
+
+  def map_each_async(self, cmd, arglists):
+    '''Delegate a command to every object, each with arguments of its
+own, without waiting for them.
+
+Returns a MapFuture for the results.'''
+    return MapFuture(self, [
+      self._send(ix, ('each_object', (cmd, [arglists[i] for i in indexes]),
+                      {}, None))
+      for (ix, indexes) in enumerate(self.chunk_members)])
+
+  def map_chunks(self, cmds):
+    '''Delegate a (possibly different) command to each of several
+workers at once.
+
+cmds is a dict mapping index in the process list to (cmd, args)
+pairs.  Returns a dict mapping the same indexes to the results.'''
+    futures = dict((ix, self._send(ix, (cmd, args, {}, None)))
+                   for (ix, (cmd, args)) in cmds.iteritems())
+    # Drain every pipe before raising any errors, so none is left
+    # holding a stale answer.
+    for _ in self.as_completed(futures.values()): pass
+    return dict((ix, self.handle_one_result(future.answer))
+                for (ix, future) in futures.iteritems())
+
+  def map_copier(self, cmd, *args):
+    '''Delegate a command to the copier of every worker.'''
+    if self.copier is not None:
+      self.map_chunks(dict((ix, ('copier_call', (cmd,) + args))
+                           for ix in range(len(self.pipes))))
+
+  def can_resample_in_place(self, num_objects):
+    """Whether resample can produce num_objects objects without
+rebuilding the pool.
+
+This requires a copier and the same number of chunks as the pool
+currently has."""
+    return self.copier is not None and \
+      len(self._chunk_bounds(num_objects)) == len(self.processes)
+
+  def resample(self, ancestors, seed):
+    '''Replace the managed objects with copies of their ancestors, in place.
+
+ancestors[i] is the index (in the current object list) of the object
+that the new ith object should be a copy of.  Objects are moved
+between workers only if the new object belongs to a different chunk
+than its ancestor; and each worker receives each foreign ancestor
+at most once, making any further copies locally.'''
+    assert self.can_resample_in_place(len(ancestors))
+    rng = random.Random(seed)
+    bounds = self._chunk_bounds(len(ancestors))
+    self._rearrange([ancestors[chunk_start:chunk_end]
+                     for (chunk_start, chunk_end) in bounds], rng)
+    self._record_chunks(bounds)
+    self.reset_seeds(rng.randint(1, 2**31 - 1))
+
+  def _rearrange(self, sources, rng, move=False):
+    # sources[chunk] lists the indexes (in the current object list) of
+    # the objects the chunk is to hold copies of, in order.  If move,
+    # each object appears exactly once, and is moved rather than
+    # copied.
+    exports = {} # source chunk -> [(offset, seed)]
+    export_slots = {} # (ancestor, destination chunk) -> (source chunk, index in exports)
+    plans = [] # Parallel to processes
+    for (chunk, ancestors) in enumerate(sources):
+      plan = []
+      for ancestor in ancestors:
+        source = self.chunk_indexes[ancestor]
+        offset = self.chunk_offsets[ancestor]
+        if source == chunk:
+          plan.append(("local", offset, rng.randint(1, 2**31 - 1)))
+        else:
+          if (ancestor, chunk) not in export_slots:
+            requests = exports.setdefault(source, [])
+            export_slots[(ancestor, chunk)] = (source, len(requests))
+            requests.append((offset, rng.randint(1, 2**31 - 1)))
+          plan.append(("import", export_slots[(ancestor, chunk)],
+                       rng.randint(1, 2**31 - 1)))
+      plans.append(plan)
+    # All exports must complete before any worker rearranges its chunk
+    exported = self.map_chunks(dict(
+      (source, ('export_objects', (requests, move)))
+      for (source, requests) in exports.iteritems()))
+    cmds = {}
+    for (chunk, plan) in enumerate(plans):
+      incoming = []
+      local_plan = []
+      for (kind, where, copy_seed) in plan:
+        if kind == "import":
+          (source, i) = where
+          incoming.append(exported[source][i])
+          where = len(incoming) - 1
+        local_plan.append((kind, where, copy_seed))
+      cmds[chunk] = ('resample_chunk', (local_plan, incoming))
+    self.map_chunks(cmds)
+
+  def object_timings(self, reset=False):
+    '''The time, in seconds, each object has spent running commands
+since it was created, resampled, moved, or last reset.'''
+    return self.map('report_timings', reset)
+
+  def rebalance(self, seed, gain=REBALANCE_GAIN):
+    '''Move objects between workers to even out the time they take.
+
+Each object's timing since the last rebalance is taken as its expected
+cost.  The least loaded worker repeatedly steals the costliest object
+it can from the most loaded one, as long as that shortens the longest
+worker's time.  The objects are only moved if the longest time comes
+out shorter by at least the fraction gain, since moving them between
+processes means serializing them.  Returns whether they were moved.'''
+    if self.copier is None or len(self.processes) < 2:
+      return False
+    costs = self.object_timings(reset=True)
+    members = [list(indexes) for indexes in self.chunk_members]
+    loads = [sum(costs[i] for i in indexes) for indexes in members]
+    longest = max(loads)
+    for _ in range(len(costs)):
+      hi = loads.index(max(loads))
+      lo = loads.index(min(loads))
+      # Stealing anything cheaper than the gap shortens the longer of
+      # the two without making the shorter longer than it was.
+      stealable = [i for i in members[hi] if 0 < costs[i] < loads[hi] - loads[lo]]
+      if len(members[hi]) < 2 or not stealable:
+        break
+      i = max(stealable, key=lambda i: costs[i])
+      members[hi].remove(i)
+      members[lo].append(i)
+      loads[hi] -= costs[i]
+      loads[lo] += costs[i]
+    if max(loads) > longest * (1 - gain):
+      return False
+    self._rearrange(members, random.Random(seed), move=True)
+    self._record_placement(members)
+    return True
 
   def map_chunk(self, ix, cmd, *args, **kwargs):
     '''Delegate command to (all the objects of) a single worker, indexed by ix in the process list'''
-    pipe = self.pipes[ix]
-    pipe.send((cmd, args, kwargs, None))
-    res = pipe.recv()
+    res = self._send(ix, (cmd, args, kwargs, None)).wait()
     if isinstance(res, list):
       return self.handle_result_list(res)
     else:
@@ -214,10 +484,63 @@ class MasterBase(object):
 
   def at(self, ix, cmd, *args, **kwargs):
     '''Delegate command to a single object, indexed by ix in the object list'''
-    pipe = self.pipes[self.chunk_indexes[ix]]
-    pipe.send((cmd, args, kwargs, self.chunk_offsets[ix]))
-    res = pipe.recv()
-    return self.handle_one_result(res)
+    return self.at_async(ix, cmd, *args, **kwargs).result()
+
+  def at_async(self, ix, cmd, *args, **kwargs):
+    '''Delegate command to a single object, without waiting for it.
+
+Returns a WorkerFuture for the result.'''
+    msg = (cmd, args, kwargs, self.chunk_offsets[ix])
+    return self._send(self.chunk_indexes[ix], msg)
+
+  def _send(self, ix, msg):
+    # The future must be queued before sending, because a synchronous
+    # worker answers during the send.
+    future = WorkerFuture(self, ix)
+    self.pending[ix].append(future)
+    try:
+      self.pipes[ix].send(msg)
+    except:
+      # A SynchronousWorker raised without answering.
+      self.pending[ix].remove(future)
+      raise
+    return future
+
+  def _receive(self, ix):
+    # Each worker answers its commands in the order they were sent.
+    future = self.pending[ix].popleft()
+    future.answer = self.pipes[ix].recv()
+    future.finished = True
+
+  def as_completed(self, futures):
+    '''Yield the given WorkerFutures in the order their answers arrive.
+
+Answers to earlier commands to the same workers are collected along
+the way, so this never blocks on a worker that has already answered.'''
+    waiting = list(futures)
+    while True:
+      for future in [f for f in waiting if f.finished]:
+        yield future
+      waiting = [f for f in waiting if not f.finished]
+      if not waiting:
+        return
+      ixs = sorted(set(f.ix for f in waiting))
+      ready = [ix for ix in ixs if self.pipes[ix].poll()]
+      if not ready:
+        ready = self._wait_any(ixs)
+      for ix in ready:
+        self._receive(ix)
+
+  def _wait_any(self, ixs):
+    pipes = [self.pipes[ix] for ix in ixs]
+    if all(hasattr(pipe, 'fileno') for pipe in pipes):
+      # Real pipes; the kernel can wait on all of them at once.
+      (readable, _, _) = select.select(pipes, [], [])
+      return [ix for (ix, pipe) in zip(ixs, pipes) if pipe in readable]
+    elif pipes[0].poll(POLL_INTERVAL):
+      return ixs[:1]
+    else:
+      return [ix for (ix, pipe) in zip(ixs, pipes)[1:] if pipe.poll()]
 
   def accumulate_result(self, res, ans):
     # ans could be a list of Success/Failures or a single
@@ -280,7 +603,7 @@ class MultiprocessingMaster(MasterBase):
   '''
   @staticmethod
   def _pipe_and_process_types():
-    return mp.Pipe, MultiprocessingWorker
+    return HandlePipe, MultiprocessingWorker
 
 class ThreadedSerializingMaster(MasterBase):
   '''Controls ThreadedSerializingWorkers. Communicates with
@@ -356,11 +679,16 @@ class WorkerBase(object):
   synchronously (using Safely objects to catch exceptions).
 
   '''
-  def __init__(self, objs, pipe):
-    self.objs = [Safely(o) for o in objs]
+  def __init__(self, objs, pipe, copier=None):
+    self.objs = [self._wrap(o) for o in objs]
+    self.timings = [0 for _ in objs] # Parallel to objs
     self.pipe = pipe
+    self.copier = copier
     self._initialize()
 
+  @staticmethod
+  def _wrap(obj): return Safely(obj)
+
   def run(self):
     done = False
     while not done:
@@ -373,12 +701,37 @@ class WorkerBase(object):
     if hasattr(self, cmd):
       res = getattr(self, cmd)(index, *args, **kwargs)
     elif index is not None:
-      res = getattr(self.objs[index], cmd)(*args, **kwargs)
+      res = self._timed(index, cmd, args, kwargs)
     else:
-      res = [getattr(o, cmd)(*args, **kwargs) for o in self.objs]
-    self.pipe.send(res)
+      res = [self._timed(i, cmd, args, kwargs) for i in range(len(self.objs))]
+    try:
+      self.pipe.send(res)
+    except Exception: # pylint: disable=broad-except
+      # An answer that cannot be pickled must not kill the worker
+      # and leave the master waiting for it forever.
+      err = VentureException('fatal',
+        'Worker could not send its answer to %s: %s' % (cmd, exc_info()[1]))
+      self.pipe.send(Failure(VentureException, err.to_json_object(),
+                             format_exc()))
     return False # Maybe not done
 
+  def _timed(self, index, cmd, args, kwargs):
+    start = time.time()
+    try:
+      return getattr(self.objs[index], cmd)(*args, **kwargs)
+    finally:
+      self.timings[index] += time.time() - start
+
+  def each_object(self, _index, cmd, arglists):
+    return [self._timed(i, cmd, args, {}) for (i, args) in enumerate(arglists)]
+
+  @safely
+  def report_timings(self, _index, reset):
+    ans = self.timings
+    if reset:
+      self.timings = [0 for _ in self.objs]
+    return ans
+
   @safely
   def set_seeds(self, _index, seeds):
     # If we're in puma, set the seed; else don't.
@@ -405,6 +758,56 @@ class WorkerBase(object):
   def send_object(self, _index):
     raise VentureException("fatal", "Cannot transmit object directly if memory is not shared")
 
+  @safely
+  def export_objects(self, _index, requests, move=False):
+    """Produce transmissible copies of some of this worker's objects.
+
+requests is a list of (offset, seed) pairs; an offset may repeat if
+the same object is wanted by several other workers.  If move, the
+objects are leaving this worker, so need not be copied if they can
+be sent as they are."""
+    cache = {}
+    return [self._export(offset, seed, cache, move) for (offset, seed) in requests]
+
+  def _export(self, offset, _seed, cache, _move):
+    # Serializing the same object once suffices, because restoring
+    # makes a fresh object every time.
+    if offset not in cache:
+      cache[offset] = self.copier.export(self.objs[offset].obj)
+    return cache[offset]
+
+  def _import(self, exported, seed):
+    return self.copier.restore(exported, seed)
+
+  @safely
+  def resample_chunk(self, _index, plan, incoming):
+    """Rearrange this worker's objects according to plan.
+
+Each plan entry is ("local", offset, seed), meaning a copy of the
+object at that offset, or ("import", i, seed), meaning a copy of the
+ith incoming exported object.  The first use of any source object
+takes it as is; subsequent uses copy it."""
+    sources = {}
+    new_objs = []
+    for (kind, where, seed) in plan:
+      if (kind, where) in sources:
+        obj = self.copier.copy(sources[(kind, where)], seed)
+      else:
+        if kind == "local":
+          obj = self.objs[where].obj
+        else:
+          obj = self._import(incoming[where], seed)
+        sources[(kind, where)] = obj
+      new_objs.append(obj)
+    self.objs = [self._wrap(o) for o in new_objs]
+    self.timings = [0 for _ in new_objs]
+
+  @safely
+  def copier_call(self, _index, cmd, *args):
+    """Forward a method call to this worker's copier (e.g., to keep a
+registry of foreign SPs up to date)."""
+    return getattr(self.copier, cmd)(*args)
+
 ######################################################################
 # Base classes defining how to send objects, and process types
 
@@ -423,6 +826,15 @@ class SharedMemoryWorkerBase(WorkerBase):
     else:
       return [o.obj for o in self.objs]
 
+  def _export(self, offset, seed, _cache, move):
+    # No serialization needed, but every recipient needs its own copy.
+    if move:
+      return self.objs[offset].obj
+    return self.copier.copy(self.objs[offset].obj, seed)
+
+  def _import(self, exported, _seed):
+    return exported
+
 class MultiprocessBase(mp.Process):
   '''
   Specifies multiprocess implementation; inherited by MultiprocessingWorker.
@@ -493,11 +905,10 @@ class SynchronousWorker(SharedMemoryWorkerBase, SynchronousBase):
   serialization. Controlled by SynchronousMaster.
 
   '''
-  def _initialize(self):
-    super(SynchronousWorker, self)._initialize()
-    # Re-wrap the trace objects not to capture exceptions, but to
-    # propagate them into the master.
-    self.objs = [Confidently(o.obj) for o in self.objs]
+  # Wrap the trace objects not to capture exceptions, but to
+  # propagate them into the master.
+  @staticmethod
+  def _wrap(obj): return Confidently(obj)
 
 ######################################################################
 # Code to handle exceptions in worker processes
@@ -569,6 +980,11 @@ class SynchronousOneWayPipe(object):
     for cb in self.cbs:
       cb()
 
+  def poll(self, _timeout=0.0):
+    # Nothing more can arrive while we wait, since the other end runs
+    # in this thread.
+    return len(self.objs) > 0
+
   def recv(self):
     ans = self.objs[0]
     self.objs = self.objs[1:]
@@ -581,5 +997,25 @@ def SynchronousPipe():
   child.other = parent
   return (parent, child)
 
+######################################################################
+# Pipes between processes
+
+class HandleConnection(object):
+  """A multiprocessing Connection that sends SharedArrays by handle,
+which is safe because the other end is a process of the same pool."""
+  def __init__(self, conn):
+    self.conn = conn
+
+  def send(self, obj):
+    with by_handle():
+      self.conn.send(obj)
+
+  def __getattr__(self, attrname):
+    return getattr(self.conn, attrname)
+
+def HandlePipe():
+  (parent, child) = mp.Pipe()
+  return (HandleConnection(parent), HandleConnection(child))
+
 class SynchronousProcess(object):
   pass
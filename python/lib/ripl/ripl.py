@@ -60,6 +60,7 @@ import numpy as np
 from venture.exception import VentureException
 from venture.lite.value import VentureForeignBlob
 from venture.lite.value import VentureValue
+import venture.ingest as ingest
 import venture.lite.address as addr
 import venture.value.dicts as v
 import plugins
@@ -298,7 +299,7 @@ class Ripl():
         raise annotated, None, info[2]
 
     def _annotated_error(self, e, instruction):
-        if e.exception is 'evaluation':
+        if e.exception == 'evaluation':
             p = self._cur_parser()
             for i, frame in enumerate(e.data['stack_trace']):
                 exp, text_index = self.humanReadable(**frame)
@@ -443,6 +444,11 @@ class Ripl():
             elif key == 'value':
                 # I believe values are a subset of expressions
                 return self._ensure_parsed_expression(value)
+            elif key == 'values':
+                return [self._ensure_parsed_expression(val) for val in value]
+            elif key == 'arguments':
+                return [[self._ensure_parsed_expression(arg) for arg in args]
+                        for args in value]
             else:
                 raise Exception("Unknown instruction field %s in %s" % (key, partial_dict))
         return dict([(key, by_key(key, value)) for key, value in partial_dict.iteritems()])
@@ -681,7 +687,7 @@ value to be returned as a dict annotating its Venture type.
         weights = self.execute_instruction(i)['value']
         return v.vector(weights) if type else weights
 
-    def bulk_observe(self, exp, items, label=None):
+    def bulk_observe(self, exp, items, label=None, type=False):
         """Observe many evaluations of an expression.
 
 Syntax:
@@ -693,18 +699,26 @@ Operationally equivalent to::
   for x in iterable:
     ripl.observe("<expr>", x)
 
-but appreciably faster.  See also open considerations and details of
-the semantics in `observe_dataset`.
+but appreciably faster, because the expression is parsed and
+desugared once and all the observations are incorporated together.
+The result is a single directive, which is listed, reported (as the
+list of the observed expression's values) and forgotten as a unit,
+under the given label if any.  Returns the weight increments of
+incorporating all the data, as `observe` does.  See also
+`observe_dataset`.
 
 """
-        ret_vals = []
-        parsed = self._ensure_parsed_expression(exp)
-        for i, val in enumerate(items):
-          lab = label+"_"+str(i) if label is not None else None
-          ret_vals.append(self.observe(parsed, val, lab))
-        return ret_vals
-
-    def observe_dataset(self, proc_expression, iterable, label=None):
+        i = {'instruction':'bulk_observe',
+             'expression':self._ensure_parsed_expression(exp),
+             'values':list(items)}
+        if label is not None:
+            i['instruction'] = 'labeled_bulk_observe'
+            i['label'] = _symbolize(label)
+        weights = self.execute_instruction(i)['value']
+        return v.vector(weights) if type else weights
+
+    def observe_dataset(self, proc_expression, iterable, label=None,
+                        type=False):
         """Observe a general dataset.
 
 Syntax:
@@ -729,8 +743,9 @@ Semantics:
   the iterable give the arguments to the procedure given by `<expr>`,
   and the last element gives the value to observe.
 
-- The ripl method returns a list of directive ids, which correspond to
-  the individual observes thus generated.
+- Like `bulk_observe`, the whole dataset becomes one directive, which
+  is listed, reported and forgotten as a unit, and the ripl method
+  returns the weight increments of incorporating it.
 
 Open issues:
 
@@ -740,25 +755,65 @@ Open issues:
 - This is not the same as directly observing sufficient statistics
   only.
 
-- It is currently not possible to forget the whole bulk_observe at
-  once.
+- list_directives represents the dataset by its full lists of
+  arguments and values, which may be large.
+
+        """
+        args = []
+        vals = []
+        for args_val in iterable:
+            args.append(args_val[:-1])
+            vals.append(args_val[-1])
+        i = {'instruction':'bulk_observe',
+             'expression':self._ensure_parsed_expression(proc_expression),
+             'values':vals, 'arguments':args}
+        if label is not None:
+            i['instruction'] = 'labeled_bulk_observe'
+            i['label'] = _symbolize(label)
+        weights = self.execute_instruction(i)['value']
+        return v.vector(weights) if type else weights
+
+    def ingest(self, proc_expression, source, format=None,
+               batch_size=1000, infer_program=None, infer_every=1):
+        """Observe a dataset streamed from a file or iterator.
+
+Syntax:
+ripl.ingest("<expr>", <source>, batch_size=1000, infer_program=None, infer_every=1)
+
+- The `<expr>` and the records of the dataset are as for
+  `observe_dataset`: the procedure is applied to all but the last
+  element of each record, and the last element observed.
+
+- The `<source>` is a Python iterable of records, or a csv, npy or
+  jsonl file (or its name) -- see `venture.ingest`.  The format is
+  taken from the file's extension unless given.  Strings in records
+  are data, not Venture expressions.
+
+Semantics:
 
-- Currently, list_directives will not respect the nesting structure of
-  observations implied by `bulk_observe`.  How can we improve this? Do
-  we represent the bulk_observe as one directive? If so, we can hardly
-  return a useful representation of the iterable representing the data
-  set. If not, we will hardly win anything because list_directives
-  will generate all those silly per-datapoint observes (every time
-  it's called!)
+- The records are read lazily and observed in batches of up to
+  `batch_size` records, each becoming a separate directive as if by
+  `observe_dataset`, so memory use outside the model itself does not
+  grow with the size of the dataset.
+
+- If `infer_program` is given, it is run, as by `infer`, after every
+  `infer_every` batches, for online learning.
+
+Returns the directive id of each batch, as does `Engine.ingest`.
 
         """
-        ret_vals = []
-        parsed = self._ensure_parsed_expression(proc_expression)
-        for i, args_val in enumerate(iterable):
-          expr = [parsed] + [v.quote(a) for a in args_val[:-1]]
-          lab = label+"_"+str(i) if label is not None else None
-          ret_vals.append(self.observe(expr, args_val[-1], lab))
-        return ret_vals
+        exp = self._ensure_parsed_expression(proc_expression)
+        def observe(batch):
+            (args, vals) = ingest.split_batch(batch)
+            i = {'instruction':'bulk_observe', 'expression':exp,
+                 'values':vals, 'arguments':args}
+            return self.execute_instruction(i)['directive_id']
+        infer = None
+        if infer_program is not None:
+            infer = lambda: self.infer(infer_program)
+        records = ingest.read_records(source, format)
+        return ingest.observe_batches(records, batch_size, observe, infer,
+                                      infer_every)
 
     ############################################
     # Core
@@ -771,6 +826,11 @@ Open issues:
         self.sivm.core_sivm.engine.set_seed(seed)
         return None
 
+    def inference_startup_time(self):
+        '''Seconds taken to set up the first inference trace (installing
+the inference prelude), or None if none has been set up yet.'''
+        return self.sivm.core_sivm.engine.inference_startup_time
+
     def forget(self, label_or_did, type=False):
         (tp, val) = _interp_label_or_did(label_or_did)
         if tp == 'did':
@@ -868,7 +928,14 @@ Open issues:
         dir_id = int(directive['directive_id'])
         dir_val = str(directive['value'])
         dir_type = directive['instruction']
-        dir_text = self._get_raw_text(dir_id)
+        if dir_type == "bulk_observe":
+            # Bulk observes are not recorded as text
+            dir_text = "bulk_observe %s (%d data)" % (
+                self._cur_parser().unparse_expression(
+                    directive['expression']),
+                len(directive['values']))
+        else:
+            dir_text = self._get_raw_text(dir_id)
 
         if dir_type == "assume":
             print "%d: %s:\t%s" % (dir_id, dir_text, dir_val)
@@ -876,6 +943,8 @@ Open issues:
             print "%d: %s" % (dir_id, dir_text)
         elif dir_type == "predict":
             print "%d: %s:\t %s" % (dir_id, dir_text, dir_val)
+        elif dir_type == "bulk_observe":
+            print "%d: %s" % (dir_id, dir_text)
         else:
             assert False, "Unknown directive type found: %s" % str(directive)
 
@@ -968,15 +1037,15 @@ Open issues:
         extra['directive_id_to_mode'] = self.directive_id_to_mode
         return self.sivm.save_io(stream, extra)
 
-    def load_io(self, stream):
-        extra = self.sivm.load_io(stream)
+    def load_io(self, stream, particles=None):
+        extra = self.sivm.load_io(stream, particles=particles)
         self.directive_id_to_stringable_instruction = \
             extra['directive_id_to_stringable_instruction']
         self.directive_id_to_mode = extra['directive_id_to_mode']
         return extra
 
     def save(self, fname, extra=None):
-        with open(fname, 'w') as fp:
+        with open(fname, 'wb') as fp:
             self.save_io(fp, extra=extra)
 
     def saves(self, extra=None):
@@ -984,12 +1053,12 @@ Open issues:
         self.save_io(ans, extra=extra)
         return ans.getvalue()
 
-    def load(self, fname):
-        with open(fname) as fp:
-            return self.load_io(fp)
+    def load(self, fname, particles=None):
+        with open(fname, 'rb') as fp:
+            return self.load_io(fp, particles=particles)
 
-    def loads(self, string):
-        return self.load_io(StringIO.StringIO(string))
+    def loads(self, string, particles=None):
+        return self.load_io(StringIO.StringIO(string), particles=particles)
 
     ############################################
     # Error reporting control
@@ -1022,18 +1091,41 @@ Open issues:
     # Profiler methods
     ############################################
 
-    def profiler_running(self, enable=None):
-        return self.sivm.core_sivm.profiler_running(enable)
+    def profiler_running(self, enable=None, summary=False, sample_every=0):
+        return self.sivm.core_sivm.profiler_running(
+            enable, summary, sample_every)
+
+    def profiler_enable(self, summary=False, sample_every=0):
+        '''Start profiling proposals.
 
-    def profiler_enable(self):
-        self.profiler_running(True)
+        By default every proposal is recorded.  With summary=True,
+        proposals are instead aggregated per (operator, scope, block),
+        and only every sample_every-th one (none, if sample_every is
+        0) is recorded in full; see `profile_data`.
+        '''
+        self.profiler_running(True, summary, sample_every)
         return None
 
     def profiler_disable(self):
         self.profiler_running(False)
         return None
 
-    def profile_data(self):
+    def profile_data(self, summary=False):
+        '''Return the profiled proposals as a Pandas DataFrame.
+
+        With summary=True, return the aggregates collected by
+        ``profiler_enable(summary=True)`` instead: one row per
+        particle and (operator, scope, block), giving the number of
+        proposals, the acceptance rate, the total time and its detach
+        and regen parts, the numbers of scaffold cache hits and
+        misses, and the mean number of principal, absorbing, AAA and
+        brush nodes.
+        '''
+        if summary:
+            from pandas import DataFrame
+            return DataFrame.from_records(
+                self.sivm.core_sivm.engine.profile_summary())
+
         rows = self.sivm.core_sivm.engine.profile_data()
 
         def replace(d, name, f):
@@ -1068,6 +1160,18 @@ Open issues:
         from pandas import DataFrame
         return DataFrame.from_records(rows)
 
+    def cache_stats(self):
+        '''Return the structure caches' counters as a Pandas DataFrame.
+
+        One row per particle and cache in use (the scaffold and
+        extent caches, once turned on with the engine's
+        ``set_scaffold_caching`` and ``set_extent_caching``), giving
+        its numbers of hits, misses and invalidations.
+        '''
+        from pandas import DataFrame
+        return DataFrame.from_records(
+            self.sivm.core_sivm.engine.cache_stats())
+
     _parsed_prelude = None
 
     ############################################
@@ -0,0 +1,143 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+'''Constant NumPy arrays shared between processes by handle.
+
+A trace pool in multiprocess mode ships directives, and whole traces
+when resampling, to and from its worker processes by pickling them.
+Left alone, every large constant array in a model (observed data, GP
+inputs, and the like) would then be copied into every process that
+receives it.
+
+A SharedArrayStore instead writes each such array once, to a file in
+shared memory (/dev/shm where there is one), and hands back a
+read-only SharedArray mapping that file.  While sent through a
+worker pipe (see `by_handle`), a SharedArray pickles as the name of
+its file, so every process that unpickles it maps the same pages
+rather than holding a copy of its own.  Pickled any other way, e.g.
+into a saved model, it pickles its contents, since the file does not
+outlive the trace pool.
+'''
+
+from contextlib import contextmanager
+import atexit
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+# Arrays smaller than this are cheaper to copy than to share.
+MIN_SHARED_BYTES = 1 << 16
+
+_pickling = threading.local()
+
+@contextmanager
+def by_handle():
+  """Pickle SharedArrays as handles to their files within this context
+(in this thread)."""
+  outer = getattr(_pickling, 'by_handle', False)
+  _pickling.by_handle = True
+  try:
+    yield
+  finally:
+    _pickling.by_handle = outer
+
+class SharedArray(np.ndarray):
+  """A read-only array mapped from a file in shared memory.
+
+  Pickles as a handle to its file within `by_handle`, and as its
+  contents otherwise.  Views of it, and arrays computed from it, are
+  ordinary arrays, which always pickle their contents."""
+
+  def __array_finalize__(self, _obj):
+    self.shared_path = None
+
+  def __reduce__(self):
+    if self.shared_path is None or not getattr(_pickling, 'by_handle', False):
+      return np.asarray(self).__reduce__()
+    return (open_shared_array, (self.shared_path, self.dtype.str, self.shape))
+
+  def __reduce_ex__(self, _protocol):
+    return self.__reduce__()
+
+def open_shared_array(path, dtype, shape):
+  """Map the SharedArray held in the given file."""
+  mapped = np.memmap(path, dtype=np.dtype(dtype), mode='r', shape=shape)
+  ans = mapped.view(SharedArray)
+  ans.shared_path = path
+  return ans
+
+def _shm_directory():
+  if os.path.isdir('/dev/shm'):
+    return '/dev/shm'
+  else:
+    return None # The default temporary directory
+
+class SharedArrayStore(object):
+  """Places large constant arrays in shared memory, once each.
+
+  The files are removed by close, or when the process exits.
+  Processes that have already mapped an array keep it after that, but
+  handles to it can no longer be opened."""
+
+  def __init__(self, min_bytes=MIN_SHARED_BYTES):
+    self.min_bytes = min_bytes
+    self.shared = {} # {id(array): (array, SharedArray)}
+    self.registered = False
+
+  def share(self, array):
+    """Return a SharedArray with the contents of array, or array
+itself if it is too small or not of a plain dtype to be worth sharing."""
+    if isinstance(array, SharedArray) and array.shared_path is not None:
+      return array
+    if array.dtype.hasobject or array.nbytes < self.min_bytes:
+      return array
+    # Keyed by identity, with the array kept alive so the key stays
+    # valid: the same data is typically handed over many times.
+    if id(array) not in self.shared:
+      if not self.registered:
+        atexit.register(self.close)
+        self.registered = True
+      (fd, path) = tempfile.mkstemp(prefix='venture-', dir=_shm_directory())
+      with os.fdopen(fd, 'wb') as f:
+        f.write(np.ascontiguousarray(array).tostring())
+      shared = open_shared_array(path, array.dtype.str, array.shape)
+      self.shared[id(array)] = (array, shared)
+    return self.shared[id(array)][1]
+
+  def share_in(self, thing):
+    """Return thing with every array in it shared, looking inside
+lists, tuples and dicts (such as stack dicts)."""
+    if isinstance(thing, np.ndarray):
+      return self.share(thing)
+    elif isinstance(thing, list):
+      return [self.share_in(item) for item in thing]
+    elif isinstance(thing, tuple):
+      return tuple(self.share_in(item) for item in thing)
+    elif isinstance(thing, dict):
+      return type(thing)((k, self.share_in(v)) for (k, v) in thing.iteritems())
+    else:
+      return thing
+
+  def close(self):
+    for (_, shared) in self.shared.itervalues():
+      try:
+        os.unlink(shared.shared_path)
+      except OSError:
+        pass # Already gone
+    self.shared.clear()
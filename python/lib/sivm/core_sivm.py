@@ -36,6 +36,7 @@ class CoreSivm(object):
 
     _implemented_instructions = {
         'assume',
+        'bulk_observe',
         'clear',
         'continuous_inference_status',
         'define',
@@ -44,6 +45,7 @@ class CoreSivm(object):
         'freeze',
         'infer',
         'labeled_assume',
+        'labeled_bulk_observe',
         'labeled_forget',
         'labeled_freeze',
         'labeled_observe',
@@ -71,11 +73,11 @@ class CoreSivm(object):
             extra = {}
         return self.engine.save_io(stream, extra)
 
-    def load_io(self, stream):
-        return self.engine.load_io(stream)
+    def load_io(self, stream, particles=None):
+        return self.engine.load_io(stream, particles=particles)
 
     def save(self, fname, extra=None):
-        with open(fname, 'w') as fp:
+        with open(fname, 'wb') as fp:
             self.save_io(fp, extra=extra)
 
     def saves(self, extra=None):
@@ -83,12 +85,12 @@ class CoreSivm(object):
         self.save_io(ans, extra=extra)
         return ans.getvalue()
 
-    def load(self, fname):
-        with open(fname) as fp:
-            return self.load_io(fp)
+    def load(self, fname, particles=None):
+        with open(fname, 'rb') as fp:
+            return self.load_io(fp, particles=particles)
 
-    def loads(self, string):
-        return self.load_io(StringIO.StringIO(string))
+    def loads(self, string, particles=None):
+        return self.load_io(StringIO.StringIO(string), particles=particles)
 
     ###############################
     # Instruction implementations
@@ -138,6 +140,32 @@ class CoreSivm(object):
         did, weights = self.engine.labeled_observe(label, exp, val)
         return {'directive_id': did, 'value': weights}
 
+    def _do_bulk_observe(self, instruction):
+        (exp, vals, args) = self._bulk_observe_args(instruction)
+        did, weights = self.engine.bulk_observe(exp, vals, args)
+        return {'directive_id': did, 'value': weights}
+
+    def _do_labeled_bulk_observe(self, instruction):
+        (exp, vals, args) = self._bulk_observe_args(instruction)
+        label = utils.validate_arg(instruction, 'label', utils.validate_symbol)
+        did, weights = self.engine.labeled_bulk_observe(label, exp, vals, args)
+        return {'directive_id': did, 'value': weights}
+
+    def _bulk_observe_args(self, instruction):
+        exp = utils.validate_arg(instruction, 'expression',
+                utils.validate_expression, modifier=_modify_expression,
+                wrap_exception=False)
+        vals = utils.validate_arg(instruction, 'values', utils.validate_values,
+                modifier=_modify_values)
+        args = utils.validate_arg(instruction, 'arguments',
+                utils.validate_value_lists, required=False,
+                modifier=lambda obss: map(_modify_values, obss))
+        if args is not None and len(args) != len(vals):
+            raise VentureException('invalid_argument',
+                    'Bulk observe given %d argument lists for %d values.' %
+                    (len(args), len(vals)), argument='arguments')
+        return (exp, vals, args)
+
     def _do_predict(self,instruction):
         exp = utils.validate_arg(instruction,'expression',
                 utils.validate_expression,modifier=_modify_expression, wrap_exception=False)
@@ -225,11 +253,11 @@ class CoreSivm(object):
     # Profiler
     ##############################
 
-    def profiler_running(self, enable=None):
+    def profiler_running(self, enable=None, summary=False, sample_every=0):
         old_state = self.profiler_enabled
         if enable is not None:
             self.profiler_enabled = enable
-            self.engine.set_profiling(enable)
+            self.engine.set_profiling(enable, summary, sample_every)
         return old_state
 
 ###############################
@@ -256,6 +284,9 @@ def _modify_value(ob):
         return ans
     return ob
 
+def _modify_values(obs):
+    return map(_modify_value, obs)
+
 def _modify_symbol(s):
     # NOTE: need to str() b/c unicode might come via REST,
     #       which the boost python wrappings can't convert
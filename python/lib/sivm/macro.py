@@ -18,12 +18,11 @@
 # Macros that resyntax errors.
 # For a description of the framework, see macro_system.py
 
-import random
-
 from venture.exception import VentureException
 from venture.sivm.macro_system import Macro
 from venture.sivm.macro_system import Syntax
 from venture.sivm.macro_system import expand
+from venture.sivm.macro_system import fresh_symbol
 from venture.sivm.macro_system import getSym
 from venture.sivm.macro_system import register_macro
 from venture.sivm.pattern_language import SyntaxRule
@@ -154,7 +153,7 @@ def Assume_valuesExpand(exp):
   else:
     names = exp[1]
     name_vars = ["name_%d" % i for i in range(len(names))]
-    lst_name = "__lst_%d__" % random.randint(10000, 99999)
+    lst_name = fresh_symbol("__lst_%d__")
     pattern = ["assume_values", name_vars, "lst_exp"]
     name_exps = [["assume", name, ["deref", ["lookup", lst_name, v.integer(i)]]]
                  for (i, name) in enumerate(names)]
@@ -188,7 +187,7 @@ def DoExpand(exp):
           v.basic_val_of_type_content("symbol", statement[0]) == "let_values"):
       # Let_values statement
       n = len(statement[1])
-      lst_name = "__lst_%d__" % random.randint(10000, 99999)
+      lst_name = fresh_symbol("__lst_%d__")
       let_vars = ["var_%d" % i for i in range(n)]
       let_exps = [[var, ["deref", ["lookup", lst_name, v.integer(i)]]]
                    for (i, var) in enumerate(let_vars)]
@@ -48,6 +48,15 @@
 # Given that, macroexpansion proceeds simply by trying all known
 # macros in order, using the result of the first that produces
 # something -- see the top-level function `expand`.
+#
+# Expansion inspects the structure of an expression and its symbols,
+# but never the values of its other literals.  Consequently, all
+# expressions with the same shape and symbols expand the same way,
+# and `expand` caches the expansion of each shape as a template with
+# placeholders ("slots") in place of the literals -- see
+# `expand_cached`, which callers outside the macro system should use.
+
+import random
 
 from venture.exception import VentureException
 import venture.value.dicts as v
@@ -96,6 +105,16 @@ macros = []
 
 def register_macro(m):
   macros.append(m)
+  expansion_cache.clear()
+
+_fresh_symbols = [0] # Explicit box so expansions can tell if they made any
+
+def fresh_symbol(template):
+  """A symbol for a macro to bind a temporary with, hopefully distinct
+from any the user wrote.  Expansions that make one are not cached,
+since expanding the same expression again would choose another."""
+  _fresh_symbols[0] += 1
+  return template % random.randint(10000, 99999)
 
 def expand(exp):
   if v.is_basic_val_of_type("array", exp):
@@ -113,11 +132,170 @@ def _canonicalize(exp):
   else:
     return exp
 
+class ExpansionCache(object):
+  """The expansions of the expression shapes seen recently.
+
+  The shape of an expression is its list structure and symbols, with
+  every other literal abstracted to a numbered slot.  Each entry holds
+  the Syntax of the shape (whose index maps serve every expression of
+  that shape) and its desugared expression, with the slots still in
+  place.  Expanding a cached shape only fills its slots back in.
+
+  The cache is cleared when it grows to max_entries, or when a macro
+  is registered.
+  """
+  def __init__(self, max_entries=1000):
+    self.max_entries = max_entries
+    self.entries = {} # {shape: (Syntax, desugared template) or None}
+    self.hits = 0
+    self.misses = 0
+
+  def expand(self, exp):
+    slots = []
+    try:
+      key = _shape(exp, slots)
+      entry = self.entries.get(key, False)
+    except TypeError:
+      # Some leaf is not a recognizable, hashable expression
+      return expand(exp)
+    if entry is None:
+      # This shape is known not to be reusable
+      self.misses += 1
+      return expand(exp)
+    elif entry is False:
+      self.misses += 1
+      (entry, syntax) = self._expand_shape(exp, slots)
+      if len(self.entries) >= self.max_entries:
+        self.entries.clear()
+      self.entries[key] = entry
+      if entry is None:
+        return syntax
+    else:
+      self.hits += 1
+    (syntax, template) = entry
+    return FilledSyntax(syntax, template, slots)
+
+  def _expand_shape(self, exp, slots):
+    # Returns the entry to cache for exp's shape, and exp's Syntax
+    # (if the shape cannot be cached and exp was expanded already).
+    fresh = _fresh_symbols[0]
+    try:
+      syntax = expand(_template(exp))
+    except VentureException:
+      # The real expansion fails the same way, but may describe the
+      # expression in its message, which should not show the slots.
+      return (None, expand(exp))
+    template = syntax.desugared()
+    (reachable, present) = (_count_slots(template, False),
+                            _count_slots(template, True))
+    if reachable != present:
+      # Some slot ended up inside a literal, where filling would not
+      # find it.
+      return (None, expand(exp))
+    if _fresh_symbols[0] != fresh:
+      # Not reusable, but this one expansion is fine to fill in.
+      return (None, FilledSyntax(syntax, template, slots))
+    return ((syntax, template), None)
+
+  def clear(self):
+    self.entries.clear()
+
+expansion_cache = ExpansionCache()
+
+_LIST = object()
+_ARRAY = object()
+_UNICODE = object()
+
+def _shape(exp, slots):
+  """The hashable shape of exp, appending its abstracted literals to slots.
+
+Raises TypeError if exp contains anything that is not an expression."""
+  if isinstance(exp, list):
+    return (_LIST,) + tuple(_shape(e, slots) for e in exp)
+  elif isinstance(exp, str):
+    return exp
+  elif isinstance(exp, unicode):
+    return (_UNICODE, exp)
+  elif isinstance(exp, dict):
+    if exp.get('type') == 'symbol':
+      return tuple(sorted(exp.iteritems()))
+    elif exp.get('type') == 'array':
+      return (_ARRAY,) + tuple(_shape(e, slots) for e in exp['value'])
+    else:
+      slots.append(exp)
+      return None
+  else:
+    raise TypeError("Not an expression: %r" % (exp,))
+
+def _template(exp):
+  """Exp, with its abstracted literals replaced by numbered slots.
+
+Numbers slots in the same order as _shape collects the literals."""
+  counter = [0]
+  def recur(exp):
+    if isinstance(exp, list):
+      return [recur(e) for e in exp]
+    elif isinstance(exp, dict) and exp.get('type') == 'array':
+      return dict(exp, value=[recur(e) for e in exp['value']])
+    elif isinstance(exp, dict) and exp.get('type') != 'symbol':
+      counter[0] += 1
+      return {'type': 'literal_slot', 'value': counter[0] - 1}
+    else:
+      return exp
+  return recur(exp)
+
+def _is_slot(exp):
+  return isinstance(exp, dict) and exp.get('type') == 'literal_slot'
+
+def _fill(template, slots):
+  if isinstance(template, list):
+    return [_fill(t, slots) for t in template]
+  elif isinstance(template, dict):
+    if template.get('type') == 'literal_slot':
+      return slots[template['value']]
+    elif template.get('type') == 'array':
+      return dict(template, value=[_fill(t, slots) for t in template['value']])
+    else:
+      # Do not share the template's own dicts between expansions
+      return dict(template)
+  else:
+    return template
+
+def _count_slots(exp, everywhere):
+  """The number of slots in exp where _fill will find them, or anywhere
+in exp if everywhere is true."""
+  if _is_slot(exp):
+    return 1
+  elif isinstance(exp, (list, tuple)):
+    return sum(_count_slots(e, everywhere) for e in exp)
+  elif isinstance(exp, dict) and (everywhere or exp.get('type') == 'array'):
+    return sum(_count_slots(e, everywhere) for e in exp.itervalues())
+  else:
+    return 0
+
+class FilledSyntax(Syntax):
+  """The Syntax of an expression whose shape's expansion was cached."""
+  def __init__(self, syntax, template, slots):
+    self.syntax = syntax
+    self.template = template
+    self.slots = slots
+  def desugared(self):
+    return _fill(self.template, self.slots)
+  def desugar_index(self, index):
+    return self.syntax.desugar_index(index)
+  def resugar_index(self, index):
+    return self.syntax.resugar_index(index)
+
+def expand_cached(exp):
+  """Expand exp, reusing the expansion of any expression of the same
+shape expanded recently."""
+  return expansion_cache.expand(exp)
+
 def desugar_expression(exp):
-  return expand(exp).desugared()
+  return expand_cached(exp).desugared()
 
 def sugar_expression_index(exp, index):
-  return expand(exp).resugar_index(index)
+  return expand_cached(exp).resugar_index(index)
 
 def desugar_expression_index(exp, index):
-  return expand(exp).desugar_index(index)
+  return expand_cached(exp).desugar_index(index)
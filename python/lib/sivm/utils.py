@@ -97,6 +97,20 @@ def validate_value(ob):
                 expression_index=[])
     return ob
 
+def validate_values(obs):
+    if not isinstance(obs,(list,tuple)):
+        raise VentureException('parse',
+                'Invalid list of literal values.',
+                expression_index=[])
+    return [validate_value(ob) for ob in obs]
+
+def validate_value_lists(obss):
+    if not isinstance(obss,(list,tuple)):
+        raise VentureException('parse',
+                'Invalid list of lists of literal values.',
+                expression_index=[])
+    return [validate_values(obs) for obs in obss]
+
 def validate_positive_integer(num):
     if not isinstance(num,(float,int)) or num <= 0 or int(num) != num:
         raise VentureException('parse',
@@ -35,6 +35,7 @@ class VentureSivm(object):
 
     dicts = {
         'syntax_dict',
+        'bulk_extents',
     }
 
     # list of all instructions supported by venture sivm
@@ -45,6 +46,7 @@ class VentureSivm(object):
     }
     _core_instructions = {
         'assume',
+        'bulk_observe',
         'clear',
         'continuous_inference_status',
         'define',
@@ -53,6 +55,7 @@ class VentureSivm(object):
         'freeze',
         'infer',
         'labeled_assume',
+        'labeled_bulk_observe',
         'labeled_forget',
         'labeled_freeze',
         'labeled_observe',
@@ -110,15 +113,20 @@ class VentureSivm(object):
         # Maps directive ids to the Syntax objects that record their
         # macro expansion history
         self.syntax_dict = {}
+        # Maps the directive id of each bulk observe to the number of
+        # consecutive directive ids its trace families occupy
+        self.bulk_extents = {}
 
     @contextlib.contextmanager
     def cleared(self):
         syntax_dict = self.syntax_dict
+        bulk_extents = self.bulk_extents
         self._clear()
         try:
             yield
         finally:
             self.syntax_dict = syntax_dict
+            self.bulk_extents = bulk_extents
 
     ###############################
     # Serialization
@@ -131,14 +139,15 @@ class VentureSivm(object):
             extra[d] = getattr(self, d)
         return self.core_sivm.save_io(stream, extra)
 
-    def load_io(self, stream):
-        extra = self.core_sivm.load_io(stream)
+    def load_io(self, stream, particles=None):
+        extra = self.core_sivm.load_io(stream, particles=particles)
         for d in self.dicts:
-            setattr(self, d, extra[d])
+            # Saves from before bulk observes existed lack bulk_extents
+            setattr(self, d, extra.get(d, {}))
         return extra
 
     def save(self, fname, extra=None):
-        with open(fname, 'w') as fp:
+        with open(fname, 'wb') as fp:
             self.save_io(fp, extra=extra)
 
     def saves(self, extra=None):
@@ -146,12 +155,12 @@ class VentureSivm(object):
         self.save_io(ans, extra=extra)
         return ans.getvalue()
 
-    def load(self, fname):
-        with open(fname) as fp:
-            return self.load_io(fp)
+    def load(self, fname, particles=None):
+        with open(fname, 'rb') as fp:
+            return self.load_io(fp, particles=particles)
 
-    def loads(self, string):
-        return self.load_io(StringIO.StringIO(string))
+    def loads(self, string, particles=None):
+        return self.load_io(StringIO.StringIO(string), particles=particles)
 
     ###############################
     # Sugars/desugars
@@ -165,10 +174,12 @@ class VentureSivm(object):
         # desugar the expression
         if instruction_type in [
                 'assume',
+                'bulk_observe',
                 'define',
                 'evaluate',
                 'infer',
                 'labeled_assume',
+                'labeled_bulk_observe',
                 'labeled_observe',
                 'labeled_predict',
                 'observe',
@@ -177,7 +188,7 @@ class VentureSivm(object):
         ]:
             exp = utils.validate_arg(instruction,'expression',
                     utils.validate_expression, wrap_exception=False)
-            syntax = macro_system.expand(exp)
+            syntax = macro_system.expand_cached(exp)
             desugared_instruction['expression'] = syntax.desugared()
             # for error handling
             predicted_did = self._record_running_instruction(instruction, (exp, syntax))
@@ -205,7 +216,8 @@ class VentureSivm(object):
                 raise e, None, info[2]
             finally:
                 if instruction_type in ['define','assume','observe',
-                        'predict','predict_all','evaluate','infer']:
+                        'predict','predict_all','evaluate','infer',
+                        'bulk_observe','labeled_bulk_observe']:
                     # After annotation completes, clear the syntax
                     # dictionary, because the instruction was
                     # (presumably!) not recorded in the underlying
@@ -213,6 +225,7 @@ class VentureSivm(object):
                     # should not list it)
                     if predicted_did in self.syntax_dict:
                         del self.syntax_dict[predicted_did]
+                    self.bulk_extents.pop(predicted_did, None)
             raise e, None, info[2]
         self._register_executed_instruction(instruction, predicted_did,
             forgotten_did, response)
@@ -239,6 +252,16 @@ class VentureSivm(object):
 
         did = self.core_sivm.engine.predictNextDirectiveId()
         assert did not in self.syntax_dict
+        if instruction_type in ['bulk_observe', 'labeled_bulk_observe']:
+            # All the data share the one syntax record, stored under
+            # the first of the directive ids the families occupy.
+            vals = utils.validate_arg(instruction, 'values',
+                utils.validate_values)
+            args = utils.validate_arg(instruction, 'arguments',
+                utils.validate_value_lists, required=False)
+            if args is not None:
+                record = self._hack_bulk_expression_structure(args, *record)
+            self.bulk_extents[did] = max(len(vals), 1)
         self.syntax_dict[did] = record
         return did
 
@@ -251,6 +274,17 @@ class VentureSivm(object):
         hacked_syntax = macro.ListSyntax([macro.LiteralSyntax(symbol), syntax])
         return (hacked_exp, hacked_syntax)
 
+    def _hack_bulk_expression_structure(self, args, exp, syntax):
+        # Each datum of a bulk observe with arguments evaluates an
+        # application of the expression to its quoted arguments.  The
+        # first datum's arguments stand in for all of them, which
+        # aligns the indexes if not the quoted values.
+        quoted = [v.quote(arg) for arg in args[0]] if args else []
+        hacked_exp = [exp] + quoted
+        hacked_syntax = macro.ListSyntax(
+            [syntax] + [macro.LiteralSyntax(q) for q in quoted])
+        return (hacked_exp, hacked_syntax)
+
     def _annotate(self, e, instruction):
         if e.exception == "evaluation":
             address = e.data['address'].asList()
@@ -269,7 +303,17 @@ class VentureSivm(object):
                 if frame is not None]
 
     def _get_syntax_record(self, did):
-        return self.syntax_dict[did]
+        return self.syntax_dict[self._owning_did(did)]
+
+    def _owning_did(self, did):
+        # The families of a bulk observe occupy a run of directive
+        # ids, of which only the first names a directive.
+        if did in self.syntax_dict:
+            return did
+        for (base, extent) in self.bulk_extents.iteritems():
+            if base <= did < base + extent:
+                return base
+        return did
 
     def _get_exp(self, did):
         return self._get_syntax_record(did)[0]
@@ -291,6 +335,7 @@ class VentureSivm(object):
             # not routed through here but can appear in stack traces.
             print "Warning: skipping annotating did %s, assumed to be synthesized by in_model" % did
             return None
+        did = self._owning_did(did)
         exp, syntax = self._get_syntax_record(did)
         index = index[1:]
 
@@ -329,6 +374,7 @@ class VentureSivm(object):
             self._clear()
         # forget directive mappings on the "forget" command
         if forgotten_did is not None:
+            self.bulk_extents.pop(forgotten_did, None)
             if forgotten_did in self.syntax_dict:
                 del self.syntax_dict[forgotten_did]
             else:
@@ -410,6 +456,13 @@ class VentureSivm(object):
             ans = { 'instruction' : 'predict',
                     'expression' : directive[1]
                 }
+        elif directive[0] == 'bulk_observe':
+            ans = { 'instruction' : 'bulk_observe',
+                    'expression' : directive[1],
+                    'values' : directive[2]
+                }
+            if directive[3] is not None:
+                ans['arguments'] = directive[3]
         else:
             assert directive[0] == 'observe'
             ans = { 'instruction' : 'observe',
@@ -431,7 +484,8 @@ class VentureSivm(object):
             dids = self.core_sivm.engine.model.traces.at_distinguished('dids')
             candidates = [self._get_directive(did) for did in sorted(dids)]
             return [c for c in candidates
-                    if c['instruction'] in ['assume', 'observe', 'predict', 'predict_all']]
+                    if c['instruction'] in ['assume', 'observe', 'predict',
+                                            'predict_all', 'bulk_observe']]
 
     def labeled_get_directive(self, label):
         label = utils.validate_symbol(label)
@@ -456,3 +456,35 @@ def test_linear_gradient_2d(seed):
   ripl.observe('(normal baz 1)', -7)
   ripl.infer('(grad_ascent default one 0.1 10 10)')
   ripl.sample('(gp (array (array 2 3) (array 5 7)))')
+
+@in_backend('none')
+@on_inf_prim('none') # Gets run in the misc build
+def testIncrementalFactor():
+  # The Cholesky factor maintained across incorporate and
+  # unincorporate should agree with refactoring from scratch.
+  mean = gp.mean_const(0.3)
+  covariance = cov.scale(2.1**2, cov.se(1.8**2))
+  aux = gp.GPSPAux(OrderedDict())
+  for (x, o) in zip([1.3, -2.0, 0.0, 4.1, 2.2], [5.0, 2.3, 8.0, -1.0, 0.5]):
+    aux.incorporate(mean, covariance, x, o)
+  aux.unincorporate(mean, covariance, 0.0)
+  aux.incorporate(mean, covariance, -0.7, 1.5)
+  aux.unincorporate(mean, covariance, 1.3)
+  factor = aux.cached_factor
+  assert factor is not None
+  assert factor is aux.factor(mean, covariance)
+  eq_(factor.keys, aux.samples.keys())
+  fresh = gp.GPFactor.compute(mean, covariance, aux.samples)
+  np.testing.assert_allclose(factor.L, fresh.L)
+  np.testing.assert_allclose(
+    gp._gp_logDensityOfData(mean, covariance, aux.samples, factor),
+    gp._gp_logDensityOfData(mean, covariance, aux.samples))
+  test_inputs = np.array([1.4, -3.2])
+  (mu, sigma) = gp._gp_mvnormal(mean, covariance, aux.samples, test_inputs,
+                                factor)
+  (mu_, sigma_) = gp._gp_mvnormal(mean, covariance, aux.samples, test_inputs)
+  np.testing.assert_allclose(mu, mu_)
+  np.testing.assert_allclose(sigma, sigma_, atol=1e-12)
+  # Changing the covariance function invalidates the factor.
+  covariance2 = cov.scale(1.5**2, cov.se(1.8**2))
+  assert aux.factor(mean, covariance2) is not factor
@@ -404,3 +404,31 @@ def pablo(nparticles):
   r.observe("get_datapoint(10)",vd.list([vd.real(8.77103714879),vd.real(9.60268348563)]))
   r.infer("resample(%d)" % (nparticles,))
   return r
+
+@gen_on_inf_prim("none") # Doesn't exercise any statistical properties
+def testParallelParticlesDeterminism():
+  # Regenerating the particles of gibbs and func_pgibbs in worker
+  # processes gives the same answer as regenerating them serially.
+  mixture = """(do
+    (assume z (tag 'z 0 (flip 0.3)))
+    (assume x (if z (normal 0 1) (normal 5 1)))
+    (observe (normal x 1) 2)
+    %s
+    (sample (list z x)))"""
+  chain = """(do
+    (assume x1 (tag 'h 0 (normal 0 1)))
+    (assume x2 (tag 'h 1 (normal x1 1)))
+    (assume x3 (tag 'h 2 (normal x2 1)))
+    (observe (normal x3 1) 2)
+    %s
+    (sample (list x1 x2 x3)))"""
+  for prog in [mixture % "(gibbs 'z 'one 5 %s)",
+               mixture % "(emap 'z 'one 2 %s)",
+               mixture % "(func_pgibbs 'z 'one 3 5 %s)",
+               chain % "(func_pgibbs 'h 'ordered 3 5 %s)",
+               chain % "(func_pmap 'h 'ordered 3 2 %s)"]:
+    yield checkParallelParticlesDeterminism, prog
+
+def checkParallelParticlesDeterminism(prog):
+  eq_(get_ripl(seed=1).evaluate(prog % "false"),
+      get_ripl(seed=1).evaluate(prog % "true"))
@@ -0,0 +1,109 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+from nose.tools import assert_equal
+from nose.tools import eq_
+from nose.tools import assert_greater
+
+from venture.test.config import broken_in
+from venture.test.config import gen_broken_in
+from venture.test.config import gen_on_inf_prim
+from venture.test.config import get_ripl
+from venture.test.config import on_inf_prim
+
+many_blocks = ("(list (f 0) (f 1) (f 2) (f 3))", """
+[assume f (mem (lambda (i) (tag 'x i (normal 0 1))))]
+[observe (normal (f 0) 1) 1]
+[observe (normal (f 1) 1) 2]
+[observe (normal (f 2) 1) 3]
+[observe (normal (f 3) 1) 4]
+""")
+
+varying_structure = ("(list tricky weight)", """
+[assume tricky (tag 'x 0 (flip 0.5))]
+[assume weight (tag 'x 1 (if tricky (beta 1 1) (uniform_continuous 0 1)))]
+[assume coin (lambda () (flip weight))]
+[observe (coin) true]
+[observe (coin) true]
+""")
+
+brush_elsewhere = ("(list (f 0) (f 1) (f 2) (f 3))", many_blocks[1] + """
+[assume b (if (flip 0.5) (normal 0 1) (gamma 1 1))]
+""")
+
+def run((_, program), infer, caching, seed=1):
+  ripl = get_ripl(seed=seed)
+  ripl.execute_program(program)
+  ripl.sivm.core_sivm.engine.set_extent_caching(caching)
+  ripl.infer(infer)
+  return ripl
+
+def extent_stats(ripl):
+  stats = ripl.cache_stats()
+  [row] = stats[stats.cache == "extent"].to_dict('records')
+  return row
+
+@gen_broken_in("puma", "Puma does not cache extents.")
+@gen_on_inf_prim("mh")
+def testExtentCacheAgrees():
+  for program in [many_blocks, varying_structure, brush_elsewhere]:
+    for infer in ["(mh 'x one 30)", "(mh 'x all 10)", "(mh 'x 1 10)",
+                  "(repeat 10 (do (mh default one 1) (mh 'x one 3)))"]:
+      yield checkExtentCacheAgrees, program, infer
+
+def checkExtentCacheAgrees(program, infer):
+  # Reusing extents must not change the course of inference.
+  plain = run(program, infer, False)
+  cached = run(program, infer, True)
+  (query, _) = program
+  assert_equal(plain.sample_all(query), cached.sample_all(query))
+
+@broken_in("puma", "Puma does not cache extents.")
+@on_inf_prim("mh")
+def testExtentCacheHits():
+  stats = extent_stats(run(many_blocks, "(mh 'x one 30)", True))
+  # Four blocks, so at most four misses.
+  assert stats["misses"] <= 4
+  assert_greater(stats["hits"], 20)
+  assert_equal(0, stats["invalidations"])
+
+@broken_in("puma", "Puma does not cache extents.")
+@on_inf_prim("mh")
+def testExtentCacheSurvivesBrushElsewhere():
+  # Regenerating b's brush does not touch any block of scope x.
+  ripl = run(brush_elsewhere,
+             "(repeat 20 (do (mh default all 1) (mh 'x one 2)))", True)
+  stats = extent_stats(ripl)
+  assert stats["misses"] <= 4
+  assert_greater(stats["hits"], 30)
+
+@broken_in("puma", "Puma does not cache extents.")
+@on_inf_prim("mh")
+def testExtentCacheMisses():
+  # Flipping tricky replaces the beta with a uniform or back, so
+  # block 1's extent must be walked again.
+  ripl = run(varying_structure, "(mh 'x one 30)", True)
+  assert_greater(extent_stats(ripl)["misses"], 2)
+  ripl.observe("(coin)", True, label="extra")
+  ripl.forget("extra")
+  assert_equal(1, extent_stats(ripl)["invalidations"])
+
+@broken_in("puma", "Puma does not cache extents.")
+@on_inf_prim("none")
+def testExtentCacheOptIn():
+  ripl = run(many_blocks, "(mh 'x one 3)", False)
+  eq_(0, len(ripl.cache_stats()))
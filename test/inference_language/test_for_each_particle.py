@@ -18,6 +18,8 @@
 from nose.tools import assert_raises
 from nose.tools import eq_
 
+from venture.exception import VentureException
+from venture.lite.sp_help import deterministic_typed
 from venture.test.config import broken_in
 from venture.test.config import default_num_samples
 from venture.test.config import default_num_transitions_per_sample
@@ -27,6 +29,7 @@ from venture.test.config import on_inf_prim
 from venture.test.stats import reportKnownGaussian
 from venture.test.stats import reportPassage
 from venture.test.stats import statisticalTest
+import venture.lite.types as t
 
 @on_inf_prim("for_each_particle")
 def testForEachParticleSmoke():
@@ -109,3 +112,58 @@ def testHitsOneParticle():
     (on_particle 0 (force x 0))
     (on_particle 1 (force x 1)))""")
   eq_([0, 1], ripl.sample_all("x"))
+
+@gen_on_inf_prim("for_each_particle")
+def testForEachParticleRunsInWorkers():
+  for mode in ["_serializing", "_thread_ser", "_multiprocess"]:
+    for persistent in [True, False]:
+      yield checkForEachParticleRunsInWorkers, mode, persistent
+
+def checkForEachParticleRunsInWorkers(mode, persistent):
+  ripl = get_ripl(persistent_inference_trace=persistent)
+  ripl.assume("x", "(normal 0 1)")
+  ripl.infer("(resample%s 3)" % mode)
+  model = ripl.sivm.core_sivm.engine.model
+  pool = model.traces
+  eq_([5, 5, 5], ripl.infer("""
+(for_each_particle
+  (do (force x 5)
+      (set_particle_log_weights (array 2))
+      (sample x)))"""))
+  eq_(7, ripl.infer("""
+(on_particle 1
+  (do (increment_particle_log_weights (array 1))
+      (return 7)))"""))
+  # The particles did not come back to be run here.
+  assert model.traces is pool
+  eq_([5, 5, 5], ripl.sample_all("x"))
+  eq_([2, 3, 2], ripl.infer("(particle_log_weights)"))
+
+@on_inf_prim("for_each_particle")
+def testForEachParticleUnshippable():
+  # An inference SP that cannot be pickled keeps the particles here.
+  ripl = get_ripl()
+  ripl.bind_foreign_inference_sp("inc", deterministic_typed(
+    lambda x: x + 1, [t.NumberType()], t.NumberType()))
+  ripl.infer("(resample_serializing 2)")
+  model = ripl.sivm.core_sivm.engine.model
+  pool = model.traces
+  eq_([2, 2], ripl.infer("(for_each_particle (return (inc 1)))"))
+  assert model.traces is not pool
+
+@gen_on_inf_prim("for_each_particle")
+def testForEachParticleActionError():
+  for mode in ["_serializing", "_thread_ser", "_multiprocess"]:
+    yield checkForEachParticleActionError, mode
+
+def checkForEachParticleActionError(mode):
+  # An error in a shipped action comes back from the workers, rather
+  # than leaving the master waiting for them.
+  ripl = get_ripl()
+  ripl.infer("(resample%s 2)" % mode)
+  ripl.assume("x", "(normal 0 1)")
+  with assert_raises(VentureException) as cm:
+    ripl.infer("(for_each_particle (sample (+ x undefined_sym)))")
+  assert "Cannot find symbol 'undefined_sym'" in str(cm.exception)
+  # The workers survive it.
+  eq_([2, 2], ripl.infer("(for_each_particle (return 2))"))
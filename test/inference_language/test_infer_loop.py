@@ -120,3 +120,26 @@ def testCrashStopsInferLoop():
   finally:
     ripl.stop_continuous_inference() # Don't want to leave active threads lying around
   eq_(1, ripl.infer('(pyeval "v.VentureNumber(loop_thread_start_count)")'))
+
+@on_inf_prim("loop")
+def testCompiledInferLoop():
+  ripl = get_ripl()
+  ripl.assume("x", "(normal 0 1)", label="foo")
+  engine = ripl.sivm.core_sivm.engine
+  engine.set_compiled_continuous_inference(batch_size=5)
+  assertNotInferring(ripl)
+  try:
+    ripl.infer("(loop (mh default one 1))")
+    assertInferring(ripl)
+    # Programs given directly are desugared too.
+    ripl.start_continuous_inference(
+      "(do (forget 'foo) (assume x (normal 0 1) foo))")
+    assertInferring(ripl)
+    time.sleep(0.01)
+    status = ripl.continuous_inference_status()
+    eq_(True, status['running'])
+    assert status['transitions'] > 0
+    assert status['throughput'] > 0
+  finally:
+    ripl.stop_continuous_inference() # Don't want to leave active threads lying around
+  assertNotInferring(ripl)
@@ -19,6 +19,7 @@ import threading
 
 from nose.tools import eq_
 from nose import SkipTest
+import numpy as np
 
 from venture.test.config import default_num_samples
 from venture.test.config import gen_on_inf_prim
@@ -26,6 +27,7 @@ from venture.test.config import get_ripl
 from venture.test.config import on_inf_prim
 from venture.test.stats import reportKnownGaussian
 from venture.test.stats import statisticalTest
+import venture.value.dicts as v
 
 @gen_on_inf_prim("resample")
 def testSynchronousIsSerial():
@@ -88,3 +90,69 @@ def testSerializingTracesWithRandomSPs():
   r.infer("(resample_serializing 2)")
   r.assume("foo", "(categorical (simplex 0.5 0.5) (array (lambda () 1) (lambda () 2)))")
   r.infer("(resample_serializing 2)")
+
+@gen_on_inf_prim("resample")
+def testResamplingKeepsPool():
+  for mode in ["", "_serializing", "_threaded", "_thread_ser", "_multiprocess"]:
+    yield checkResamplingKeepsPool, mode
+
+def checkResamplingKeepsPool(mode):
+  # Resampling to the same number of particles in the same mode
+  # should reuse the worker pool, and still leave every particle
+  # usable.
+  r = get_ripl()
+  r.assume("x", "(normal 0 1)")
+  r.infer("(resample%s 4)" % mode)
+  pool = r.sivm.core_sivm.engine.model.traces
+  r.observe("(normal x 1)", 2)
+  r.infer("(resample%s 4)" % mode)
+  assert pool is r.sivm.core_sivm.engine.model.traces
+  eq_(4, len(r.sample_all("x")))
+  r.infer("(mh default one 2)")
+  eq_(4, len(r.sample_all("x")))
+
+@on_inf_prim("resample")
+def testMultiprocessSharesData():
+  # Large constant arrays reach the workers by handle, and survive
+  # traces being shipped back and forth.
+  r = get_ripl()
+  data = np.arange(20000, dtype=float)
+  r.infer("(resample_multiprocess 3)")
+  r.assume("data", v.vector(data))
+  r.assume("x", "(normal 0 1)")
+  r.infer("(resample_multiprocess 3)")
+  r.infer("(resample_multiprocess 5 2)")
+  eq_([data.sum()] * 5, r.sample_all("(sum data)"))
+  assert r.sivm.core_sivm.engine.model.shared_arrays.shared
+
+@on_inf_prim("resample")
+def testRebalancingKeepsParticles():
+  # However the particles move between workers, each keeps its index.
+  r = get_ripl()
+  r.assume("x", "(normal 0 1)")
+  r.assume("y", "(tag 'y 0 (normal 0 1))")
+  r.infer("(resample_multiprocess 6 2)")
+  engine = r.sivm.core_sivm.engine
+  engine.set_load_balancing()
+  xs = r.sample_all("x")
+  for _ in range(3):
+    r.infer("(mh 'y one 2)")
+    eq_(xs, r.sample_all("x"))
+    engine.model.traces.rebalance(1, gain=-1)
+    eq_(xs, r.sample_all("x"))
+  eq_(6, len(engine.particle_timings()))
+
+@on_inf_prim("resample")
+def testMultiprocessSaveKeepsData():
+  # A saved model holds its shared arrays' contents, not handles to
+  # files that go away with the trace pool.
+  r = get_ripl()
+  data = np.arange(20000, dtype=float)
+  r.infer("(resample_multiprocess 2)")
+  r.assume("data", v.vector(data))
+  saved = r.saves()
+  assert len(saved) > data.nbytes
+  r.sivm.core_sivm.engine.model.shared_arrays.close()
+  r2 = get_ripl()
+  r2.loads(saved)
+  eq_([data.sum()] * 2, r2.sample_all("(sum data)"))
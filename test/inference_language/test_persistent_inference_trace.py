@@ -218,3 +218,20 @@ def testDirectivesFreezableFromInference():
   ripl.infer(30)
   assert xval != ripl.sample("x")
   eq_(yval, ripl.sample("y"))
+
+@on_inf_prim("none")
+def testTransientInferenceTraceTemplate():
+  # Without a persistent inference trace, every run gets a clone of a
+  # template with the prelude installed, built only once.
+  ripl = get_ripl(persistent_inference_trace=False)
+  engine = ripl.sivm.core_sivm.engine
+  eq_(None, ripl.inference_startup_time())
+  ripl.assume("x", "(normal 0 1)")
+  eq_([1, 2], ripl.infer("(sequence (list (return 1) (return 2)))"))
+  template = engine.inference_trace_template
+  startup = ripl.inference_startup_time()
+  assert startup > 0
+  ripl.infer("(repeat 3 (mh default one 1))")
+  assert engine.inference_trace_template is template
+  eq_(startup, ripl.inference_startup_time())
+  eq_([2, 1], ripl.infer("(sequence (list (return 2) (return 1)))"))
@@ -0,0 +1,119 @@
+# Copyright (c) 2014, 2015 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+from nose.tools import assert_equal
+from nose.tools import assert_greater
+
+from venture.test.config import broken_in
+from venture.test.config import gen_broken_in
+from venture.test.config import gen_on_inf_prim
+from venture.test.config import get_ripl
+from venture.test.config import on_inf_prim
+
+fixed_structure = ("(list mu sigma)", """
+[assume mu (normal 0 1)]
+[assume sigma (tag 'sigma 0 (gamma 1 1))]
+[assume x (lambda () (normal mu sigma))]
+[observe (x) 1]
+[observe (x) 2]
+""")
+
+varying_structure = ("(list tricky weight)", """
+[assume tricky (tag 'tricky 0 (flip 0.5))]
+[assume weight (if tricky (beta 1 1) 0.5)]
+[assume coin (lambda () (flip weight))]
+[observe (coin) true]
+[observe (coin) true]
+""")
+
+def run((_, program), infer, caching, seed=1):
+  ripl = get_ripl(seed=seed)
+  ripl.execute_program(program)
+  engine = ripl.sivm.core_sivm.engine
+  engine.set_scaffold_caching(caching)
+  ripl.infer(infer)
+  trace = engine.getDistinguishedTrace()
+  return (ripl, trace.scaffold_cache)
+
+@gen_broken_in("puma", "Puma does not cache scaffolds.")
+@gen_on_inf_prim("mh")
+def testScaffoldCacheAgrees():
+  for program in [fixed_structure, varying_structure]:
+    for infer in ["(mh default one 30)", "(mh default all 10)",
+                  "(mh 'sigma one 10)", "(mh 'tricky 0 10)"]:
+      yield checkScaffoldCacheAgrees, program, infer
+
+def checkScaffoldCacheAgrees(program, infer):
+  # Reusing scaffolds must not change the course of inference.
+  (plain, _) = run(program, infer, False)
+  (cached, _) = run(program, infer, True)
+  (query, _) = program
+  assert_equal(plain.sample_all(query), cached.sample_all(query))
+
+@broken_in("puma", "Puma does not cache scaffolds.")
+@on_inf_prim("mh")
+def testScaffoldCacheHits():
+  (_, cache) = run(fixed_structure, "(mh default one 30)", True)
+  # Two random choices, so at most two misses.
+  assert cache.misses <= 2
+  assert_equal(30, cache.hits + cache.misses)
+  assert_equal(0, cache.invalidations)
+
+@broken_in("puma", "Puma does not cache scaffolds.")
+@on_inf_prim("mh")
+def testScaffoldCacheInvalidation():
+  # Flipping tricky creates or destroys the beta, so revisiting
+  # tricky's block must not hit.
+  (ripl, cache) = run(varying_structure, "(mh 'tricky 0 30)", True)
+  assert_greater(cache.invalidations, 0)
+  assert_equal(30, cache.hits + cache.misses)
+  cache.invalidate()
+  assert_equal({}, cache.entries)
+  misses = cache.misses
+  ripl.infer("(mh 'tricky 0 1)")
+  assert_equal(misses + 1, cache.misses)
+
+@broken_in("puma", "Puma does not cache scaffolds.")
+@on_inf_prim("mh")
+def testScaffoldCacheProfiled():
+  ripl = get_ripl(seed=1)
+  ripl.execute_program(fixed_structure[1])
+  ripl.sivm.core_sivm.engine.set_scaffold_caching()
+  ripl.profiler_enable()
+  ripl.infer("(mh default one 10)")
+  cached = [row["cached"] for row in ripl.sivm.core_sivm.engine.profile_data()]
+  assert_equal(10, len(cached))
+  assert_greater(sum(cached), 0)
+
+@broken_in("puma", "Puma does not cache scaffolds.")
+@on_inf_prim("mh")
+def testScaffoldCacheStats():
+  ripl = get_ripl(seed=1)
+  ripl.execute_program(fixed_structure[1])
+  ripl.sivm.core_sivm.engine.set_scaffold_caching()
+  ripl.profiler_enable(summary=True)
+  ripl.infer("(mh default one 30)")
+  [summary] = ripl.profile_data(summary=True).to_dict('records')
+  assert_equal(30, summary["scaffold_cache_hits"] +
+               summary["scaffold_cache_misses"])
+  assert summary["scaffold_cache_misses"] <= 2
+  stats = ripl.cache_stats()
+  [scaffold] = stats[stats.cache == "scaffold"].to_dict('records')
+  assert_equal(0, scaffold["particle"])
+  assert_equal(summary["scaffold_cache_hits"], scaffold["hits"])
+  assert_equal(summary["scaffold_cache_misses"], scaffold["misses"])
+  assert_equal(0, scaffold["invalidations"])
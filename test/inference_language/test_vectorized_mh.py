@@ -0,0 +1,119 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+import math
+
+from nose.tools import assert_equal
+
+from venture.test.config import broken_in
+from venture.test.config import default_num_samples
+from venture.test.config import default_num_transitions_per_sample
+from venture.test.config import get_ripl
+from venture.test.config import on_inf_prim
+from venture.test.stats import reportKnownDiscrete
+from venture.test.stats import reportKnownGaussian
+from venture.test.stats import reportSameDiscrete
+from venture.test.stats import statisticalTest
+
+def vectorized_ripl(seed, particles, program):
+  ripl = get_ripl(seed=seed)
+  ripl.infer("(resample %d)" % particles)
+  ripl.execute_program(program)
+  ripl.sivm.core_sivm.engine.set_vectorized_particles()
+  return ripl
+
+@statisticalTest
+@broken_in("puma", "Puma does not vectorize particles.")
+@on_inf_prim("mh")
+def testVectorizedMHNormal(seed):
+  # Posterior for mu is normal with mean 1, precision 3; every
+  # proposal is vectorizable.
+  ripl = vectorized_ripl(seed, default_num_samples(), """
+[assume mu (normal 0 1)]
+[assume sigma (tag 'sigma 0 (uniform_continuous 0.99 1.01))]
+[assume x (lambda () (normal mu sigma))]
+[observe (x) 1]
+[observe (x) 2]
+""")
+  ripl.infer("(mh default one %d)" % default_num_transitions_per_sample())
+  return reportKnownGaussian(1, math.sqrt(1/3.), ripl.sample_all("mu"))
+
+@statisticalTest
+@broken_in("puma", "Puma does not vectorize particles.")
+@on_inf_prim("mh")
+def testVectorizedMHFallback(seed):
+  # The choices feeding flips fall back to per-trace mh, and the
+  # particles where tricky is true have a different structure from
+  # those where it is false.  P(tricky | data) = 4/7.
+  ripl = vectorized_ripl(seed, default_num_samples(), """
+[assume tricky (tag 'tricky 0 (flip 0.5))]
+[assume weight (if tricky (beta 1 1) 0.5)]
+[assume coin (lambda () (flip weight))]
+[assume mu (normal 0 1)]
+[observe (coin) true]
+[observe (coin) true]
+[observe (normal mu 1) 1]
+""")
+  ripl.infer("(mh default one %d)" % default_num_transitions_per_sample())
+  return reportKnownDiscrete([[True, 4], [False, 3]],
+                             ripl.sample_all("tricky"))
+
+@statisticalTest
+@broken_in("puma", "Puma does not vectorize particles.")
+@on_inf_prim("mh")
+def testVectorizedMHBlockChoice(seed):
+  # Whether the blocks vectorize depends on the state: the beta and
+  # the extra flips exist only when tricky is true, and only the mus
+  # vectorize.  Each particle must still choose its block as plain mh
+  # does, or tricky is chosen too often when true.
+  program = """
+[assume tricky (tag 'tricky 0 (flip 0.5))]
+[assume weight (if tricky (beta 1 1) 0.5)]
+[assume coin (lambda () (flip weight))]
+[assume extras (if tricky (array (flip 0.5) (flip 0.5) (flip 0.5)) (array))]
+""" + "".join("[assume mu%d (normal 0 1)]\n" % i for i in range(6)) + """
+[observe (coin) true]
+[observe (coin) true]
+"""
+  n = default_num_samples()
+  infer = "(mh default one %d)" % default_num_transitions_per_sample()
+  plain = get_ripl(seed=seed)
+  plain.infer("(resample %d)" % n)
+  plain.execute_program(program)
+  plain.infer(infer)
+  vectorized = vectorized_ripl(seed + 1, n, program)
+  vectorized.infer(infer)
+  return reportSameDiscrete(plain.sample_all("tricky"),
+                            vectorized.sample_all("tricky"))
+
+@broken_in("puma", "Puma does not vectorize particles.")
+@on_inf_prim("mh")
+def testVectorizedMHTouchedNodes():
+  # Vectorizing must not change the reported number of nodes touched.
+  program = """
+[assume mu (normal 0 1)]
+[assume sigma (tag 'sigma 0 (gamma 1 1))]
+[assume x (lambda () (normal mu sigma))]
+[observe (x) 1]
+[observe (x) 2]
+"""
+  plain = get_ripl(seed=1)
+  plain.infer("(resample 3)")
+  plain.execute_program(program)
+  vectorized = vectorized_ripl(1, 3, program)
+  for infer in ["(mh default all 4)", "(mh 'sigma one 4)"]:
+    assert_equal(plain.infer(infer), vectorized.infer(infer))
@@ -0,0 +1,87 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark particle overlays: OverlayMap against address-keyed wttrees.
+
+Replays the access pattern of a particle Gibbs sweep over the random
+choices of a Lite HMM trace -- per step, fork every particle's overlay,
+write one value per particle, and read back every value written so
+far -- against both the OverlayMap the Lite Particle uses and the
+weight-balanced PMap keyed by node address that it used to use.
+
+Run with
+
+  python test/performance/bench_particle_overlay.py [steps ...]
+"""
+
+import sys
+import time
+
+from venture.lite.overlay import OverlayMap
+from venture.lite.wttree import PMap
+from venture.shortcuts import make_lite_church_prime_ripl
+
+def hmm_nodes(steps):
+  ripl = make_lite_church_prime_ripl(seed=1)
+  ripl.assume('f', '''
+(mem (lambda (i)
+  (if (= i 0)
+    (normal 0 1)
+    (normal (f (- i 1)) 1))))''')
+  for i in range(steps):
+    ripl.observe('(normal (f %d) 1)' % i, 0.5)
+  trace = ripl.sivm.core_sivm.engine.getDistinguishedTrace().trace
+  return list(trace.rcs)
+
+def node_key(node):
+  return (node.address, str(type(node)))
+
+class WtOverlay(object):
+  """The previous particle overlay, for comparison."""
+  def __init__(self, pmap=None):
+    self.pmap = pmap if pmap is not None else PMap(node_key)
+  def fork(self):
+    return WtOverlay(self.pmap)
+  def __setitem__(self, node, value):
+    self.pmap = self.pmap.insert(node, value)
+  def lookup(self, node):
+    return self.pmap.lookup(node)
+
+def sweep(make_overlay, nodes, num_particles):
+  particles = [make_overlay() for _ in range(num_particles)]
+  start = time.time()
+  for (t, node) in enumerate(nodes):
+    particles = [p.fork() for p in particles]
+    for (i, p) in enumerate(particles):
+      p[node] = (t, i)
+    for p in particles:
+      for n in nodes[:t+1]:
+        p.lookup(n)
+  return time.time() - start
+
+def main(args):
+  steps = [int(a) for a in args] or [25, 50, 100, 200]
+  print '%8s %8s %12s %12s %8s' % ('steps', 'nodes', 'wttree (s)',
+                                   'overlay (s)', 'speedup')
+  for n in steps:
+    nodes = hmm_nodes(n)
+    wt = sweep(WtOverlay, nodes, 10)
+    ov = sweep(OverlayMap, nodes, 10)
+    print '%8d %8d %12.4f %12.4f %8.1f' % (n, len(nodes), wt, ov, wt / ov)
+
+if __name__ == '__main__':
+  main(sys.argv[1:])
@@ -15,8 +15,10 @@
 # You should have received a copy of the GNU General Public License
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
+from nose.tools import assert_raises
 from scipy import stats
 
+from venture.exception import VentureException
 from venture.exception import underline
 from venture.lite import types as t
 from venture.lite.psp import LikelihoodFreePSP
@@ -71,3 +73,52 @@ def test_profiling_likelihoodfree():
   [INFER (mh default one 10)]'''
   ripl.profiler_enable()
   ripl.execute_program(prog)
+
+@broken_in('puma', "Profiler only implemented for Lite")
+@on_inf_prim("none") # Does not test inference quality of anything
+def test_profiling_summary():
+  ripl = get_ripl()
+
+  ripl.execute_program("""
+    [assume tricky (tag (quote tricky) 0 (flip 0.5))]
+    [assume weight (if tricky (uniform_continuous 0 1) 0.5)]
+    [assume coin (lambda () (flip weight))]
+    [observe (coin) true]
+    [observe (coin) true]
+    [observe (coin) true]
+  """)
+
+  ripl.profiler_enable(summary=True, sample_every=5)
+  ripl.infer('(mh default one 10)')
+  ripl.infer("(gibbs 'tricky one 1)")
+  ripl.profiler_disable()
+  ripl.infer('(mh default one 10)')
+
+  # Only every fifth proposal is recorded in full
+  assert len(ripl.profile_data()) == 3
+
+  summary = ripl.profile_data(summary=True)
+  assert len(summary) == 2
+  assert list(summary.proposals) == [10, 1]
+  assert list(summary.scope) == ['default', 'tricky']
+  assert all(0 <= rate <= 1 for rate in summary.acceptance_rate)
+  assert all(summary.detach_time + summary.regen_time <= summary.time)
+  assert all(summary.principal == 1)
+
+  dataset = ripl.infer('(profile_summary)')
+  assert list(dataset.asPandas().proposals) == [10, 1]
+
+@broken_in('lite', "Tests that Puma refuses the summary profiler")
+@on_inf_prim("none") # Does not test inference quality of anything
+def test_profiling_summary_puma():
+  ripl = get_ripl()
+  ripl.assume("x", "(normal 0 1)")
+  with assert_raises(VentureException):
+    ripl.profiler_enable(summary=True, sample_every=5)
+  ripl.profiler_enable()
+  ripl.infer('(mh default one 10)')
+  ripl.profiler_disable()
+  with assert_raises(VentureException):
+    ripl.profile_data(summary=True)
+  with assert_raises(VentureException):
+    ripl.infer('(profile_summary)')
@@ -15,11 +15,14 @@
 # You should have received a copy of the GNU General Public License
 # along with Venture.  If not, see <http://www.gnu.org/licenses/>.
 
+import cPickle as pickle
+import cStringIO as StringIO
 import tempfile
 
 from nose import SkipTest
 from nose.tools import eq_
 
+import venture.engine.snapshot as snapshot
 from venture.lite import builtin
 from venture.test.config import collectStateSequence
 from venture.test.config import default_num_transitions_per_sample
@@ -312,3 +315,41 @@ def check_foreign_sp(mode):
     # Make sure that the restored trace still has the foreign SP's
     eq_(v.sample('(test_binomial 1 1)'), test_binomial_result)
     eq_(v.sample('(test_sym_dir_cat 1 1)'), test_sym_dir_result)
+
+@on_inf_prim("none")
+def test_serialize_particle_subset():
+    v1 = get_ripl()
+    v1.infer('(resample 4)')
+    v1.assume('x', '(normal 0 1)', label='x')
+    v1.assume('v', '(array (normal 0 1) (normal 0 1))', label='v')
+    xs = v1.sample_all('x')
+    string = v1.saves()
+    engine = v1.sivm.core_sivm.engine
+    data = snapshot.read(StringIO.StringIO(string[len(snapshot.MAGIC):]))
+    traces = list(data['traces'])
+    eq_(4, len(traces))
+    # The directives are shared by every particle
+    assert all(trace[1] is traces[0][1] for trace in traces)
+    eq_(engine.model.retrieve_dumps(), traces)
+
+    v2 = get_ripl()
+    v2.loads(string, particles=[2, 0])
+    eq_([xs[2], xs[0]], v2.sample_all('x'))
+    eq_(v1.sample_all('v')[2], v2.sample_all('v')[0])
+
+@on_inf_prim("none")
+def test_serialize_legacy_pickle():
+    v1 = get_ripl()
+    v1.assume('x', '(normal 0 1)', label='x')
+    engine = v1.sivm.core_sivm.engine
+    data = engine.model.saveable()
+    data['directiveCounter'] = engine.directiveCounter
+    data['extra'] = {}
+    for d in v1.sivm.dicts:
+        data['extra'][d] = getattr(v1.sivm, d)
+    data['extra']['directive_id_to_stringable_instruction'] = \
+        v1.directive_id_to_stringable_instruction
+    data['extra']['directive_id_to_mode'] = v1.directive_id_to_mode
+    v2 = get_ripl()
+    v2.loads(pickle.dumps((data, '0.2')))
+    eq_(v1.report('x'), v2.report('x'))
@@ -17,8 +17,11 @@
 
 from nose.tools import eq_
 
+from venture.test.config import gen_broken_in
+from venture.test.config import gen_on_inf_prim
 from venture.test.config import get_ripl
 from venture.test.config import on_inf_prim
+import venture.value.dicts as v
 
 @on_inf_prim("mh")
 def testBulkObserve1():
@@ -26,8 +29,84 @@ def testBulkObserve1():
   n_before = len(ripl.list_directives())
   ripl.observe_dataset("normal",[(0,5,11),(2,8,22),(3,10,33)],label="pid")
   ripl.infer(100)
-  eq_(ripl.report("pid_0"),11)
-  eq_(ripl.report("pid_1"),22)
-  eq_(ripl.report("pid_2"),33)
+  eq_(ripl.report("pid"),[11,22,33])
   n_after = len(ripl.list_directives())
-  eq_(n_after, n_before + 3)
+  eq_(n_after, n_before + 1)
+
+@on_inf_prim("none")
+def testBulkObserveOneDirective():
+  ripl = get_ripl()
+  ripl.assume("mu", "(normal 0 1)")
+  ripl.bulk_observe("(normal mu 1)", [1, 2, 3, 4], label="data")
+  [directive] = ripl.list_directives(instructions=["bulk_observe"])
+  eq_(directive["directive_id"], ripl.directive_id_for_label("data"))
+  eq_(directive["value"], [1, 2, 3, 4])
+  eq_(len(directive["values"]), 4)
+  eq_(ripl.report("data"), [1, 2, 3, 4])
+
+@on_inf_prim("none")
+def testBulkObserveForget():
+  ripl = get_ripl()
+  ripl.assume("mu", "(normal 0 1)")
+  n_before = len(ripl.list_directives())
+  ripl.bulk_observe("(normal mu 1)", [1, 2, 3], label="data")
+  ripl.forget("data")
+  eq_(len(ripl.list_directives()), n_before)
+  # Directive ids are not reused after the bulk observe is forgotten
+  ripl.predict("mu", label="m")
+  ripl.forget("m")
+
+@on_inf_prim("none")
+def testBulkObserveWeight():
+  # Incorporating the data together gives the same weight as observing
+  # them one by one.
+  ripl1 = get_ripl(seed=1)
+  ripl1.assume("mu", 0)
+  w1 = ripl1.bulk_observe("(normal mu 1)", [1, 2, 3])
+  ripl2 = get_ripl(seed=1)
+  ripl2.assume("mu", 0)
+  w2 = [sum(ws) for ws in zip(*[ripl2.observe("(normal mu 1)", x)
+                                for x in [1, 2, 3]])]
+  for (a, b) in zip(w1, w2):
+    assert abs(a - b) < 1e-9
+
+@on_inf_prim("none")
+def testBulkObserveSaveLoad():
+  ripl = get_ripl()
+  ripl.assume("mu", "(normal 0 1)")
+  ripl.observe_dataset("(lambda (x) (normal (+ mu x) 1))",
+                       [(1, 2), (2, 3)], label="data")
+  ripl2 = get_ripl()
+  ripl2.loads(ripl.saves())
+  eq_(ripl2.report("data"), [2, 3])
+  eq_(ripl2.report("mu"), ripl.report("mu"))
+  ripl2.forget("data")
+
+@gen_on_inf_prim("none")
+@gen_broken_in("puma", "Puma incorporates bulk observations one at a time, "
+               "each against the others' prior values.")
+def testBulkObserveCollapsedWeight():
+  # Incorporating many applications of a collapsed SP in one batch
+  # gives the same weight as observing and incorporating them one by
+  # one.
+  (atom, integer) = (v.atom, v.integer)
+  for (maker, data) in [
+      ("(make_beta_bernoulli 1 2)", [True, False, True, True]),
+      ("(make_uc_beta_bernoulli 1 2)", [True, False, True, True]),
+      ("(make_nig_normal 1 1 1 1)", [0.5, -1, 2]),
+      ("(make_gamma_poisson 1 1)", [0, 3, 2]),
+      ("(make_dir_cat (array 1 2 3))", [integer(0), integer(2), integer(2)]),
+      ("(make_uc_sym_dir_cat 1 3)", [integer(0), integer(2), integer(2)]),
+      ("(make_crp 1)", [atom(1), atom(1), atom(2)])]:
+    yield checkBulkObserveCollapsedWeight, maker, data
+
+def checkBulkObserveCollapsedWeight(maker, data):
+  ripl1 = get_ripl(seed=1)
+  ripl1.assume("f", maker)
+  ripl1.predict("(f)")
+  [w1] = ripl1.bulk_observe("(f)", data)
+  ripl2 = get_ripl(seed=1)
+  ripl2.assume("f", maker)
+  ripl2.predict("(f)")
+  w2 = sum(ripl2.observe("(f)", x)[0] for x in data)
+  assert abs(w1 - w2) < 1e-9, (w1, w2)
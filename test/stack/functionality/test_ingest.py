@@ -0,0 +1,114 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+
+from nose.tools import assert_raises
+from nose.tools import eq_
+import numpy as np
+
+from venture.exception import VentureException
+from venture.test.config import get_ripl
+from venture.test.config import in_backend
+from venture.test.config import on_inf_prim
+import venture.ingest as ingest
+import venture.value.dicts as v
+
+data = [[0, 5, 11], [2, 8, 22], [3, 10, 33], [4, 1, 44], [5, 2, 55]]
+
+@in_backend("none")
+def testReadRecords():
+  tmp = tempfile.mkdtemp()
+  try:
+    with open(os.path.join(tmp, "data.csv"), "w") as f:
+      f.write("".join("%d,%d,%d\n" % tuple(record) for record in data))
+    with open(os.path.join(tmp, "data.jsonl"), "w") as f:
+      f.write("".join("[%d, %d, %d]\n" % tuple(record) for record in data))
+    np.save(os.path.join(tmp, "data.npy"), np.array(data))
+    np.save(os.path.join(tmp, "column.npy"), np.array([1.5, 2.5]))
+    for name in ["data.csv", "data.jsonl", "data.npy"]:
+      eq_(data, list(ingest.read_records(os.path.join(tmp, name))))
+    with open(os.path.join(tmp, "data.csv"), "rb") as f:
+      eq_(data, list(ingest.read_records(f)))
+    for name in ["data.npy", "column.npy"]:
+      # Streamed a row at a time from the file object
+      with open(os.path.join(tmp, name), "rb") as f:
+        eq_(list(ingest.read_records(os.path.join(tmp, name))),
+            list(ingest.read_records(f)))
+    np.save(os.path.join(tmp, "fortran.npy"), np.asfortranarray(data))
+    with open(os.path.join(tmp, "fortran.npy"), "rb") as f:
+      with assert_raises(VentureException):
+        list(ingest.read_records(f))
+    eq_([[1.5], [2.5]],
+        list(ingest.read_records(os.path.join(tmp, "column.npy"))))
+    with assert_raises(VentureException):
+      ingest.read_records(os.path.join(tmp, "data.txt"))
+  finally:
+    shutil.rmtree(tmp)
+
+@in_backend("none")
+def testBatches():
+  eq_([[0, 1, 2], [3, 4, 5], [6]], list(ingest.batches(iter(range(7)), 3)))
+  eq_([], list(ingest.batches([], 3)))
+
+@on_inf_prim("none")
+def testIngest():
+  ripl = get_ripl()
+  n_before = len(ripl.list_directives())
+  dids = ripl.ingest("normal", iter(data), batch_size=2)
+  directives = ripl.list_directives()[n_before:]
+  eq_(dids, [d["directive_id"] for d in directives])
+  eq_([11, 22, 33, 44, 55], sum([d["value"] for d in directives], []))
+  eq_([33, 44], ripl.report(dids[1]))
+
+@on_inf_prim("mh")
+def testIngestInterleavesInference():
+  ripl = get_ripl()
+  ripl.assume("mu", "(normal 0 1)")
+  ticks = []
+  ripl.bind_callback("tick", lambda _inferrer: ticks.append(None))
+  ripl.ingest("(lambda () (normal mu 1))", ([x] for x in range(7)),
+              batch_size=2, infer_program="(do (mh default one 1) (call_back tick))",
+              infer_every=2)
+  # Four batches, so inference after the second and fourth
+  eq_(2, len(ticks))
+
+@on_inf_prim("none")
+def testEngineIngest():
+  ripl = get_ripl()
+  engine = ripl.sivm.core_sivm.engine
+  dids = engine.ingest(v.sym("normal"), data, batch_size=3)
+  eq_(2, len(dids))
+  eq_([11, 22, 33], ripl.report(dids[0]))
+  eq_([44, 55], ripl.report(dids[1]))
+
+@on_inf_prim("none")
+def testIngestJsonValues():
+  ripl = get_ripl()
+  ripl.assume("f", "(lambda (s) (categorical (simplex 0.5 0.5) (array s \"b\")))")
+  tmp = tempfile.mkdtemp()
+  try:
+    fname = os.path.join(tmp, "data.jsonl")
+    with open(fname, "w") as f:
+      f.write('["a", "a"]\n\n["a", "b"]\n')
+    # Strings are observed as strings, not parsed as expressions
+    eq_(1, len(ripl.ingest("f", fname)))
+  finally:
+    shutil.rmtree(tmp)
+  eq_(["a", "b"], ripl.list_directives()[-1]["value"])
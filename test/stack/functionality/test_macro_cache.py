@@ -0,0 +1,86 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+from nose.tools import assert_raises
+from nose.tools import eq_
+
+from venture.exception import VentureException
+from venture.parser.church_prime.parse import ChurchPrimeParser
+from venture.test.config import gen_in_backend
+from venture.test.config import in_backend
+import venture.sivm.macro # Registers the macros pylint:disable=unused-import
+from venture.sivm.pattern_language import traverse
+import venture.sivm.macro_system as macro_system
+
+def parse(form):
+  return ChurchPrimeParser.instance().parse_expression(form)
+
+@gen_in_backend("none")
+def testCachedExpansionAgrees():
+  for (form, other) in [
+      ("(normal mu 1)", "(normal mu 2)"),
+      ("(if (flip 0.3) 1 \"a\")", "(if (flip 0.7) 2 \"b\")"),
+      ("(let ((x 1) (y 2)) (+ x y))", "(let ((x 3) (y 4)) (+ x y))"),
+      ("(do (x <- (sample 1)) (return (+ x 2)))",
+       "(do (x <- (sample 3)) (return (+ x 4)))"),
+      ("(quasiquote (a (unquote (+ 1 2)) 3))",
+       "(quasiquote (a (unquote (+ 4 5)) 6))"),
+      ("(lambda (x) (tag (quote s) 0 (normal x 1)))",
+       "(lambda (x) (tag (quote s) 1 (normal x 2)))"),
+      ("(quote (1 2 foo))", "(quote (3 4 foo))"),
+  ]:
+    yield checkCachedExpansionAgrees, form, other
+
+def checkCachedExpansionAgrees(form, other):
+  cache = macro_system.ExpansionCache()
+  cache.expand(parse(form))
+  misses = cache.misses
+  exp = parse(other)
+  cached = cache.expand(exp)
+  # The second expression has the same shape, so reuses the first's.
+  eq_(misses, cache.misses)
+  plain = macro_system.expand(exp)
+  eq_(plain.desugared(), cached.desugared())
+  for (index, _) in traverse(plain.desugared()):
+    eq_(plain.resugar_index(index), cached.resugar_index(index))
+  for (index, _) in traverse(exp):
+    eq_(plain.desugar_index(index), cached.desugar_index(index))
+
+@in_backend("none")
+def testSymbolsAreNotAbstracted():
+  cache = macro_system.ExpansionCache()
+  eq_(parse("(+ x 1)"), cache.expand(parse("(+ x 1)")).desugared())
+  eq_(parse("(+ y 1)"), cache.expand(parse("(+ y 1)")).desugared())
+  eq_(2, cache.misses)
+
+@in_backend("none")
+def testFreshSymbolsAreNotCached():
+  # Each expansion of let_values binds a newly chosen temporary.
+  cache = macro_system.ExpansionCache()
+  exp = parse("(do (let_values (a b) (values_list 1 2)) a)")
+  cache.expand(exp)
+  cache.expand(exp)
+  eq_(0, cache.hits)
+  eq_([None], cache.entries.values())
+
+@in_backend("none")
+def testCachedExpansionErrors():
+  cache = macro_system.ExpansionCache()
+  with assert_raises(VentureException) as cm:
+    cache.expand(parse("(if (flip 0.5) 1)"))
+  eq_([], cm.exception.data['expression_index'])
+  assert "literal_slot" not in str(cm.exception)
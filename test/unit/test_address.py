@@ -0,0 +1,54 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+import cPickle as pickle
+
+from nose.tools import eq_
+
+import venture.lite.address as addr
+
+def deep_address(did):
+  a = addr.directive_address(did)
+  a = addr.extend(addr.extend(a, 2), 1)
+  loc = addr.append(addr.top_frame(a), 1)
+  a = addr.request(a, loc)
+  a = addr.extend(a, 0)
+  a = addr.request(a, addr.req_frame("(1 2)"))
+  return addr.extend(a, 3)
+
+def testInterning():
+  a = deep_address(1)
+  b = deep_address(1)
+  assert a is b
+  eq_(hash(a), hash(b))
+  assert deep_address(2) != a
+  assert deep_address(2) is not a
+  eq_(7, a.depth())
+  eq_({a: 1}[b], 1)
+
+def testPickling():
+  a = deep_address(3)
+  assert pickle.loads(pickle.dumps(a, pickle.HIGHEST_PROTOCOL)) is a
+
+def testAsList():
+  # Agrees with the traversal of the functional list representation
+  for a in [addr.empty_address(), addr.directive_address(4), deep_address(4)]:
+    eq_(a.asAddress().asList(), a.asList())
+  eq_([[4, 2, 1], [4, 2, 1, 1, 0], ["(1 2)", 3]], deep_address(4).asList())
+
+def testJsonableAddress():
+  eq_("/5/2/1/(esr(0))/0/(esr(0))/3", addr.jsonable_address(deep_address(5)))
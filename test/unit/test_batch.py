@@ -0,0 +1,126 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+import numpy.random as npr
+
+from nose.tools import assert_almost_equal
+from numpy.testing import assert_allclose
+
+from venture.lite.batch import DensityBatch
+from venture.lite.builtin import builtInSPsIter
+from venture.lite.sp_use import MockArgs
+from venture.lite.trace import Trace
+from venture.test.config import gen_in_backend
+from venture.test.config import in_backend
+import venture.lite.value as vv
+import venture.value.dicts as v
+
+# Operand lists for each batchable SP, exercising both its dispatch
+# cases where it has more than one.
+batchable = {
+  'normal': [[0, 1], [1.5, 0.3], [-2, 4]],
+  'lognormal': [[0, 1], [1.5, 0.3], [-2, 4]],
+  'uniform_continuous': [[0, 1], [-3, 2], [0.5, 0.75]],
+  'beta': [[1, 1], [0.5, 0.5], [2, 7]],
+  'expon': [[1], [0.2], [5]],
+  'gamma': [[1, 1], [2.5, 0.5], [0.3, 4]],
+  'flip': [[], [0.3], [0.9]],
+  'bernoulli': [[], [0.3], [0.9]],
+  'binomial': [[3, 0.5], [10, 0.1], [1, 0.9]],
+  'poisson': [[1], [0.5], [12]],
+}
+
+def _psp_and_args(name, operands_list, np_rng):
+  sp = dict(builtInSPsIter())[name]
+  args = [MockArgs([vv.VentureNumber(x) for x in operands], sp.constructSPAux(),
+                   np_rng=np_rng)
+          for operands in operands_list]
+  return (sp.outputPSP, args)
+
+@gen_in_backend("none")
+def testLogDensityMany():
+  for name in batchable:
+    yield checkLogDensityMany, name
+
+def checkLogDensityMany(name):
+  np_rng = npr.RandomState(1)
+  operands_list = batchable[name] * 3
+  (psp, args) = _psp_and_args(name, operands_list, np_rng)
+  assert psp.canBatch()
+  values = [psp.simulate(a) for a in args]
+  expected = [psp.logDensity(x, a) for (x, a) in zip(values, args)]
+  assert_allclose(expected, psp.logDensityMany(values, args))
+
+@gen_in_backend("none")
+def testSimulateMany():
+  for name in batchable:
+    yield checkSimulateMany, name
+
+def checkSimulateMany(name):
+  np_rng = npr.RandomState(1)
+  (psp, [args]) = _psp_and_args(name, batchable[name][-1:], np_rng)
+  values = psp.simulateMany(7, args)
+  assert len(values) == 7
+  for x in values:
+    assert psp.logDensity(x, args) > float('-inf')
+
+@in_backend("none")
+def testDensityBatchMixed():
+  # A batch may hold PSPs that do and do not batch, in groups of any
+  # size, and must total the same as scoring them one at a time.
+  np_rng = npr.RandomState(1)
+  batch = DensityBatch()
+  expected = 0
+  for name in ['normal', 'flip', 'gamma', 'normal', 'poisson']:
+    (psp, args) = _psp_and_args(name, batchable[name], np_rng)
+    for a in args:
+      x = psp.simulate(a)
+      expected += psp.logDensity(x, a)
+      batch.add(psp, x, a)
+  (psp, args) = _psp_and_args('laplace', [[0, 1], [1, 2]], np_rng)
+  assert not psp.canBatch()
+  for a in args:
+    x = psp.simulate(a)
+    expected += psp.logDensity(x, a)
+    batch.add(psp, x, a)
+  assert_almost_equal(expected, batch.weight())
+  assert batch.weight() == 0
+
+@in_backend("none")
+def testObservationWeightUnchanged():
+  # Many observations of one PSP are scored in a batch when they are
+  # propagated; the weight must be what scoring each would give.
+  trace = Trace(1)
+  trace.eval(1, [v.sym('normal'), v.num(0), v.num(1)])
+  trace.bindInGlobalEnv('mu', 1)
+  trace.eval(2, [v.sym('gamma'), v.num(1), v.num(1)])
+  trace.bindInGlobalEnv('sigma', 2)
+  data = [0.3, -1.2, 2.5, 0.7, 1.1, -0.4]
+  for (i, x) in enumerate(data):
+    trace.eval(3 + i, [v.sym('normal'), v.sym('mu'), v.sym('sigma')])
+    trace.observe(3 + i, v.num(x))
+  trace.eval(9, [v.sym('flip'), v.num(0.3)])
+  trace.observe(9, v.boolean(True))
+  weight = trace.makeConsistent()
+  mu = trace.extractValue(1)['value']
+  sigma = trace.extractValue(2)['value']
+  (normal, args) = _psp_and_args('normal', [[mu, sigma]] * len(data), None)
+  expected = sum(normal.logDensity(vv.VentureNumber(x), a)
+                 for (x, a) in zip(data, args))
+  (flip, [args]) = _psp_and_args('flip', [[0.3]], None)
+  expected += flip.logDensity(vv.VentureBool(True), args)
+  assert_almost_equal(expected, weight)
@@ -0,0 +1,135 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import Counter
+import math
+import random
+
+from nose.tools import assert_almost_equal
+from nose.tools import eq_
+
+from venture.lite.crp import CRPOutputPSP
+from venture.lite.crp import CRPSPAux
+from venture.lite.crp import CRPTables
+from venture.test.config import in_backend
+
+def _check_against(tables, counts):
+  eq_(len(counts), len(tables))
+  eq_(sorted(counts), sorted(tables.occupied()))
+  for (table, count) in counts.iteritems():
+    assert table in tables
+    eq_(count, tables.count(table))
+  eq_(sorted(counts.values()), sorted(tables.occupiedCounts()))
+
+@in_backend("none")
+def testSeatUnseat():
+  # Many more tables than the initial capacity, emptied and refilled
+  # in random order.
+  rng = random.Random(1)
+  tables = CRPTables()
+  counts = Counter()
+  for _ in range(3000):
+    if counts and rng.random() < 0.45:
+      table = rng.choice(list(counts))
+      eq_(counts[table] == 1, tables.unseat(table))
+      counts[table] -= 1
+      if counts[table] == 0:
+        del counts[table]
+    else:
+      table = rng.randrange(200)
+      eq_(table not in counts, tables.seat(table))
+      counts[table] += 1
+  _check_against(tables, counts)
+
+@in_backend("none")
+def testSeatingOrder():
+  # Tables are listed in the order they were first seated, even when
+  # a later table reuses an earlier one's slot.
+  tables = CRPTables()
+  for table in [4, 2, 9]:
+    tables.seat(table)
+  tables.unseat(2)
+  tables.seat(6)
+  tables.seat(2)
+  eq_([4, 9, 6, 2], tables.occupied())
+
+@in_backend("none")
+def testFind():
+  # Each table owns a share count - d of the line, in slot order.
+  for (d, capacity) in [(0, 2), (0.5, 2), (0.5, 3)]:
+    tables = CRPTables(capacity=capacity)
+    counts = {5: 3, 1: 1, 9: 4, 2: 2}
+    for (table, count) in counts.iteritems():
+      for _ in range(count):
+        tables.seat(table)
+    tables.seat(7)
+    tables.unseat(7)
+    start = 0
+    for table in sorted(tables.occupied(), key=tables.slots.get):
+      width = counts[table] - d
+      eq_(table, tables.find(start, d))
+      eq_(table, tables.find(start + width * 0.99, d))
+      start += width
+    eq_(max(tables.occupied(), key=tables.slots.get),
+        tables.find(start, d))
+
+@in_backend("none")
+def testCopyOnWrite():
+  aux = CRPSPAux()
+  tables = aux.writableTables()
+  for table in [1, 1, 2]:
+    tables.seat(table)
+  copied = aux.copy()
+  assert copied.tables is aux.tables
+  copied.writableTables().seat(3)
+  assert copied.tables is not aux.tables
+  aux.writableTables().unseat(2)
+  _check_against(aux.tables, {1: 2})
+  _check_against(copied.tables, {1: 2, 2: 1, 3: 1})
+
+@in_backend("none")
+def testLogDensityOfData():
+  # The closed form agrees with the product it stands for.
+  aux = CRPSPAux()
+  tables = aux.writableTables()
+  for table in [1, 1, 2, 3, 3, 3, 4]:
+    tables.seat(table)
+  (aux.numTables, aux.numCustomers) = (4, 7)
+  for (alpha, d) in [(1.5, 0), (1.5, 0.3), (5.0, -1.0)]:
+    psp = CRPOutputPSP(alpha, d)
+    expected = sum(math.log(alpha + i*d) for i in range(1, 4))
+    expected += sum(math.lgamma(count - d) - math.lgamma(1 - d)
+                    for count in [2, 1, 3, 1])
+    expected -= math.lgamma(alpha + 7) - math.lgamma(alpha + 1)
+    assert_almost_equal(expected, psp.logDensityOfData(aux))
+
+@in_backend("none")
+def testLogDensityOfDataSmallDiscount():
+  # A discount tiny next to alpha must not cost the table term its
+  # precision.
+  aux = CRPSPAux()
+  tables = aux.writableTables()
+  for table in range(20):
+    tables.seat(table)
+  (aux.numTables, aux.numCustomers) = (20, 20)
+  for d in [1e-13, 1e-11, 1e-6]:
+    psp = CRPOutputPSP(1.0, d)
+    # One customer per table, so only the table and customer terms
+    # remain.
+    expected = sum(math.log1p(i*d) for i in range(1, 20))
+    expected -= math.lgamma(21) - math.lgamma(2)
+    assert_almost_equal(expected, psp.logDensityOfData(aux), places=12)
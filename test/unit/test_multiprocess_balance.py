@@ -0,0 +1,71 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from nose.tools import eq_
+
+from venture.test.config import gen_in_backend
+import venture.multiprocess as mp
+
+class Counter(object):
+  def __init__(self, name, delay, count=0):
+    self.name = name
+    self.delay = delay
+    self.count = count
+
+  def bump(self, by):
+    time.sleep(self.delay)
+    self.count += by
+    return (self.name, self.count)
+
+class CounterCopier(object):
+  def copy(self, counter, _seed):
+    return Counter(counter.name, counter.delay, counter.count)
+
+  def export(self, counter):
+    return (counter.name, counter.delay, counter.count)
+
+  def restore(self, exported, _seed):
+    return Counter(*exported)
+
+masters = [mp.SynchronousMaster, mp.SynchronousSerializingMaster,
+           mp.ThreadedMaster, mp.ThreadedSerializingMaster,
+           mp.MultiprocessingMaster]
+
+@gen_in_backend("none")
+def testRebalance():
+  for Master in masters:
+    yield checkRebalance, Master
+
+def checkRebalance(Master):
+  # The two slow objects start out on the same worker.
+  delays = [0.05, 0.05, 0, 0, 0, 0]
+  pool = Master([Counter(i, d) for (i, d) in enumerate(delays)], 2, 1,
+                copier=CounterCopier())
+  pool.map('bump', 1)
+  timings = pool.object_timings()
+  assert min(timings[0:2]) >= 0.05
+  assert max(timings[2:]) < 0.05
+  assert pool.rebalance(1)
+  assert pool.chunk_indexes[0] != pool.chunk_indexes[1]
+  # The objects keep their indexes and their state.
+  eq_([(i, 2) for i in range(6)], pool.map('bump', 1))
+  eq_((4, 12), pool.at(4, 'bump', 10))
+  # Now even, so nothing moves; and timings were reset by the move.
+  assert not pool.rebalance(1)
+  eq_([0] * 6, pool.object_timings())
@@ -0,0 +1,96 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from nose.tools import assert_raises
+from nose.tools import eq_
+
+from venture.test.config import gen_in_backend
+from venture.test.config import in_backend
+import venture.multiprocess as mp
+
+class Counter(object):
+  def __init__(self, name, delay=0):
+    self.name = name
+    self.delay = delay
+    self.count = 0
+
+  def bump(self, by):
+    time.sleep(self.delay)
+    self.count += by
+    return (self.name, self.count)
+
+  def fail(self):
+    raise ValueError("Counter %s failed" % self.name)
+
+masters = [mp.SynchronousMaster, mp.SynchronousSerializingMaster,
+           mp.ThreadedMaster, mp.ThreadedSerializingMaster,
+           mp.MultiprocessingMaster]
+
+@gen_in_backend("none")
+def testPipelinedMaps():
+  for Master in masters:
+    yield checkPipelinedMaps, Master
+
+def checkPipelinedMaps(Master):
+  pool = Master([Counter(i) for i in range(5)], 2, 1)
+  first = pool.map_async('bump', 1)
+  one = pool.at_async(3, 'bump', 10)
+  second = pool.map_async('bump', 100)
+  # Collecting the later answers collects the earlier ones on the
+  # way, without confusing them.
+  eq_([(i, 101 + (10 if i == 3 else 0)) for i in range(5)], second.result())
+  assert first.done()
+  eq_([(i, 1) for i in range(5)], first.result())
+  eq_((3, 11), one.result())
+  eq_([(i, 102 + (10 if i == 3 else 0)) for i in range(5)], pool.map('bump', 1))
+
+@gen_in_backend("none")
+def testMapEach():
+  for Master in masters:
+    yield checkMapEach, Master
+
+def checkMapEach(Master):
+  pool = Master([Counter(i) for i in range(5)], 2, 1)
+  eq_([(i, i) for i in range(5)], pool.map_each('bump', [(i,) for i in range(5)]))
+  eq_((3, 4), pool.at(3, 'bump', 1))
+
+@gen_in_backend("none")
+def testFailuresStayWithTheirCommand():
+  for Master in masters:
+    yield checkFailuresStayWithTheirCommand, Master
+
+def checkFailuresStayWithTheirCommand(Master):
+  pool = Master([Counter(i) for i in range(3)], None, 1)
+  fine = pool.map_async('bump', 1)
+  with assert_raises(ValueError):
+    # A SynchronousMaster raises while sending; the others on receipt.
+    pool.at_async(1, 'fail').result()
+  eq_([(i, 1) for i in range(3)], fine.result())
+  with assert_raises(ValueError):
+    pool.map('fail')
+  eq_((2, 2), pool.at(2, 'bump', 1))
+
+@in_backend("none")
+def testAnswersArriveOutOfOrder():
+  pool = mp.MultiprocessingMaster(
+    [Counter(0, delay=0.5), Counter(1), Counter(2)], None, 1)
+  pending = pool.map_async('bump', 1)
+  arrived = [indexes for (indexes, _) in pending.results_as_completed()]
+  eq_([0], arrived[-1])
+  eq_([[0], [1], [2]], sorted(arrived))
@@ -18,6 +18,7 @@
 from __future__ import division
 
 import copy
+import pickle
 import random
 import scipy.stats
 
@@ -528,3 +529,47 @@ def test_clear(prng, klass, generator):
     s.clear()
     assert not s
     assert 0 == len(s)
+
+@checkem
+def test_churn(prng, klass, generator):
+    if klass == OrderedFrozenSet:
+        raise SkipTest('destructive operations')
+    elements = pick_elements(prng, 1 + 3*pick_length(prng), generator)
+    s = klass()
+    l = []
+    for x in elements:
+        s.add(x)
+        l.append(x)
+        if pick_integer(prng, 3) == 0:
+            y = l.pop(pick_integer(prng, len(l)))
+            s.remove(y)
+            assert y not in s
+        assert len(s) == len(l)
+        assert list(s) == l
+
+@checkem
+def test_remove_while_iterating(prng, klass, generator):
+    if klass == OrderedFrozenSet:
+        raise SkipTest('destructive operations')
+    elements = pick_elements(prng, 1 + pick_length(prng), generator)
+    s = klass(elements)
+    seen = []
+    for x in s:
+        seen.append(x)
+        for y in elements:
+            s.discard(y)
+    # Removals must not disturb the iteration in progress, though it
+    # may or may not go on to yield the elements removed.
+    assert seen[:1] == elements[:1]
+    check_order(elements, seen)
+    assert not s
+
+@checkem
+def test_pickle(prng, klass, generator):
+    elements = pick_elements(prng, 1 + pick_length(prng), generator)
+    s = klass(elements)
+    if klass == OrderedSet:
+        s.remove(elements[0])
+    sp = pickle.loads(pickle.dumps(s))
+    assert type(sp) == klass
+    assert sp == s
@@ -0,0 +1,96 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+from venture.lite.overlay import MAX_DEPTH
+from venture.lite.overlay import OverlayMap
+from venture.lite.overlay import OverlaySet
+from venture.test.config import in_backend
+
+def _hash(i):
+  return (i * 14536777) % 107331
+
+@in_backend("none")
+def testOverlayMapInsertContains():
+  r = OverlayMap()
+  assert len(r) == 0
+  assert not r
+  r[1] = 2
+  assert len(r) == 1
+  assert 1 in r
+  assert r.lookup(1) == 2
+  assert r.lookup(3) is None
+  r[1] = 3
+  assert len(r) == 1
+  assert r[1] == 3
+
+@in_backend("none")
+def testOverlayMapFork():
+  r = OverlayMap()
+  N = 1000
+  for i in range(N):
+    r[_hash(i)] = i
+  r2 = r.fork()
+  for i in range(N/2, N):
+    r2[_hash(i)] = -i
+  r[_hash(N)] = N
+
+  for i in range(N/2):
+    assert r.lookup(_hash(i)) == i
+    assert r2.lookup(_hash(i)) == i
+  for i in range(N/2, N):
+    assert r.lookup(_hash(i)) == i
+    assert r2.lookup(_hash(i)) == -i
+  assert _hash(N) in r
+  assert _hash(N) not in r2
+  assert len(r) == N + 1
+  assert len(r2) == N
+
+@in_backend("none")
+def testOverlayMapIterationOrder():
+  r = OverlayMap()
+  for i in range(10):
+    r[_hash(i)] = i
+  # Fork deeper than MAX_DEPTH, to exercise flattening
+  for i in range(MAX_DEPTH + 5):
+    r = r.fork()
+    r[_hash(i)] = i + 1
+    r[_hash(10 + i)] = 0
+  keys = [_hash(i) for i in range(10 + MAX_DEPTH + 5)]
+  assert list(r) == keys
+  assert dict(r.iteritems())[_hash(3)] == 4
+  assert len(r) == len(keys)
+
+@in_backend("none")
+def testOverlayMapOwned():
+  r = OverlayMap()
+  r['a'] = OverlaySet()
+  r.owned('a').add(1)
+  r2 = r.fork()
+  r2.owned('a').add(2)
+  r.owned('a').add(3)
+  assert list(r['a']) == [1, 3]
+  assert list(r2['a']) == [1, 2]
+
+@in_backend("none")
+def testOverlaySetFork():
+  r = OverlaySet()
+  r.add(1)
+  r2 = r.fork()
+  r2.add(2)
+  assert 1 in r and 1 in r2
+  assert 2 not in r and 2 in r2
+  assert len(r) == 1 and len(r2) == 2
@@ -0,0 +1,86 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+import cPickle as pickle
+import os
+
+from nose.tools import assert_raises
+from nose.tools import eq_
+import numpy as np
+
+from venture.shared_arrays import SharedArray
+from venture.shared_arrays import SharedArrayStore
+from venture.shared_arrays import by_handle
+from venture.test.config import in_backend
+
+@in_backend("none")
+def testShareOnce():
+  store = SharedArrayStore(min_bytes=64)
+  data = np.arange(100, dtype=float).reshape(10, 10)
+  shared = store.share(data)
+  assert isinstance(shared, SharedArray)
+  assert shared is store.share(data)
+  assert shared is store.share(shared)
+  np.testing.assert_array_equal(data, shared)
+  with assert_raises(ValueError):
+    shared[0, 0] = 7 # Read-only
+  store.close()
+
+@in_backend("none")
+def testPickleByHandle():
+  store = SharedArrayStore(min_bytes=64)
+  data = np.arange(1000, dtype=float)
+  shared = store.share(data)
+  with by_handle():
+    dumped = pickle.dumps(shared, pickle.HIGHEST_PROTOCOL)
+    assert len(dumped) < data.nbytes / 10
+    loaded = pickle.loads(dumped)
+    eq_(shared.shared_path, loaded.shared_path)
+    np.testing.assert_array_equal(data, loaded)
+    # Views and results pickle their contents, not the whole file.
+    view = pickle.loads(pickle.dumps(shared[:10], pickle.HIGHEST_PROTOCOL))
+    np.testing.assert_array_equal(data[:10], view)
+    total = pickle.loads(pickle.dumps(shared + 1, pickle.HIGHEST_PROTOCOL))
+    np.testing.assert_array_equal(data + 1, total)
+  path = shared.shared_path
+  store.close()
+  assert not os.path.exists(path)
+
+@in_backend("none")
+def testPickleContentsByDefault():
+  # E.g. when saving a model, which must outlive the shared files.
+  store = SharedArrayStore(min_bytes=64)
+  data = np.arange(1000, dtype=float)
+  dumped = pickle.dumps(store.share(data), pickle.HIGHEST_PROTOCOL)
+  assert len(dumped) > data.nbytes
+  store.close()
+  loaded = pickle.loads(dumped)
+  assert not isinstance(loaded, SharedArray)
+  np.testing.assert_array_equal(data, loaded)
+
+@in_backend("none")
+def testShareIn():
+  store = SharedArrayStore(min_bytes=64)
+  small = np.zeros(2)
+  big = np.zeros(100)
+  stack_dict = {"type": "array_unboxed", "value": big}
+  shared = store.share_in(["define", "x", [stack_dict, (small, "y")]])
+  assert isinstance(shared[2][0]["value"], SharedArray)
+  assert shared[2][1][0] is small
+  eq_("array_unboxed", shared[2][0]["type"])
+  assert store.share_in(np.array(["a", None])).dtype.hasobject
+  store.close()
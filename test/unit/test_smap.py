@@ -0,0 +1,59 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+
+from nose.tools import eq_
+
+from venture.lite.smap import SamplableMap
+from venture.test.config import in_backend
+import venture.lite.value as vv
+
+@in_backend("none")
+def testSortedKeysMaintained():
+  # The sorted index is made on the first ordered query and kept up
+  # to date by every later insertion and deletion.
+  rng = random.Random(1)
+  m = SamplableMap()
+  keys = set()
+  for i in rng.sample(range(1000), 300):
+    m[i] = str(i)
+    keys.add(i)
+  eq_(sorted(keys), m.sortedKeys())
+  for _ in range(500):
+    i = rng.randrange(1000)
+    if i in keys:
+      del m[i]
+      keys.remove(i)
+    else:
+      m[i] = str(i)
+      keys.add(i)
+  eq_(sorted(keys), m.sortedKeys())
+  eq_(sorted(k for k in keys if 100 <= k <= 250), m.keysBetween(100, 250))
+  eq_([], m.keysBetween(2000, 3000))
+
+@in_backend("none")
+def testKeysBetweenVentureValues():
+  # Blocks in a scope are Venture values; ordered_range bounds are
+  # inclusive.
+  m = SamplableMap()
+  for i in [5, 3, 8, 1, 9]:
+    m[vv.VentureNumber(i)] = None
+  eq_([vv.VentureNumber(i) for i in [3, 5, 8]],
+      m.keysBetween(vv.VentureNumber(3), vv.VentureNumber(8)))
+  del m[vv.VentureNumber(5)]
+  eq_([vv.VentureNumber(i) for i in [1, 3, 8, 9]], m.sortedKeys())
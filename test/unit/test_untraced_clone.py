@@ -0,0 +1,60 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+from nose.tools import assert_raises
+from nose.tools import eq_
+
+from venture.exception import VentureException
+from venture.lite.exception import VentureError
+from venture.test.config import in_backend
+from venture.untraced.trace import Trace
+import venture.value.dicts as v
+
+def _define(trace, did, sym, exp):
+  trace.eval(did, exp)
+  trace.bindInGlobalEnv(sym, did)
+
+def _value(trace, did, exp):
+  trace.eval(did, exp)
+  return trace.extractValue(did)['value']
+
+@in_backend("none")
+def testCloneCopiesOnWrite():
+  template = Trace(1)
+  _define(template, 1, 'a', v.num(1))
+  template.sealEnvironment()
+  _define(template, 2, 'b', v.num(2))
+  clone = template.clone(2)
+  eq_(3, _value(clone, 3, [v.sym('add'), v.sym('a'), v.sym('b')]))
+  # Rebinding and unbinding in the clone shadow the template's
+  # bindings rather than changing them.
+  _define(clone, 4, 'a', v.num(10))
+  clone.unbindInGlobalEnv('b')
+  assert not clone.boundInGlobalEnv('b')
+  with assert_raises(VentureException):
+    _value(clone, 5, v.sym('b'))
+  eq_(10, _value(clone, 6, v.sym('a')))
+  clone.unbindInGlobalEnv('a')
+  eq_(1, _value(clone, 7, v.sym('a')))
+  eq_(3, _value(template, 8, [v.sym('add'), v.sym('a'), v.sym('b')]))
+  # Unbinding a shadowed symbol again is an error, not a restore.
+  with assert_raises(VentureError):
+    clone.unbindInGlobalEnv('b')
+  assert not clone.boundInGlobalEnv('b')
+  # Clones of one template are independent.
+  other = template.clone(3)
+  eq_(2, _value(other, 3, v.sym('b')))
@@ -0,0 +1,68 @@
+# Copyright (c) 2016 MIT Probabilistic Computing Project.
+#
+# This file is part of Venture.
+#
+# Venture is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Venture is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Venture.  If not, see <http://www.gnu.org/licenses/>.
+
+from nose.tools import assert_raises
+from nose.tools import eq_
+
+from venture.exception import VentureException
+from venture.test.config import in_backend
+from venture.untraced.trace import Trace
+import venture.lite.address as addr
+import venture.untraced.node as node
+import venture.value.dicts as v
+
+def _lam(params, body):
+  return [v.sym('make_csp'), v.quote(v.array([v.sym(p) for p in params])),
+          v.quote(body)]
+
+@in_backend("none")
+def testSubexpressionAddresses():
+  top = addr.directive_address(3)
+  place = node.Subexpression(node.Subexpression(top, 2), 0)
+  address = place.address()
+  eq_(addr.extend(addr.extend(top, 2), 0), address)
+  assert address is place.address()
+  eq_(address, node.LazyNode(place).address)
+  eq_(top, node.LazyNode(top).address)
+
+@in_backend("none")
+def testErrorAddresses():
+  # Addresses are only made for errors, but must be the same as if
+  # they had been made all along.
+  trace = Trace(1)
+  with assert_raises(VentureException) as cm:
+    trace.eval(1, [v.sym('add'), v.num(1),
+                   [v.sym('mul'), v.num(2), v.sym('nope')]])
+  eq_(addr.extend(addr.extend(addr.directive_address(1), 2), 2),
+      cm.exception.data['address'])
+  with assert_raises(VentureException) as cm:
+    trace.eval(2, [v.sym('add'), v.num(1), [v.num(2), v.num(3)]])
+  eq_(addr.extend(addr.directive_address(2), 2), cm.exception.data['address'])
+
+@in_backend("none")
+def testCompoundRecursion():
+  # A compound procedure's body is compiled once and run on every call.
+  trace = Trace(1)
+  count = _lam(['k'], [[v.sym('biplex'), [v.sym('lte'), v.sym('k'), v.num(0)],
+                        _lam([], v.num(0)),
+                        _lam([], [v.sym('add'), v.num(1),
+                                  [v.sym('count'),
+                                   [v.sym('sub'), v.sym('k'), v.num(1)]]])]])
+  trace.eval(1, count)
+  trace.bindInGlobalEnv('count', 1)
+  trace.eval(2, [v.sym('count'), v.num(50)])
+  eq_(50, trace.extractValue(2)['value'])